@@ -0,0 +1,539 @@
+import os
+import sys
+import json
+import time
+import shutil
+import gc
+import argparse
+import resource
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+from contextlib import redirect_stdout
+from textnode import TextNode, TextType
+from inline_markdown import (
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes,
+)
+from block_markdown import (
+    markdown_to_html_node,
+    markdown_to_blocks,
+    block_to_block_type,
+    block_to_html_node,
+    classify_block,
+    BlockType,
+    create_quote_node,
+    create_ulist_node,
+    create_olist_node,
+    create_code_node,
+    create_heading_node,
+    create_paragraph_node,
+)
+from corpus import SHAPES, TEMPLATE, generate_corpus, generate_markdown
+import main as site
+import blockcache
+import highlight
+from gencontent import extract_title, generate_page_streaming
+from template import Template, load_template
+
+def best_of(func, repeat=5):
+    # Best wall time over a few runs is the most stable number on a noisy machine
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def print_row(*columns):
+    print("  ".join(str(column).rjust(12) for column in columns))
+
+def measure(func, repeat, setup=None):
+    # Wall time of every run after one warm-up, with the cyclic GC paused like
+    # timeit does, so collections triggered by earlier cases do not add noise
+    samples = []
+    for i in range(repeat + 1):
+        if setup is not None:
+            setup()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+        finally:
+            gc.enable()
+        if i > 0:
+            samples.append(elapsed)
+    return samples
+
+def print_case(name, *columns):
+    print(name.ljust(30) + "".join(str(column).rjust(12) for column in columns))
+
+def record(results, name, samples, pages, nbytes):
+    # Throughput is reported from the median; the gate uses the minimum, which is
+    # the least sensitive to a noisy machine. The stdev shows how noisy it was.
+    median = statistics.median(samples)
+    spread = statistics.stdev(samples) / median if len(samples) > 1 and median else 0.0
+    results[name] = {
+        "median": median,
+        "min": min(samples),
+        "pages_per_s": pages / median,
+        "mb_per_s": nbytes / median / 1e6,
+    }
+    print_case(name, f"{median * 1000:.1f}", f"{min(samples) * 1000:.1f}", f"{spread:.1%}", f"{pages / median:.0f}", f"{nbytes / median / 1e6:.2f}")
+
+def print_header(title):
+    print(title)
+    print_case("case", "median ms", "min ms", "stdev", "pages/s", "MB/s")
+
+# --- Inline tokenizer ---
+
+def legacy_text_to_textnodes(text):
+    # The original six-pass pipeline, kept here as the baseline
+    nodes = [TextNode(text, TextType.PLAIN)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    return nodes
+
+def generate_paragraph(spans, links_only=False):
+    # One long line of inline markup, dense in links and images
+    parts = []
+    for i in range(spans):
+        if links_only:
+            parts.append(f"see [link {i}](https://example.com/{i}) and ![image {i}](/images/{i}.png) ")
+        else:
+            parts.append(
+                f"word {i} **bold {i}** and *italic* with a [link {i}](https://example.com/{i}) "
+                f"plus ![image {i}](/images/{i}.png) and `code {i}` "
+            )
+    return "".join(parts)
+
+def bench_inline(options, results):
+    print("text_to_textnodes: legacy six-pass pipeline vs single-pass scanner")
+    print_row("shape", "spans", "chars", "legacy ms", "scanner ms", "speedup")
+    cases = [(shape, spans) for shape in ("mixed", "links") for spans in (100, 1000, 5000)]
+    for shape, spans in cases:
+        text = generate_paragraph(spans, links_only=shape == "links")
+        if legacy_text_to_textnodes(text) != text_to_textnodes(text):
+            raise Exception(f"Scanner output differs from the legacy pipeline on {shape}/{spans}")
+        legacy = best_of(lambda: legacy_text_to_textnodes(text), repeat=3)
+        scanner = best_of(lambda: text_to_textnodes(text), repeat=3)
+        print_row(shape, spans, len(text), f"{legacy * 1000:.1f}", f"{scanner * 1000:.1f}", f"{legacy / scanner:.1f}x")
+        results[f"inline/{shape}/{spans}"] = {"median": scanner, "min": scanner}
+
+# --- Node memory ---
+
+def generate_page(paragraphs):
+    # A typical long article: headings, mixed paragraphs and lists
+    blocks = ["# Generated page"]
+    for i in range(paragraphs):
+        if i % 10 == 0:
+            blocks.append(f"## Section {i}")
+        if i % 5 == 4:
+            blocks.append("\n".join(f"- item {j} with **bold** and a [link](/p/{j})" for j in range(5)))
+        else:
+            blocks.append(generate_paragraph(8))
+    return "\n\n".join(blocks)
+
+def count_nodes(node):
+    return 1 + sum(count_nodes(child) for child in node.children or [])
+
+def bench_memory(options, results):
+    print("Node tree memory per page (tracemalloc) and process peak RSS")
+    markdown = generate_page(200)
+    pages = 20
+
+    tracemalloc.start()
+    before_bytes = tracemalloc.get_traced_memory()[0]
+    before_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    # Keep every tree alive so the numbers show what a page really holds on to
+    trees = [markdown_to_html_node(markdown) for _ in range(pages)]
+    after_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    after_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+
+    nodes = count_nodes(trees[0])
+    retained = (after_bytes - before_bytes) / pages
+    print_row("html nodes", "KiB/page", "bytes/node", "allocs/page", "peak KiB", "maxrss MiB")
+    print_row(
+        nodes,
+        f"{retained / 1024:.0f}",
+        f"{retained / nodes:.0f}",
+        (after_blocks - before_blocks) // pages,
+        f"{peak_bytes / 1024:.0f}",
+        f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f}",
+    )
+
+# --- Streaming page render ---
+
+# Shape and block count of the large pages bench_stream renders at --scale 1
+STREAM_PAGES = (("small", 4000), ("code", 8000))
+
+def bench_stream(options, results):
+    print("Peak traced memory rendering one large page: whole-file vs streaming,")
+    print("the latter also with the block cache at its build defaults")
+    print_row("page", "MB", "full peak MB", "stream peak MB", "+cache peak MB", "full ms", "stream ms")
+    root = tempfile.mkdtemp(prefix="bench-stream-")
+    try:
+        template_path = os.path.join(root, "template.html")
+        with open(template_path, "w") as f:
+            f.write("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        template = load_template(template_path)
+
+        for shape, size in STREAM_PAGES:
+            source = os.path.join(root, f"{shape}.md")
+            with open(source, "w") as f:
+                f.write(generate_markdown(shape, max(1, int(size * options.scale))))
+            nbytes = os.path.getsize(source)
+
+            def full():
+                with open(source, "r") as f:
+                    markdown = f.read()
+                html = template.render({"Title": extract_title(markdown), "Content": markdown_to_html_node(markdown).to_html()})
+                with open(os.path.join(root, "full.html"), "w") as f:
+                    f.write(html)
+
+            def stream():
+                # The second argument picks the layout from the page's front matter
+                generate_page_streaming(source, lambda meta: template, os.path.join(root, "stream.html"))
+
+            def stream_cached():
+                # What a build does by default: every rendered block goes
+                # through the in-memory cache, which must not end up holding
+                # the whole page
+                blockcache.configure(10000)
+                try:
+                    stream()
+                finally:
+                    blockcache.configure(0)
+
+            peaks = []
+            for func in (full, stream, stream_cached):
+                tracemalloc.start()
+                func()
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            times = [min(measure(func, options.repeat)) for func in (full, stream)]
+            print_row(
+                shape,
+                f"{nbytes / 1e6:.1f}",
+                *(f"{peak / 1e6:.1f}" for peak in peaks),
+                f"{times[0] * 1000:.0f}",
+                f"{times[1] * 1000:.0f}",
+            )
+            results[f"stream/{shape}"] = {"median": times[1], "min": times[1]}
+    finally:
+        shutil.rmtree(root)
+
+# --- Synthetic corpus suite ---
+
+# pages, blocks per page for each corpus shape at --scale 1
+CORPUS_SIZES = {
+    "small": (400, 6),
+    "huge": (3, 300),
+    "links": (60, 20),
+    "lists": (60, 10),
+    "quotes": (60, 10),
+    "code": (60, 10),
+}
+
+def corpus_pages(shape, scale):
+    pages, size = CORPUS_SIZES[shape]
+    pages = max(1, int(pages * scale))
+    return [generate_markdown(shape, size, seed) for seed in range(pages)]
+
+def inline_texts(markdown):
+    texts = []
+    for block in markdown_to_blocks(markdown):
+        block_type = block_to_block_type(block)
+        if block_type in (BlockType.ULIST, BlockType.OLIST):
+            texts.extend(line[line.find(" ") + 1:] for line in block.split("\n"))
+        elif block_type != BlockType.CODE:
+            texts.append(" ".join(block.split("\n")))
+    return texts
+
+def bench_parse(options, results):
+    print_header("Parser stages on synthetic pages")
+    for shape in options.shapes:
+        pages = corpus_pages(shape, options.scale)
+        nbytes = sum(len(markdown.encode()) for markdown in pages)
+
+        samples = measure(lambda: [markdown_to_html_node(markdown) for markdown in pages], options.repeat)
+        record(results, f"markdown_to_html_node/{shape}", samples, len(pages), nbytes)
+
+        # Same again with a warm block cache, as in an incremental or watch rebuild
+        blockcache.configure(1_000_000)
+        samples = measure(lambda: [markdown_to_html_node(markdown) for markdown in pages], options.repeat)
+        blockcache.configure(0)
+        record(results, f"markdown_to_html_node+cache/{shape}", samples, len(pages), nbytes)
+
+        # Inline parsing alone, on the text the block handlers feed it
+        texts = [text for markdown in pages for text in inline_texts(markdown)]
+        text_bytes = sum(len(text.encode()) for text in texts)
+        samples = measure(lambda: [text_to_textnodes(text) for text in texts], options.repeat)
+        record(results, f"text_to_textnodes/{shape}", samples, len(pages), text_bytes)
+
+        trees = [markdown_to_html_node(markdown) for markdown in pages]
+        samples = measure(lambda: [tree.to_html() for tree in trees], options.repeat)
+        record(results, f"to_html/{shape}", samples, len(pages), nbytes)
+
+def bench_minify(options, results):
+    print_header("Rendering pages with and without --minify")
+    plain = Template(TEMPLATE)
+    minified = Template(TEMPLATE, minify=True)
+    savings = []
+    for shape in options.shapes:
+        pages = corpus_pages(shape, options.scale)
+        nbytes = sum(len(markdown.encode()) for markdown in pages)
+        trees = [(extract_title(markdown), markdown_to_html_node(markdown)) for markdown in pages]
+
+        def render(template):
+            return [template.render({"Title": title, "Content": tree}) for title, tree in trees]
+
+        plain_samples = measure(lambda: render(plain), options.repeat)
+        record(results, f"render/{shape}", plain_samples, len(pages), nbytes)
+        minified_samples = measure(lambda: render(minified), options.repeat)
+        record(results, f"render+minify/{shape}", minified_samples, len(pages), nbytes)
+
+        plain_bytes = sum(len(html.encode()) for html in render(plain))
+        minified_bytes = sum(len(html.encode()) for html in render(minified))
+        overhead = min(minified_samples) / min(plain_samples) - 1
+        savings.append((shape, plain_bytes, minified_bytes, overhead))
+
+    print()
+    print_row("shape", "bytes", "minified", "saved", "time cost")
+    for shape, plain_bytes, minified_bytes, overhead in savings:
+        print_row(shape, plain_bytes, minified_bytes, f"{1 - minified_bytes / plain_bytes:.1%}", f"{overhead:+.1%}")
+
+def legacy_block_to_block_type(block):
+    # Classification as it was before classify_block: split the block, then
+    # test every line (with an f-string per ordered list line)
+    if block.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):
+        return BlockType.HEADING
+    if len(block) >= 6 and block.startswith("```") and block.endswith("```"):
+        return BlockType.CODE
+    lines = block.split("\n")
+    if block.startswith(">"):
+        for line in lines:
+            if not line.startswith(">"):
+                return BlockType.PARAGRAPH
+        return BlockType.QUOTE
+    if block.startswith("- "):
+        for line in lines:
+            if not line.startswith("- "):
+                return BlockType.PARAGRAPH
+        return BlockType.ULIST
+    if block.startswith("1. "):
+        i = 1
+        for line in lines:
+            if not line.startswith(f"{i}. "):
+                return BlockType.PARAGRAPH
+            i += 1
+        return BlockType.OLIST
+    return BlockType.PARAGRAPH
+
+LEGACY_BUILDERS = {
+    BlockType.QUOTE: create_quote_node,
+    BlockType.ULIST: create_ulist_node,
+    BlockType.OLIST: create_olist_node,
+    BlockType.CODE: create_code_node,
+    BlockType.HEADING: create_heading_node,
+    BlockType.PARAGRAPH: create_paragraph_node,
+}
+
+def legacy_block_to_html_node(block):
+    # The builders split the block again on their own
+    return LEGACY_BUILDERS[legacy_block_to_block_type(block)](block)
+
+def bench_blocks(options, results):
+    print_header("Block classification, legacy vs single scan")
+    shapes = [shape for shape in options.shapes if shape in ("lists", "quotes")] or ["lists", "quotes"]
+    for shape in shapes:
+        pages = corpus_pages(shape, options.scale)
+        nbytes = sum(len(markdown.encode()) for markdown in pages)
+        blocks = [block for markdown in pages for block in markdown_to_blocks(markdown)]
+
+        samples = measure(lambda: [legacy_block_to_block_type(block) for block in blocks], options.repeat)
+        record(results, f"block_type legacy/{shape}", samples, len(pages), nbytes)
+        samples = measure(lambda: [classify_block(block) for block in blocks], options.repeat)
+        record(results, f"classify_block/{shape}", samples, len(pages), nbytes)
+
+        samples = measure(lambda: [legacy_block_to_html_node(block) for block in blocks], options.repeat)
+        record(results, f"block node legacy/{shape}", samples, len(pages), nbytes)
+        samples = measure(lambda: [block_to_html_node(block) for block in blocks], options.repeat)
+        record(results, f"block node/{shape}", samples, len(pages), nbytes)
+
+def bench_highlight(options, results):
+    print_header("Fenced code blocks, plain vs highlighted (uncached and cached)")
+    pages = corpus_pages("code", options.scale)
+    nbytes = sum(len(markdown.encode()) for markdown in pages)
+    plain = [block for markdown in pages for block in markdown_to_blocks(markdown) if block.startswith("```")]
+    fenced = ["```python" + block[3:] for block in plain]
+
+    samples = measure(lambda: [create_code_node(block) for block in plain], options.repeat)
+    record(results, "code block/plain", samples, len(pages), nbytes)
+    samples = measure(lambda: [create_code_node(block) for block in fenced], options.repeat, setup=highlight.clear_cache)
+    record(results, "code block/highlight", samples, len(pages), nbytes)
+    highlight.clear_cache()
+    samples = measure(lambda: [create_code_node(block) for block in fenced], options.repeat)
+    record(results, "code block/highlight cached", samples, len(pages), nbytes)
+    stats = highlight.cache_stats()
+    print(f"{stats['entries']} distinct snippet(s), {stats['hits']} cache hit(s)")
+
+def bench_build(options, results):
+    print_header("Full builds of a synthetic site (main.build)")
+    for shape in options.shapes:
+        pages, size = CORPUS_SIZES[shape]
+        pages = max(1, int(pages * options.scale))
+        root = tempfile.mkdtemp(prefix=f"bench-{shape}-")
+        cwd = os.getcwd()
+        try:
+            nbytes = generate_corpus(root, shape, pages, size)
+            os.chdir(root)
+            args = site.parse_args(["--jobs", str(options.jobs)])
+            # The same build writing each page inside the render loop
+            sync_args = site.parse_args(["--jobs", str(options.jobs), "--writers", "0"])
+
+            def clean():
+                shutil.rmtree(site.DEST_DIR, ignore_errors=True)
+                shutil.rmtree(os.path.dirname(site.MANIFEST_PATH), ignore_errors=True)
+
+            def run(build_args=args):
+                with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                    site.build(build_args)
+
+            samples = measure(lambda: run(sync_args), options.repeat, setup=clean)
+            record(results, f"build sync writes/{shape}", samples, pages, nbytes)
+            samples = measure(run, options.repeat, setup=clean)
+            record(results, f"build/{shape}", samples, pages, nbytes)
+            # Everything is up to date now: this is the cost of a no-op rebuild
+            samples = measure(run, options.repeat)
+            record(results, f"rebuild/{shape}", samples, pages, nbytes)
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(root)
+
+# --- CLI startup ---
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules a plain build should not pay for at startup; each is imported
+# where it is first needed (parallel builds, --persist-block-cache, --watch,
+# --precompress, --check-links, copying a static file, a fenced language)
+DEFERRED_IMPORTS = (
+    "concurrent.futures",
+    "multiprocessing",
+    "sqlite3",
+    "ctypes",
+    "gzip",
+    "shutil",
+    "urllib.parse",
+    "highlight",
+)
+
+def import_times(module):
+    # {module: cumulative microseconds} from a fresh interpreter running -X importtime
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+def bench_startup(options, results):
+    print_header("CLI startup (fresh interpreter per run)")
+    samples = []
+    for _ in range(max(options.repeat, 3)):
+        times = import_times("main")
+        samples.append(times["main"] / 1e6)
+    record(results, "startup/import main", samples, 1, 0)
+
+    def help_run():
+        subprocess.run([sys.executable, "main.py", "--help"], cwd=SRC_DIR, capture_output=True, check=True)
+    record(results, "startup/main.py --help", measure(help_run, options.repeat), 1, 0)
+
+    print()
+    print("Slowest imports (cumulative ms):")
+    slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)[1:9]
+    for name, micros in slowest:
+        print(f"  {name:<40}{micros / 1000:>8.1f}")
+    eager = [name for name in DEFERRED_IMPORTS if name in times]
+    if eager:
+        print(f"WARNING: imported at startup: {', '.join(eager)}")
+
+BENCHMARKS = {
+    "inline": bench_inline,
+    "memory": bench_memory,
+    "stream": bench_stream,
+    "parse": bench_parse,
+    "blocks": bench_blocks,
+    "highlight": bench_highlight,
+    "minify": bench_minify,
+    "startup": bench_startup,
+    "build": bench_build,
+}
+
+def compare(results, baseline_path, tolerance):
+    # Returns the cases whose best time got slower than the baseline by more than tolerance
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        ratio = result["min"] / baseline[name]["min"]
+        if ratio > 1 + tolerance:
+            regressions.append((name, ratio))
+    return regressions
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the static site generator")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES), help="corpus shapes to use")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the number of generated pages")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case")
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes for the build benchmark")
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON (e.g. a new baseline)")
+    parser.add_argument("--compare", metavar="PATH", help="fail if slower than this JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown against the baseline")
+    args = parser.parse_args(argv)
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}, choose from: {', '.join(BENCHMARKS)}")
+    return args
+
+def main(argv):
+    options = parse_args(argv)
+    results = {}
+    for name in options.names or list(BENCHMARKS):
+        BENCHMARKS[name](options, results)
+        print()
+
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if options.compare:
+        regressions = compare(results, options.compare, options.tolerance)
+        for name, ratio in regressions:
+            print(f"REGRESSION {name}: {ratio:.2f}x the baseline time")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
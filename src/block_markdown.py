@@ -1,7 +1,12 @@
+import re
 from enum import Enum
 from inline_markdown import text_to_textnodes
-from textnode import text_node_to_html_node
-from htmlnode import ParentNode, LeafNode
+from textnode import text_node_to_html_node, TextType
+from html import escape
+from htmlnode import ParentNode, LeafNode, RawHTML
+from profiler import stage
+import blockcache
+import linkindex
 
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
@@ -11,42 +16,57 @@ class BlockType(Enum):
     ULIST = "unordered_list"
     OLIST = "ordered_list"
 
-def block_to_block_type(block):
+# "1. ", "2. ", ... built once instead of an f-string per list line
+_OLIST_PREFIXES = ["", "1. "]
+
+def _olist_prefix(i):
+    while len(_OLIST_PREFIXES) <= i:
+        _OLIST_PREFIXES.append(f"{len(_OLIST_PREFIXES)}. ")
+    return _OLIST_PREFIXES[i]
+
+def classify_block(block):
+    # Returns (block type, lines). The block is scanned once; lines is the
+    # block already split on newlines for the line-based types (quotes and
+    # lists), else None, and is handed to the node builder so it does not
+    # split again.
+
     # Heading: 1-6 # followed by a space
     if block.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):
-        return BlockType.HEADING
+        return BlockType.HEADING, None
     
     # Code: starts and ends with ```
     if len(block) >= 6 and block.startswith("```") and block.endswith("```"):
-        return BlockType.CODE
-    
-    lines = block.split("\n")
+        return BlockType.CODE, None
     
     # Quote: Every line starts with >
     if block.startswith(">"):
+        lines = block.split("\n")
         for line in lines:
             if not line.startswith(">"):
-                return BlockType.PARAGRAPH
-        return BlockType.QUOTE
+                return BlockType.PARAGRAPH, lines
+        return BlockType.QUOTE, lines
     
     # Unordered List: Every line starts with "- "
     if block.startswith("- "):
+        lines = block.split("\n")
         for line in lines:
             if not line.startswith("- "):
-                return BlockType.PARAGRAPH
-        return BlockType.ULIST
+                return BlockType.PARAGRAPH, lines
+        return BlockType.ULIST, lines
     
     # Ordered List: Every line starts with "i. " where i starts at 1 and increments
     if block.startswith("1. "):
-        i = 1
-        for line in lines:
-            if not line.startswith(f"{i}. "):
-                return BlockType.PARAGRAPH
-            i += 1
-        return BlockType.OLIST
+        lines = block.split("\n")
+        for i, line in enumerate(lines, 1):
+            if not line.startswith(_olist_prefix(i)):
+                return BlockType.PARAGRAPH, lines
+        return BlockType.OLIST, lines
     
     # Default
-    return BlockType.PARAGRAPH
+    return BlockType.PARAGRAPH, None
+
+def block_to_block_type(block):
+    return classify_block(block)[0]
 
 def markdown_to_blocks(markdown):
     # Split the document by double newlines
@@ -63,29 +83,68 @@ def markdown_to_blocks(markdown):
     return filtered_blocks
 
 def text_to_children(text):
-    text_nodes = text_to_textnodes(text)
-    children = []
-    for text_node in text_nodes:
-        html_node = text_node_to_html_node(text_node)
-        children.append(html_node)
-    return children
-
-def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
-    children = []
+    with stage("inline parsing"):
+        text_nodes = text_to_textnodes(text)
+        children = []
+        collect = linkindex.collecting()
+        for text_node in text_nodes:
+            if collect and text_node.url is not None:
+                kind = "image" if text_node.text_type == TextType.IMAGE else "link"
+                linkindex.record(kind, text_node.url)
+            html_node = text_node_to_html_node(text_node)
+            children.append(html_node)
+        return children
+
+def block_nodes(blocks, minify=False):
+    # One HTML node per block, going through the block cache when it is enabled.
+    # minify only matters to the cache: other nodes are folded as they are written.
+    cache = blockcache.active()
     for block in blocks:
-        html_node = block_to_html_node(block)
-        children.append(html_node)
-    return ParentNode("div", children, None)
+        if cache is None:
+            yield block_to_html_node(block)
+        else:
+            yield cached_block_to_html_node(block, cache, minify)
+
+def markdown_to_html_node(markdown, minify=False):
+    # Splitting counts as reading, as it does when a page is read from its file
+    with stage("read"):
+        blocks = markdown_to_blocks(markdown)
+    return ParentNode("div", list(block_nodes(blocks, minify)), None)
+
+def markdown_blocks_to_html_node(blocks, minify=False):
+    # Like markdown_to_html_node, but the children are parsed while the tree is
+    # being serialized, so a page can be written block by block. The returned
+    # node can only be serialized once.
+    return ParentNode("div", block_nodes(blocks, minify), None)
+
+def cached_block_to_html_node(block, cache, minify=False):
+    # Identical blocks (an unchanged paragraph, a footer repeated on every page)
+    # are parsed once and then served as pre-rendered HTML
+    key, html, refs = cache.get(block, b"min" if minify else b"")
+    if html is None:
+        linkindex.start_block()
+        try:
+            node = block_to_html_node(block)
+        finally:
+            refs = linkindex.end_block()
+        parts = []
+        node.write_html(parts, minify)
+        html = "".join(parts)
+        cache.put(key, html, refs)
+    else:
+        # Not parsed this time, so replay the links recorded when it was
+        linkindex.replay(refs)
+    return RawHTML(html)
 
 def block_to_html_node(block):
-    block_type = block_to_block_type(block)
+    with stage("block typing"):
+        block_type, lines = classify_block(block)
     if block_type == BlockType.QUOTE:
-        return create_quote_node(block)
+        return create_quote_node(block, lines)
     if block_type == BlockType.ULIST:
-        return create_ulist_node(block)
+        return create_ulist_node(block, lines)
     if block_type == BlockType.OLIST:
-        return create_olist_node(block)
+        return create_olist_node(block, lines)
     if block_type == BlockType.CODE:
         return create_code_node(block)
     if block_type == BlockType.HEADING:
@@ -98,8 +157,7 @@ def block_to_html_node(block):
 
 def create_paragraph_node(block):
     # Join lines by space to ensure multi-line paragraphs render correctly
-    lines = block.split("\n")
-    paragraph = " ".join(lines)
+    paragraph = block.replace("\n", " ")
     children = text_to_children(paragraph)
     return ParentNode("p", children)
 
@@ -115,15 +173,35 @@ def create_heading_node(block):
     children = text_to_children(content)
     return ParentNode(f"h{level}", children)
 
+# A language name after the opening fence (```python, ```c++, ```objective-c);
+# anything else on that line (```def foo():) is the first line of code
+INFO_STRING_PATTERN = re.compile(r"[\w+#.-]+")
+
 def create_code_node(block):
-    content = block[3:-3].strip("\n")
+    content = block[3:-3]
+    # An info string after the opening fence (```python) names the language
+    info, newline, code = content.partition("\n")
+    info = info.strip()
+    if newline and INFO_STRING_PATTERN.fullmatch(info):
+        # The lexers are only compiled by sites that use fenced languages
+        from highlight import highlight, language_name
+
+        content = code.strip("\n")
+        language = language_name(info)
+        if language is not None:
+            code_node = ParentNode("code", [RawHTML(highlight(content, language))], {"class": f"language-{language}"})
+        else:
+            code_node = ParentNode("code", [LeafNode(None, content)], {"class": f"language-{escape(info)}"})
+        return ParentNode("pre", [code_node])
+    content = content.strip("\n")
     # Using LeafNode directly prevents inline parsing!
     code_node = ParentNode("code", [LeafNode(None, content)])
     return ParentNode("pre", [code_node])
 
 
-def create_quote_node(block):
-    lines = block.split("\n")
+def create_quote_node(block, lines=None):
+    if lines is None:
+        lines = block.split("\n")
     new_lines = []
     for line in lines:
         new_lines.append(line.lstrip(">").strip())
@@ -131,8 +209,9 @@ def create_quote_node(block):
     children = text_to_children(content)
     return ParentNode("blockquote", children)
 
-def create_ulist_node(block):
-    lines = block.split("\n")
+def create_ulist_node(block, lines=None):
+    if lines is None:
+        lines = block.split("\n")
     items = []
     for line in lines:
         # Remove the "- " prefix
@@ -141,8 +220,9 @@ def create_ulist_node(block):
         items.append(ParentNode("li", children))
     return ParentNode("ul", items)
 
-def create_olist_node(block):
-    lines = block.split("\n")
+def create_olist_node(block, lines=None):
+    if lines is None:
+        lines = block.split("\n")
     items = []
     for line in lines:
         # Remove the "1. " prefix (find the first space)
@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+
+# Bump when block rendering changes so stale HTML on disk is never reused
+RENDER_VERSION = "3"
+
+# Default memory budget of the in-memory LRU, in characters of HTML. The
+# entry count alone does not bound it: a page of large code blocks would
+# otherwise keep most of its rendered HTML alive until the build ends.
+MAX_BYTES = 8 << 20
+
+# Default size cap of the on-disk store, in characters of HTML. Past it the
+# blocks used least recently are dropped when the store is opened.
+MAX_DISK_BYTES = 256 << 20
+
+class BlockCache:
+    # Rendered HTML per markdown block, keyed by a hash of the block text,
+    # along with the (kind, url) links and images parsing the block recorded.
+    # An LRU bounded by entry count and by max_bytes lives in memory; an
+    # optional SQLite file keeps entries across builds and is shared by
+    # worker processes. Rows from other RENDER_VERSIONs are dropped when it
+    # is opened, and it is kept under max_disk_bytes by last use.
+    def __init__(self, max_entries=10000, path=None, namespace="", max_bytes=MAX_BYTES, max_disk_bytes=MAX_DISK_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.size = 0
+        self.path = path
+        self.namespace = namespace
+        self.salt = f"{RENDER_VERSION}:{namespace}\0".encode()
+        self.entries = OrderedDict()
+        self.pending = []
+        self.pending_size = 0
+        # Keys read from disk, whose last use is recorded with the next flush
+        self.touched = []
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        self._db_pid = None
+
+    def key(self, block, variant=b""):
+        # variant tells apart renderings of the same block (e.g. minified)
+        digest = hashlib.blake2b(self.salt + variant, digest_size=16)
+        digest.update(block.encode())
+        return digest.digest()
+
+    def _connection(self):
+        # One connection per process: a forked worker must not reuse its parent's
+        if self.path is None:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            # Only a persistent cache needs sqlite3, so it is not imported up front
+            import sqlite3
+
+            dir_path = os.path.dirname(self.path)
+            if dir_path != "":
+                os.makedirs(dir_path, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(blocks)")]
+            if columns and "used" not in columns:
+                # Written by an older version without links or last use; it is only a cache
+                self._db.execute("DROP TABLE blocks")
+            # size comes before html so summing it does not read the HTML itself
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS blocks (key BLOB PRIMARY KEY, version TEXT NOT NULL, "
+                "used INTEGER NOT NULL, size INTEGER NOT NULL, html TEXT NOT NULL, refs TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS blocks_used ON blocks (used)")
+            self._db_pid = os.getpid()
+            self.prune()
+        return self._db
+
+    def prune(self):
+        # Drop rows no build of this version can hit, then the least recently
+        # used ones until the store fits in max_disk_bytes
+        db = self._db
+        with db:
+            db.execute("DELETE FROM blocks WHERE version != ?", (RENDER_VERSION,))
+            excess = db.execute("SELECT COALESCE(SUM(size), 0) FROM blocks").fetchone()[0] - self.max_disk_bytes
+            if excess <= 0:
+                return
+            doomed = []
+            for key, size in db.execute("SELECT key, size FROM blocks ORDER BY used"):
+                if excess <= 0:
+                    break
+                doomed.append((key,))
+                excess -= size
+            db.executemany("DELETE FROM blocks WHERE key = ?", doomed)
+
+    def _remember(self, key, html, refs):
+        # A block bigger than the whole budget would only evict everything else
+        if len(html) > self.max_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old[0])
+        self.entries[key] = (html, refs)
+        self.size += len(html)
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            _, (evicted, _) = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def get(self, block, variant=b""):
+        # Returns (key, html, refs); html and refs are None on a miss
+        key = self.key(block, variant)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return key, entry[0], entry[1]
+
+        db = self._connection()
+        if db is not None:
+            row = db.execute("SELECT html, refs FROM blocks WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                refs = tuple(tuple(ref) for ref in json.loads(row[1]))
+                self._remember(key, row[0], refs)
+                self.touched.append(key)
+                self.hits += 1
+                return key, row[0], refs
+        self.misses += 1
+        return key, None, None
+
+    def put(self, key, html, refs=()):
+        refs = tuple(refs)
+        self._remember(key, html, refs)
+        if self.path is not None:
+            self.pending.append((key, len(html), html, json.dumps(refs)))
+            self.pending_size += len(html)
+            # Normally written once per page, but never more than the budget at a time
+            if self.pending_size > self.max_bytes:
+                self.flush()
+
+    def flush(self):
+        # Write new entries and the last use of ones read back to disk in one
+        # transaction (called once per page)
+        if not self.pending and not self.touched:
+            return
+        db = self._connection()
+        used = int(time.time())
+        with db:
+            db.executemany(
+                "INSERT OR REPLACE INTO blocks (key, version, used, size, html, refs) VALUES (?, ?, ?, ?, ?, ?)",
+                [(key, RENDER_VERSION, used, size, html, refs) for key, size, html, refs in self.pending],
+            )
+            db.executemany("UPDATE blocks SET used = ? WHERE key = ?", [(used, key) for key in self.touched])
+        self.pending = []
+        self.pending_size = 0
+        self.touched = []
+
+    def close(self):
+        self.flush()
+        if self._db is not None and self._db_pid == os.getpid():
+            self._db.close()
+        self._db = None
+
+# The cache for this process, or None when block caching is off
+_active = None
+
+def configure(max_entries, path=None, namespace="", max_bytes=MAX_BYTES, max_disk_bytes=MAX_DISK_BYTES):
+    global _active
+    if _active is not None:
+        _active.close()
+    if (max_entries <= 0 or max_bytes <= 0) and path is None:
+        _active = None
+    else:
+        _active = BlockCache(max(max_entries, 1), path, namespace, max_bytes, max_disk_bytes)
+    return _active
+
+def active():
+    return _active
+
+def settings():
+    # What a worker process needs to set up an equivalent cache of its own
+    if _active is None:
+        return (0, None, "", 0, 0)
+    return (_active.max_entries, _active.path, _active.namespace, _active.max_bytes, _active.max_disk_bytes)
+
+def flush():
+    if _active is not None:
+        _active.flush()
@@ -1,16 +1,114 @@
 import os
-import shutil
+from manifest import hash_file, load_manifest, save_manifest
 
-def copy_files_recursive(source_node, dest_node):
+def remove_file(path, dest_dir_path):
+    if os.path.exists(path):
+        os.remove(path)
+
+    # Prune directories that only held the removed file, but never dest_dir_path itself
+    stop = os.path.abspath(dest_dir_path)
+    dir_path = os.path.dirname(os.path.abspath(path))
+    while dir_path != stop and dir_path.startswith(stop + os.sep):
+        if os.listdir(dir_path):
+            break
+        os.rmdir(dir_path)
+        dir_path = os.path.dirname(dir_path)
+
+def is_unchanged(from_path, dest_path, checksum=False, link=False):
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+    from_stat = os.stat(from_path)
+
+    # A hardlink from an earlier build is the source file itself: up to date
+    # when linking, but it has to become a copy again otherwise, or edits to
+    # the output would write through into the source
+    if (from_stat.st_dev, from_stat.st_ino) == (dest_stat.st_dev, dest_stat.st_ino):
+        return link
+    if from_stat.st_size != dest_stat.st_size:
+        return False
+    if checksum:
+        return hash_file(from_path) == hash_file(dest_path)
+    # Same size and same mtime (to the second, like rsync) counts as unchanged
+    return int(from_stat.st_mtime) == int(dest_stat.st_mtime)
+
+def _copy_file_range(from_path, dest_path):
+    # Let the kernel copy (or reflink, on copy-on-write filesystems) the bytes
+    # so they never pass through userspace
+    with open(from_path, "rb") as fsrc, open(dest_path, "wb") as fdst:
+        while os.copy_file_range(fsrc.fileno(), fdst.fileno(), 1 << 30) > 0:
+            pass
+
+def copy_file(from_path, dest_path, link=False):
+    # shutil pulls in fnmatch and the compression modules; a build that copies
+    # nothing never needs it
+    import shutil
+
+    # Never write through an existing dest: it may be a hardlink to the source
+    if os.path.lexists(dest_path):
+        os.remove(dest_path)
+
+    if link:
+        try:
+            os.link(from_path, dest_path)
+            return
+        except OSError:
+            # Cross-device or no hardlink support: fall back to a real copy
+            pass
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            _copy_file_range(from_path, dest_path)
+            shutil.copystat(from_path, dest_path)
+            return
+        except OSError:
+            pass
+    shutil.copy2(from_path, dest_path)
+
+def copy_files_recursive(source_node, dest_node, checksum=False, link=False, written=None):
+    # Copies only new or changed files and returns every destination file it
+    # is responsible for, so the caller can prune the ones that went away;
+    # written, a list, receives the ones actually copied
     if not os.path.exists(dest_node):
         os.mkdir(dest_node)
 
-    for filename in os.listdir(source_node):
+    copied = []
+    for filename in sorted(os.listdir(source_node)):
         from_path = os.path.join(source_node, filename)
         dest_path = os.path.join(dest_node, filename)
-        print(f" * {from_path} -> {dest_path}")
-        
+
         if os.path.isfile(from_path):
-            shutil.copy(from_path, dest_path)
+            copied.append(dest_path)
+            if is_unchanged(from_path, dest_path, checksum, link):
+                continue
+            print(f" * {from_path} -> {dest_path}")
+            copy_file(from_path, dest_path, link)
+            if written is not None:
+                written.append(dest_path)
         else:
-            copy_files_recursive(from_path, dest_path)
\ No newline at end of file
+            copied.extend(copy_files_recursive(from_path, dest_path, checksum, link, written))
+    return copied
+
+def prune_static(static_files, dest_dir_path, manifest_path, manifest=None):
+    # Remove files an earlier build copied whose source has since been deleted.
+    # Only files recorded in the manifest are touched, never generated pages.
+    # Given an already loaded manifest, it is updated in place and saving it
+    # is left to the caller; otherwise it is only saved when the list changed.
+    own = manifest is None
+    if own:
+        manifest = load_manifest(manifest_path)
+    current = set(static_files)
+    removed = 0
+    for dest_path in manifest.get("static", []):
+        if dest_path not in current:
+            print(f"Removing stale asset {dest_path}")
+            remove_file(dest_path, dest_dir_path)
+            removed += 1
+
+    static = sorted(current)
+    if manifest.get("static") != static:
+        manifest["static"] = static
+        if own:
+            save_manifest(manifest_path, manifest)
+    return removed
@@ -0,0 +1,105 @@
+import os
+import random
+
+# Synthetic content for benchmarks. Every shape produces markdown this
+# generator can parse: one h1 title, matched delimiters, blank-line blocks.
+
+WORDS = (
+    "the ring of power was forged in secret by sauron in the fires of mount doom "
+    "elves men dwarves hobbits wizards gondor rohan rivendell lothlorien moria shire"
+).split()
+
+SHAPES = ("small", "huge", "links", "lists", "quotes", "code")
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+def words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+def mixed_paragraph(rng, sentences):
+    parts = []
+    for i in range(sentences):
+        parts.append(f"{words(rng, 8).capitalize()} **{words(rng, 2)}** and _{words(rng, 1)}_ with `{words(rng, 1)}`.")
+        if i % 3 == 0:
+            parts.append(f"See [{words(rng, 2)}](/blog/{rng.choice(WORDS)}) for more.")
+    return "\n".join(parts)
+
+def link_paragraph(rng, links):
+    parts = []
+    for i in range(links):
+        if i % 4 == 0:
+            parts.append(f"![{words(rng, 2)}](/images/{i}.png)")
+        else:
+            parts.append(f"[{words(rng, 2)}](https://example.com/{rng.choice(WORDS)}/{i})")
+    return " ".join(parts)
+
+def unordered_list(rng, items):
+    return "\n".join(f"- {words(rng, 5)} with **{words(rng, 1)}**" for _ in range(items))
+
+def ordered_list(rng, items):
+    return "\n".join(f"{i}. {words(rng, 5)}" for i in range(1, items + 1))
+
+def code_block(rng, lines):
+    body = "\n".join(f"    value_{i} = compute({words(rng, 3).replace(' ', ', ')})  # **not bold**" for i in range(lines))
+    return f"```\ndef generated():\n{body}\n```"
+
+def quote(rng, lines):
+    return "\n".join(f"> {words(rng, 10)}" for _ in range(lines))
+
+def marked_quote(rng, lines):
+    return "\n".join(f"> {words(rng, 6)} **{words(rng, 1)}** {words(rng, 3)}" for _ in range(lines))
+
+def generate_markdown(shape, size, seed=0):
+    # size is roughly the number of blocks on the page
+    rng = random.Random(f"{shape}-{size}-{seed}")
+    blocks = [f"# {words(rng, 4).title()} {seed}"]
+    for i in range(size):
+        if i % 12 == 0:
+            blocks.append(f"## {words(rng, 3).title()}")
+        if shape == "links":
+            blocks.append(link_paragraph(rng, 40))
+        elif shape == "lists":
+            blocks.append(unordered_list(rng, 50) if i % 2 == 0 else ordered_list(rng, 50))
+        elif shape == "quotes":
+            blocks.append(marked_quote(rng, 40) if i % 3 else quote(rng, 60))
+        elif shape == "code":
+            blocks.append(code_block(rng, 60) if i % 2 == 0 else mixed_paragraph(rng, 2))
+        elif i % 7 == 3:
+            blocks.append(quote(rng, 3))
+        elif i % 7 == 5:
+            blocks.append(unordered_list(rng, 5))
+        else:
+            blocks.append(mixed_paragraph(rng, 4))
+    return "\n\n".join(blocks) + "\n"
+
+def generate_corpus(root, shape, pages, size, per_dir=100):
+    # Lays out a complete site (content/, static/, template.html) under root
+    # and returns the total number of markdown bytes written
+    content_dir = os.path.join(root, "content")
+    static_dir = os.path.join(root, "static")
+    os.makedirs(static_dir, exist_ok=True)
+    with open(os.path.join(static_dir, "index.css"), "w") as f:
+        f.write("body { font-family: serif; }\n")
+    with open(os.path.join(root, "template.html"), "w") as f:
+        f.write(TEMPLATE)
+
+    total = 0
+    for page in range(pages):
+        # Spread pages over subdirectories like a real blog/docs tree
+        dir_path = os.path.join(content_dir, f"section{page // per_dir}", f"page{page}")
+        os.makedirs(dir_path, exist_ok=True)
+        markdown = generate_markdown(shape, size, page)
+        with open(os.path.join(dir_path, "index.md"), "w") as f:
+            f.write(markdown)
+        total += len(markdown.encode())
+    return total
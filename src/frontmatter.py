@@ -0,0 +1,75 @@
+import re
+from itertools import chain
+
+# A page may start with a block of "key: value" lines fenced by "---":
+#
+#   ---
+#   title: Tom Bombadil
+#   date: 2024-05-01
+#   tags: tolkien, characters
+#   template: post
+#   draft: true
+#   ---
+#
+# It has to be the first block, so it cannot contain blank lines. This is not
+# YAML: there is no nesting, no multi-line values and no other keys.
+FIELDS = ("title", "date", "tags", "template", "draft")
+
+# ISO dates, optionally with a time; they sort as plain strings
+DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2})?)?")
+
+def is_front_matter(block):
+    return block.startswith("---\n") and block.endswith("\n---")
+
+def parse_front_matter(block):
+    # The fields of a front matter block, or None when block is not one
+    if not is_front_matter(block):
+        return None
+    meta = {}
+    for line in block[4:-4].split("\n"):
+        line = line.strip()
+        if line == "":
+            continue
+        key, sep, value = line.partition(":")
+        key = key.strip().lower()
+        if sep == "" or key not in FIELDS:
+            raise ValueError(f"Invalid front matter line: {line}")
+        meta[key] = parse_value(key, value.strip())
+    return meta
+
+def unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+def parse_value(key, value):
+    if key == "tags":
+        # "a, b" or "[a, b]"
+        if value.startswith("[") and value.endswith("]"):
+            value = value[1:-1]
+        return tuple(tag for tag in (unquote(tag.strip()) for tag in value.split(",")) if tag != "")
+    if key == "draft":
+        lowered = value.lower()
+        if lowered in ("true", "yes"):
+            return True
+        if lowered in ("false", "no", ""):
+            return False
+        raise ValueError(f"Invalid draft value: {value}")
+    value = unquote(value)
+    if key == "date" and not DATE_PATTERN.fullmatch(value):
+        raise ValueError(f"Invalid date (expected YYYY-MM-DD): {value}")
+    return value
+
+def split_front_matter(blocks):
+    # Takes the front matter off a stream of blocks (e.g. markdown_to_blocks
+    # or mdsource.iter_file_blocks) while it is being read, so the file is not
+    # scanned twice. Returns (meta, the remaining blocks); meta is empty
+    # for pages without front matter.
+    blocks = iter(blocks)
+    first = next(blocks, None)
+    if first is None:
+        return {}, blocks
+    meta = parse_front_matter(first)
+    if meta is None:
+        return {}, chain((first,), blocks)
+    return meta, blocks
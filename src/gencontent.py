@@ -1,5 +1,31 @@
 import os
-from block_markdown import markdown_to_html_node
+from collections import namedtuple
+from contextlib import contextmanager
+from block_markdown import (
+    markdown_blocks_to_html_node,
+    block_nodes,
+)
+from htmlnode import ParentNode
+from mdsource import find_title, iter_file_blocks
+from frontmatter import split_front_matter
+from copystatic import remove_file
+from manifest import hash_file, load_manifest, save_manifest
+from template import (
+    load_template,
+    compiled_templates,
+    share_templates,
+    find_templates,
+    select_template,
+    named_template,
+)
+from writer import OutputWriter, ComparingOutput, create_output_dirs
+import profiler
+import blockcache
+import linkindex
+from linkindex import LinkIndex, site_path
+from metaindex import MetadataIndex
+from listings import generate_listing
+from profiler import stage
 
 def extract_title(markdown):
     lines = markdown.split("\n")
@@ -8,40 +34,177 @@ def extract_title(markdown):
             return line[2:].strip()
     raise Exception("No h1 header found in markdown")
 
-def generate_page(from_path, template_path, dest_path, basepath):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    
-    with open(from_path, "r") as f:
-        markdown_content = f.read()
-    
-    with open(template_path, "r") as f:
-        template = f.read()
-
-    # Convert Markdown to HTML string
-    node = markdown_to_html_node(markdown_content)
-    html_content = node.to_html()
-    
-    # Get the title
-    title = extract_title(markdown_content)
-    
-    # Inject into template
-    full_html = template.replace("{{ Title }}", title).replace("{{ Content }}", html_content)
-
-    # Replace relative roots with the basepath
-    full_html = full_html.replace('href="/', f'href="{basepath}')
-    full_html = full_html.replace('src="/', f'src="{basepath}')
-    
-    # Ensure destination directory exists
-    dest_dir_path = os.path.dirname(dest_path)
-    if dest_dir_path != "":
-        os.makedirs(dest_dir_path, exist_ok=True)
-    
-    with open(dest_path, "w") as f:
-        f.write(full_html)
-
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
-    # Iterate over all files and directories in the content path
-    for filename in os.listdir(dir_path_content):
+# Settings every page of a build is rendered with. basepath prefixes site
+# links; minify folds whitespace outside <pre>/<code> as pages are
+# serialized; templates_dir holds per-section layouts and the ones front
+# matter names (see select_template); jobs is the number of worker processes
+# (0 = one per CPU); writers the number of write-behind threads per process
+# (0 = write while rendering); check_links ("warn" or "error") reports
+# links and images that point at nothing the build produced. Every page is
+# written via a temporary file and a rename, whatever the settings.
+BuildOptions = namedtuple(
+    "BuildOptions",
+    ("basepath", "minify", "templates_dir", "jobs", "writers", "check_links"),
+    defaults=("/", False, None, 1, 0, None),
+)
+
+# One page for a worker, and what it reports back: error is None or the
+# failure, profile the page's stage timings when profiling, refs its links
+# and images when they are collected, changed whether the output on disk
+# changed (None while a writer has yet to decide) and meta its front matter
+# and title. template_names is find_templates(options.templates_dir), listed
+# once per build.
+PageTask = namedtuple(
+    "PageTask", ("from_path", "template_path", "dest_path", "options", "profile", "links", "template_names")
+)
+PageResult = namedtuple("PageResult", ("error", "profile", "refs", "changed", "meta"))
+
+def build_options(options):
+    # The original API took the basepath string where BuildOptions now goes
+    if isinstance(options, str):
+        return BuildOptions(basepath=options)
+    return options
+
+# Sources at least this big are streamed even when a writer is configured:
+# write-behind holds whole pages in memory (up to 8 per writer thread)
+STREAM_THRESHOLD = 1 << 20
+
+def generate_page(
+    from_path, template_path, dest_path, options=BuildOptions(), writer=None, make_dirs=True, template_names=None
+):
+    # With a writer (see writer.OutputWriter) the page is rendered to memory
+    # and handed off to be written in the background. make_dirs=False skips
+    # creating the output directory, for callers that already created every
+    # one (generate_pages does, once per build). Large pages (see
+    # STREAM_THRESHOLD) are streamed to disk block by block either way. A
+    # layout named in the page's front matter replaces template_path; it must
+    # be one of template_names (find_templates(options.templates_dir), listed
+    # here when not given). Drafts are not written at all. Returns (changed,
+    # meta): whether the file on disk changed (an identical page is not
+    # rewritten), or None when the writer decides that later, and the page's
+    # front matter plus its title. options may also be a basepath string.
+    options = build_options(options)
+    basepath, minify, templates_dir = options.basepath, options.minify, options.templates_dir
+
+    def layout(meta):
+        # Compiled once per build (and per worker process), not once per page
+        path = template_path
+        name = meta.get("template")
+        if name is not None and templates_dir is not None:
+            names = template_names if template_names is not None else find_templates(templates_dir)
+            path = named_template(templates_dir, name, names)
+        # Logged once the front matter has picked the layout
+        print(f"Generating page from {from_path} to {dest_path} using {path}")
+        return load_template(path, basepath, minify)
+
+    if make_dirs:
+        # Ensure destination directory exists
+        dest_dir_path = os.path.dirname(dest_path)
+        if dest_dir_path != "":
+            os.makedirs(dest_dir_path, exist_ok=True)
+
+    # With --profile the same paths run, their stages timed as they go
+    build_profiler = profiler.active()
+    if build_profiler is not None:
+        build_profiler.start_page(from_path)
+    try:
+        if writer is not None and os.path.getsize(from_path) < STREAM_THRESHOLD:
+            result = generate_page_deferred(from_path, layout, dest_path, writer)
+        else:
+            result = generate_page_streaming(from_path, layout, dest_path)
+    finally:
+        if build_profiler is not None:
+            build_profiler.end_page()
+
+    # Persist any newly rendered blocks in one write per page
+    blockcache.flush()
+    return result
+
+@contextmanager
+def open_page(from_path):
+    # Yields (meta, blocks) for a content file. The front matter comes off the
+    # first block as the blocks are read, and meta["title"] is its title or,
+    # failing that, the first h1.
+    with open(from_path, "rb") as source:
+        with stage("read"):
+            meta, blocks = split_front_matter(iter_file_blocks(source))
+            if meta.get("title") is None:
+                # The title goes into <head>, so find it first; this stops at the h1
+                with open(from_path, "rb") as f:
+                    meta["title"] = find_title(f)
+        yield meta, staged(blocks, "read")
+
+def staged(items, name):
+    # items, with the time spent producing each one counted as stage name.
+    # Reading, parsing and writing a streamed page interleave block by block,
+    # so this is how their stages are told apart. Unchanged without --profile.
+    if profiler.active() is None:
+        return items
+    return _staged(items, name)
+
+def _staged(items, name):
+    items = iter(items)
+    while True:
+        with stage(name):
+            item = next(items, _END)
+        if item is _END:
+            return
+        yield item
+
+_END = object()
+
+class StagedOutput:
+    # An output whose writes count as the "write" stage (profiling only)
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, text):
+        with stage("write"):
+            self.out.write(text)
+
+def page_html_node(blocks, minify):
+    # The page's content node: parsed block by block as it is serialized
+    if profiler.active() is None:
+        return markdown_blocks_to_html_node(blocks, minify)
+    return ParentNode("div", staged(block_nodes(blocks, minify), "parse"), None)
+
+def generate_page_streaming(from_path, layout, dest_path):
+    # Read, parse and write one block at a time: memory stays proportional to
+    # the largest block, not the whole document. The output is compared with
+    # the existing file as it streams, so an unchanged page is never rewritten,
+    # and a changed one only replaces the old file once it is complete: a
+    # parse error halfway through keeps the last good page.
+    with open_page(from_path) as (meta, blocks):
+        if meta.get("draft"):
+            return False, meta
+        template = layout(meta)
+        with ComparingOutput(dest_path) as f:
+            node = page_html_node(blocks, template.minify)
+            out = f if profiler.active() is None else StagedOutput(f)
+            with stage("to_html"):
+                template.write(out, {"Title": meta["title"], "Content": node})
+    return f.changed, meta
+
+def generate_page_deferred(from_path, layout, dest_path, writer):
+    # Render into a list of chunks and let the writer put it on disk while the
+    # next page is parsed; a failed page is never submitted
+    chunks = []
+    with open_page(from_path) as (meta, blocks):
+        if meta.get("draft"):
+            return False, meta
+        template = layout(meta)
+        node = page_html_node(blocks, template.minify)
+        with stage("to_html"):
+            template.write(chunks, {"Title": meta["title"], "Content": node})
+    with stage("write"):
+        # Only the hand-off: with writer threads the disk time overlaps rendering
+        writer.submit(dest_path, chunks)
+    return None, meta
+
+def discover_pages(dir_path_content, dest_dir_path):
+    # Walk the content tree once and pair every markdown file with its output path
+    pages = []
+    for filename in sorted(os.listdir(dir_path_content)):
         from_path = os.path.join(dir_path_content, filename)
         dest_path = os.path.join(dest_dir_path, filename)
 
@@ -50,11 +213,358 @@ def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, bas
             if filename.endswith(".md"):
                 # Change extension from .md to .html
                 new_filename = filename.replace(".md", ".html")
-                dest_html_path = os.path.join(dest_dir_path, new_filename)
-                
-                # Call your existing generate_page function
-                generate_page(from_path, template_path, dest_html_path, basepath)
+                pages.append((from_path, os.path.join(dest_dir_path, new_filename)))
         else:
             # If it's a directory, recurse into it
-            generate_pages_recursive(from_path, template_path, dest_path, basepath)
+            pages.extend(discover_pages(from_path, dest_path))
+    return pages
+
+def _init_worker(cache_settings, templates):
+    # Give every worker process the same block cache setup as the parent, and
+    # the templates it already compiled
+    blockcache.configure(*cache_settings)
+    share_templates(templates)
+
+def _generate_page_task(task, writer=None):
+    # Runs inside a worker: report the failure instead of raising so one bad
+    # page cannot take down the rest of the batch. Returns a PageResult.
+    if task.profile and profiler.active() is None:
+        profiler.enable()
+    if task.links:
+        linkindex.start_page()
+    error = None
+    changed = meta = None
+    try:
+        # generate_pages has created the output directories already
+        changed, meta = generate_page(
+            task.from_path,
+            task.template_path,
+            task.dest_path,
+            task.options,
+            writer,
+            make_dirs=False,
+            template_names=task.template_names,
+        )
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    refs = linkindex.end_page() if task.links else None
+    page_profile = profiler.active().pages.get(task.from_path) if task.profile else None
+    return PageResult(error, page_profile, refs, changed, meta)
+
+def _generate_batch(tasks):
+    # Render a batch of tasks, overlapping disk writes with rendering when
+    # writer threads are configured. Returns one PageResult per task; a page
+    # that rendered but failed to write reports the write error.
+    if not tasks:
+        return []
+    options = tasks[0].options
+    if options.writers == 0:
+        return [_generate_page_task(task) for task in tasks]
+    writer = OutputWriter(options.writers)
+    try:
+        results = [_generate_page_task(task, writer) for task in tasks]
+    finally:
+        write_errors = writer.close()
+    for i, task in enumerate(tasks):
+        error = write_errors.get(task.dest_path)
+        if error is not None:
+            results[i] = results[i]._replace(error=error, changed=False, meta=None)
+        elif results[i].changed is None:
+            results[i] = results[i]._replace(changed=task.dest_path in writer.changed)
+    return results
+
+def generate_pages(pages, template_path, options=BuildOptions(), links=None, written=None, templates=None, metadata=None):
+    # Render (from_path, dest_path) pairs with options (see BuildOptions) and
+    # return {from_path: error} for the failures. links, a LinkIndex,
+    # receives every page's links and images; written, a list, receives the
+    # output paths whose content actually changed; templates maps a source
+    # file to its own layout (see select_template), pages not in it use
+    # template_path; metadata, a MetadataIndex, receives every rendered
+    # page's front matter and title.
+    build_profiler = profiler.active()
+    if templates is None:
+        templates = {}
+    template_names = find_templates(options.templates_dir)
+    tasks = [
+        PageTask(
+            from_path,
+            templates.get(from_path, template_path),
+            dest_path,
+            options,
+            profile=build_profiler is not None,
+            links=links is not None,
+            template_names=template_names,
+        )
+        for from_path, dest_path in pages
+    ]
+    jobs = options.jobs or os.cpu_count() or 1
+
+    # Every output directory is created once here, not once per page
+    create_output_dirs(dest_path for _, dest_path in pages)
+
+    errors = {}
+
+    def collect(task, result):
+        if result.error is not None:
+            errors[task.from_path] = result.error
+        if result.refs is not None:
+            links.add_page(task.from_path, result.refs)
+        if result.changed and written is not None:
+            written.append(task.dest_path)
+        if result.meta is not None and metadata is not None:
+            metadata.add(task.from_path, task.dest_path, result.meta)
+
+    if jobs == 1 or len(tasks) <= 1:
+        for task, result in zip(tasks, _generate_batch(tasks)):
+            collect(task, result)
+    else:
+        # Imported here: multiprocessing is the slowest import of a build, and
+        # most incremental builds render too few pages to use it
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Hand each worker a few batches so the pool stays busy without paying IPC per page
+        size = max(1, len(tasks) // (jobs * 4))
+        batches = [tasks[i:i + size] for i in range(0, len(tasks), size)]
+        # Each layout is compiled once here and shipped to the workers, not once per worker
+        shared = compiled_templates(
+            sorted({task.template_path for task in tasks}), options.basepath, options.minify
+        )
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(blockcache.settings(), shared)
+        ) as executor:
+            for batch, results in zip(batches, executor.map(_generate_batch, batches)):
+                for task, result in zip(batch, results):
+                    if result.profile is not None:
+                        build_profiler.add_page(task.from_path, result.profile)
+                    collect(task, result)
+
+    for from_path, error in errors.items():
+        print(f"Error generating page from {from_path}: {error}")
+    return errors
+
+def assign_templates(pages, dir_path_content, template_path, templates_dir):
+    # {from_path: layout} for every page, see select_template
+    names = find_templates(templates_dir)
+    return {
+        from_path: select_template(from_path, dir_path_content, template_path, templates_dir, names)
+        for from_path, _ in pages
+    }
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, options=BuildOptions()):
+    # options may also be a basepath string, as in the original API
+    options = build_options(options)
+    pages = discover_pages(dir_path_content, dest_dir_path)
+    templates = assign_templates(pages, dir_path_content, template_path, options.templates_dir)
+    metadata = MetadataIndex()
+    errors = generate_pages(pages, template_path, options, templates=templates, metadata=metadata)
+    for from_path, dest_path in pages:
+        meta = metadata.get(from_path)
+        if meta is not None and meta["draft"]:
+            # Drafts are not written, but their directory was already created
+            remove_file(dest_path, dest_dir_path)
+    if errors:
+        raise Exception(f"Failed to generate {len(errors)} page(s)")
+
+def remove_output(dest_path, dest_dir_path):
+    print(f"Removing stale page {dest_path}")
+    remove_file(dest_path, dest_dir_path)
+
+def generate_pages_incremental(dir_path_content, template_path, dest_dir_path, manifest_path, options=BuildOptions(), changed=None, listings=(), written=None, manifest=None):
+    # Renders the pages whose source or layout changed since the build that
+    # wrote the manifest, with options (see BuildOptions). changed, when
+    # given, is the set of paths known to have been touched since the
+    # manifest was written (e.g. from a file watcher); other pages reuse
+    # their recorded hash instead of being read again. Pages without a
+    # section or front matter layout use template_path. Drafts are not
+    # published. Every page's front matter and title end up in the
+    # manifest's metadata index, from which every listings.Listing in
+    # listings gets its index pages and feeds. written, a list, receives the
+    # outputs whose content changed. manifest, when given, is the build's
+    # already loaded manifest: it is updated in place and the caller saves it.
+    basepath, minify, templates_dir = options.basepath, options.minify, options.templates_dir
+    check_links = options.check_links
+    old_manifest = load_manifest(manifest_path) if manifest is None else manifest
+    old_pages = old_manifest["pages"]
+    old_templates = old_manifest["templates"]
+    old_index = MetadataIndex.from_json(old_manifest.get("index", {}))
+    metadata = MetadataIndex()
+    template_hashes = {}
+
+    def template_hash(path):
+        # Hashed once per build however many pages share it
+        if path not in template_hashes:
+            template_hashes[path] = hash_file(path) if os.path.isfile(path) else None
+        return template_hashes[path]
+
+    # The basepath, the minify setting and the renderer itself feed into
+    # every page, so a change to any of them rebuilds everything; a layout
+    # only affects the pages using it
+    rebuild_all = (
+        old_manifest["basepath"] != basepath
+        or old_manifest.get("minify", False) != minify
+        or old_manifest.get("render") != blockcache.RENDER_VERSION
+    )
+
+    # Links of pages that are not re-rendered come from the last build
+    old_links = old_manifest.get("links", {}) if check_links else {}
+    links = LinkIndex() if check_links else None
+
+    pages = discover_pages(dir_path_content, dest_dir_path)
+    templates = assign_templates(pages, dir_path_content, template_path, templates_dir)
+    new_pages = {}
+    stale = []
+    for from_path, dest_path in pages:
+        old_entry = old_pages.get(from_path)
+        if changed is not None and from_path not in changed and old_entry and old_entry["hash"]:
+            source_hash = old_entry["hash"]
+        else:
+            source_hash = hash_file(from_path)
+        # The front matter of an unchanged source still names the same layout
+        old_meta = old_index.get(from_path)
+        if old_meta is not None and old_entry and old_entry["hash"] == source_hash and "template" in old_meta:
+            templates[from_path] = select_template(
+                from_path, dir_path_content, template_path, templates_dir, name=old_meta["template"]
+            )
+        page_template = templates[from_path]
+        entry = {"dest": dest_path, "hash": source_hash, "template": page_template}
+        new_pages[from_path] = entry
+
+        # Skip pages whose source and layout are unchanged and whose output is
+        # still on disk, or which are drafts (and whose metadata is known, as
+        # are their links when checking them)
+        if (
+            not rebuild_all
+            and old_entry == entry
+            and old_meta is not None
+            and template_hash(page_template) is not None
+            and old_templates.get(page_template) == template_hash(page_template)
+            and (old_meta["draft"] or os.path.exists(dest_path))
+            and (not check_links or from_path in old_links)
+        ):
+            metadata.add(from_path, dest_path, old_meta)
+            if check_links:
+                links.add_page(from_path, [tuple(ref) for ref in old_links[from_path]])
+            continue
+        stale.append((from_path, dest_path))
+
+    if written is None:
+        written = []
+    already_written = len(written)
+    errors = generate_pages(
+        stale, template_path, options, links=links, written=written, templates=templates, metadata=metadata
+    )
+    for from_path in errors:
+        # Forget the hash of failed pages so the next build retries them
+        new_pages[from_path]["hash"] = None
+        if links is not None:
+            links.pages.pop(from_path, None)
+
+    rendered = len(stale) - len(errors)
+    for from_path, dest_path in stale:
+        meta = metadata.get(from_path)
+        if meta is None:
+            continue
+        if "template" in meta:
+            # Layouts named in front matter are dependencies like section ones
+            new_pages[from_path]["template"] = select_template(
+                from_path, dir_path_content, template_path, templates_dir, name=meta["template"]
+            )
+        if meta["draft"]:
+            rendered -= 1
+            if os.path.exists(dest_path):
+                # Published before it was turned back into a draft
+                remove_output(dest_path, dest_dir_path)
+            else:
+                # Its directory was created before the front matter was read;
+                # left empty it would still give the slug away
+                remove_file(dest_path, dest_dir_path)
+    drafts = {
+        from_path for from_path, draft in zip(metadata.columns["path"], metadata.columns["draft"]) if draft
+    }
+
+    # Delete outputs whose source markdown is gone (or now renders somewhere else)
+    removed = 0
+    for from_path, entry in old_pages.items():
+        new_entry = new_pages.get(from_path)
+        if new_entry is None or new_entry["dest"] != entry["dest"]:
+            remove_output(entry["dest"], dest_dir_path)
+            removed += 1
+
+    # Listings are regenerated from the index on every build; when no post
+    # changed their outputs are identical and left alone
+    listed = []
+    for listing in listings:
+        listed.extend(
+            generate_listing(
+                listing,
+                metadata,
+                new_pages,
+                dir_path_content,
+                dest_dir_path,
+                template_path,
+                basepath=basepath,
+                minify=minify,
+                written=written,
+            )
+        )
+    for dest_path in old_manifest.get("listings", []):
+        if dest_path not in listed:
+            remove_output(dest_path, dest_dir_path)
+
+    broken = []
+    if links is not None:
+        served = old_manifest.get("static", []) + listed
+        broken = check_page_links(links, new_pages, set(errors) | drafts, served, dest_dir_path)
+
+    layouts = {}
+    for entry in new_pages.values():
+        digest = template_hash(entry["template"])
+        if digest is not None:
+            layouts[entry["template"]] = digest
+
+    # Keep sections other stages own (e.g. the static file list)
+    new_manifest = dict(
+        old_manifest,
+        templates=layouts,
+        basepath=basepath,
+        minify=minify,
+        render=blockcache.RENDER_VERSION,
+        pages=new_pages,
+        index=metadata.to_json(),
+        listings=listed,
+    )
+    if links is not None:
+        new_manifest["links"] = links.pages
+    else:
+        # Unchecked builds leave nothing to reuse; the next check re-renders
+        new_manifest.pop("links", None)
+    if manifest is None:
+        save_manifest(manifest_path, new_manifest)
+    else:
+        manifest.clear()
+        manifest.update(new_manifest)
+    # Rendered pages identical to the file on disk were left alone; only the
+    # written ones (and the removed ones) need shipping
+    print(
+        f"{rendered} page(s) rendered, {len(written) - already_written} changed on disk, "
+        f"{len(new_pages) - len(stale)} up to date, {removed} removed, {len(drafts)} draft(s)"
+    )
+    if errors:
+        raise Exception(f"Failed to generate {len(errors)} page(s)")
+    if broken and check_links == "error":
+        raise Exception(f"Found {len(broken)} broken link(s)")
+    return rendered, removed
+
+def check_page_links(links, pages, unpublished, served, dest_dir_path):
+    # Everything the site serves: the rendered pages (less the failed ones and
+    # drafts) plus the other outputs (copied static files, listings)
+    known = {site_path(path, dest_dir_path) for path in served}
+    for from_path, entry in pages.items():
+        if from_path not in unpublished:
+            known.add(site_path(entry["dest"], dest_dir_path))
 
+    dests = {from_path: entry["dest"] for from_path, entry in pages.items()}
+    broken = links.broken(dests, known, dest_dir_path)
+    for from_path, kind, url in broken:
+        print(f"Broken {kind} in {from_path}: {url}")
+    return broken
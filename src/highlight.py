@@ -0,0 +1,155 @@
+import re
+import hashlib
+from collections import OrderedDict
+from html import escape
+
+# Build-time syntax highlighting for fenced code blocks (```python). Each
+# language is a single regex of named alternatives: at every position the
+# leftmost match wins, so a "#" inside a string stays part of the string.
+# Words are matched once as "name" and looked up in the language's word
+# table (keyword, builtin), which is much cheaper than trying every keyword
+# at every position. Tokens are written as <span class="tok-KIND">,
+# everything else as escaped text; the stylesheet decides the colours.
+
+class Lexer:
+    def __init__(self, rules, **words):
+        rules = rules + (("name", r"[A-Za-z_]\w*"),)
+        self.pattern = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in rules))
+        self.words = {word: kind for kind, names in words.items() for word in names.split()}
+
+DOUBLE_QUOTED = r'"(?:\\.|[^"\\\n])*"'
+SINGLE_QUOTED = r"'(?:\\.|[^'\\\n])*'"
+NUMBER = r"(?:0[xX][0-9a-fA-F_]+|0[oObB][0-7_]+|\d[\d_]*(?:\.\d[\d_]*)?(?:[eE][+-]?\d+)?)\b"
+
+LEXERS = {
+    "python": Lexer(
+        (
+            ("comment", r"#[^\n]*"),
+            ("string", r"(?:\b[rRbBuUfF]{1,2})?(?:\"\"\"[\s\S]*?\"\"\"|'''[\s\S]*?'''|" + DOUBLE_QUOTED + "|" + SINGLE_QUOTED + ")"),
+            ("decorator", r"@[\w.]+"),
+            ("number", NUMBER),
+        ),
+        keyword="False None True and as assert async await break class continue def del elif else "
+        "except finally for from global if import in is lambda nonlocal not or pass raise "
+        "return try while with yield match case",
+        builtin="print len range str int float bool list dict set tuple open isinstance "
+        "enumerate zip map filter sorted min max sum super self cls",
+    ),
+    "javascript": Lexer(
+        (
+            ("comment", r"//[^\n]*|/\*[\s\S]*?\*/"),
+            ("string", DOUBLE_QUOTED + "|" + SINGLE_QUOTED + r"|`(?:\\.|[^`\\])*`"),
+            ("number", NUMBER),
+        ),
+        keyword="async await break case catch class const continue debugger default delete do else "
+        "export extends finally for from function if import in instanceof let new of return "
+        "static super switch this throw try typeof var void while with yield",
+        builtin="true false null undefined NaN Infinity console window document",
+    ),
+    "go": Lexer(
+        (
+            ("comment", r"//[^\n]*|/\*[\s\S]*?\*/"),
+            ("string", DOUBLE_QUOTED + r"|`[^`]*`|'(?:\\.|[^'\\\n])+'"),
+            ("number", NUMBER),
+        ),
+        keyword="break case chan const continue default defer else fallthrough for func go goto if "
+        "import interface map package range return select struct switch type var",
+        builtin="true false nil iota append cap close copy delete len make new panic print println "
+        "recover bool byte error float32 float64 int int32 int64 rune string uint uint8",
+    ),
+    "bash": Lexer(
+        (
+            ("comment", r"(?<![\w$])#[^\n]*"),
+            ("string", DOUBLE_QUOTED + r"|'[^']*'"),
+            ("variable", r"\$(?:\{[^}\n]*\}|\w+|[@#?$!*-])"),
+        ),
+        keyword="if then else elif fi for while until do done case esac in function return "
+        "local export readonly select",
+        builtin="echo cd exit set unset source test read printf shift trap eval exec",
+    ),
+    "json": Lexer(
+        (
+            ("key", DOUBLE_QUOTED + r"(?=\s*:)"),
+            ("string", DOUBLE_QUOTED),
+            ("number", r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b"),
+        ),
+        builtin="true false null",
+    ),
+}
+
+ALIASES = {
+    "py": "python",
+    "python3": "python",
+    "js": "javascript",
+    "mjs": "javascript",
+    "golang": "go",
+    "sh": "bash",
+    "shell": "bash",
+    "zsh": "bash",
+}
+
+def language_name(info):
+    # The language of an info string ("python", "js" -> "javascript"), or
+    # None when there is no lexer for it
+    name = info.strip().lower()
+    name = ALIASES.get(name, name)
+    return name if name in LEXERS else None
+
+def tokenize(code, language):
+    # (kind, text) pairs covering all of code; kind is None for plain text,
+    # which is kept in as few pieces as possible
+    lexer = LEXERS[language]
+    words = lexer.words
+    tokens = []
+    start = 0
+    for match in lexer.pattern.finditer(code):
+        kind = match.lastgroup
+        if kind == "name":
+            kind = words.get(match.group())
+            if kind is None:
+                continue
+        if match.start() > start:
+            tokens.append((None, code[start:match.start()]))
+        tokens.append((kind, match.group()))
+        start = match.end()
+    if start < len(code):
+        tokens.append((None, code[start:]))
+    return tokens
+
+def _highlight(code, language):
+    parts = []
+    for kind, text in tokenize(code, language):
+        if kind is None:
+            parts.append(escape(text, quote=False))
+        else:
+            parts.append(f'<span class="tok-{kind}">{escape(text, quote=False)}</span>')
+    return "".join(parts)
+
+# The same snippet (an install command, a config example) tends to appear on
+# many pages, so its markup is kept: hash of (language, code) -> HTML
+HIGHLIGHT_CACHE_SIZE = 2048
+_cache = OrderedDict()
+_stats = {"hits": 0, "misses": 0}
+
+def highlight(code, language):
+    # The code as escaped HTML with its tokens wrapped in spans; language
+    # must be one of LEXERS (see language_name)
+    digest = hashlib.blake2b(language.encode() + b"\0" + code.encode(), digest_size=16).digest()
+    html = _cache.get(digest)
+    if html is not None:
+        _cache.move_to_end(digest)
+        _stats["hits"] += 1
+        return html
+    _stats["misses"] += 1
+    html = _highlight(code, language)
+    _cache[digest] = html
+    if len(_cache) > HIGHLIGHT_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return html
+
+def cache_stats():
+    return dict(_stats, entries=len(_cache))
+
+def clear_cache():
+    _cache.clear()
+    _stats["hits"] = _stats["misses"] = 0
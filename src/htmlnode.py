@@ -1,4 +1,37 @@
+import re
+
+# Elements whose text is shown as written, so minifying never touches it
+RAW_TEXT_TAGS = frozenset(("pre", "code", "textarea", "script", "style"))
+
+# Runs of HTML whitespace that are not already a single space. Only ASCII
+# whitespace collapses in HTML; a no-break space must survive.
+WHITESPACE_PATTERN = re.compile(r"[ \t\n\r\f]{2,}|[\t\n\r\f]")
+
+def needs_folding(text):
+    # Most text has nothing to fold. Substring checks run at memchr speed;
+    # WHITESPACE_PATTERN.search, one pass but character by character, was
+    # measured 25x slower on a paragraph and 2-4x slower per page.
+    return "  " in text or "\n" in text or "\t" in text or "\r" in text or "\f" in text
+
+def fold_whitespace(text):
+    # Browsers render any run of whitespace in flowing text as one space
+    if needs_folding(text):
+        return WHITESPACE_PATTERN.sub(" ", text)
+    return text
+
+def _writer(out):
+    # Fragments can go into a plain list, a write(fragment) callable or
+    # anything with a write() method such as an open file
+    if isinstance(out, list):
+        return out.append
+    if callable(out):
+        return out
+    return out.write
+
 class HTMLNode:
+    # Slots instead of a per-instance __dict__: a full build creates millions of nodes
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         # A string representing the HTML tag name (e.g. "p", "a", "h1", etc.)
         self.tag = tag
@@ -12,20 +45,28 @@ class HTMLNode:
         
     def to_html(self):
         raise NotImplementedError("to_html method not implemented")
+
+    def write_html(self, out, minify=False):
+        # Stream the HTML into a list of fragments or a file without building
+        # the whole document as one string first. minify folds whitespace in
+        # text as it is written, except inside RAW_TEXT_TAGS.
+        self._write(_writer(out), fold_whitespace if minify else None)
+
+    def _write(self, write, fold=None):
+        # Nodes that only know how to build a string still stream correctly
+        write(self.to_html())
     
     def props_to_html(self):
         if not self.props:
             return ""
-        
-        props_html = ""
-        for key, value in self.props.items():
-            props_html += f' {key}="{value}"'
-        return props_html
+        return "".join(f' {key}="{value}"' for key, value in self.props.items())
     
     def __repr__(self):
         return f"HTMLNode({self.tag}, {self.value}, children: {self.children}, {self.props})"
     
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
     
@@ -35,25 +76,67 @@ class LeafNode(HTMLNode):
         if self.tag is None:
             return self.value
         return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+
+    def _write(self, write, fold=None):
+        # Same output as to_html, with the text folded when minifying
+        value = self.value
+        if value is None:
+            raise ValueError("Invalid HTML: no value")
+        # The guard is fold_whitespace's, inlined: a call per text leaf was
+        # most of what minifying cost
+        if (
+            fold is not None
+            and ("  " in value or "\n" in value or "\t" in value or "\r" in value or "\f" in value)
+            and self.tag not in RAW_TEXT_TAGS
+        ):
+            value = fold(value)
+        if self.tag is None:
+            write(value)
+        else:
+            write(f"<{self.tag}{self.props_to_html()}>{value}</{self.tag}>")
     
     def __repr__(self):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
 
+class RawHTML(LeafNode):
+    # Markup that is already serialized (e.g. a cached block): written as is,
+    # since it was minified, or not, when it was rendered
+    __slots__ = ()
+
+    def __init__(self, html):
+        super().__init__(None, html)
+
+    def _write(self, write, fold=None):
+        write(self.value)
+
+    def __repr__(self):
+        return f"RawHTML({self.value})"
+
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
     
     def to_html(self):
+        # Collect every fragment of the subtree and join once at the end
+        parts = []
+        self._write(parts.append)
+        return "".join(parts)
+
+    def _write(self, write, fold=None):
         if self.tag is None:
             raise ValueError("Invalid HTML: no tag")
         if self.children is None: # Only error if children is LITERALLY None
             raise ValueError("Invalid HTML: no children")
         
         # An empty list [] should NOT raise an error; it just loops zero times
-        children_html = ""
+        if self.tag in RAW_TEXT_TAGS:
+            fold = None
+        write(f"<{self.tag}{self.props_to_html()}>")
         for child in self.children:
-            children_html += child.to_html()
-        return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>"
+            child._write(write, fold)
+        write(f"</{self.tag}>")
 
     def __repr__(self):
         return f"ParentNode({self.tag}, children: {self.children}, {self.props})"
\ No newline at end of file
@@ -30,25 +30,25 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
         
     return new_nodes
 
+# Compiled once at import rather than looked up in re's cache on every call.
+# Regex breakdown:
+# !\[      -> matches the literal '!['
+# (.*?)    -> non-greedy capture group for the alt text
+# \]       -> matches the literal ']'
+# \(       -> matches the literal '('
+# (.*?)    -> non-greedy capture group for the URL
+# \)       -> matches the literal ')'
+IMAGE_PATTERN = re.compile(r"!\[(.*?)\]\((.*?)\)")
+# Same as above, but without the leading '!'
+# We use a negative lookbehind (?<!!) to ensure we don't accidentally
+# match an image as a link.
+LINK_PATTERN = re.compile(r"(?<!!)\[(.*?)\]\((.*?)\)")
+
 def extract_markdown_images(text):
-    # Regex breakdown:
-    # !\[      -> matches the literal '!['
-    # (.*?)    -> non-greedy capture group for the alt text
-    # \]       -> matches the literal ']'
-    # \(       -> matches the literal '('
-    # (.*?)    -> non-greedy capture group for the URL
-    # \)       -> matches the literal ')'
-    pattern = r"!\[(.*?)\]\((.*?)\)"
-    matches = re.findall(pattern, text)
-    return matches
+    return IMAGE_PATTERN.findall(text)
 
 def extract_markdown_links(text):
-    # Same as above, but without the leading '!'
-    # We use a negative lookbehind (?<!!) to ensure we don't accidentally
-    # match an image as a link.
-    pattern = r"(?<!!)\[(.*?)\]\((.*?)\)"
-    matches = re.findall(pattern, text)
-    return matches
+    return LINK_PATTERN.findall(text)
 
 def split_nodes_image(old_nodes):
     new_nodes = []
@@ -106,12 +106,66 @@ def split_nodes_link(old_nodes):
             
     return new_nodes
 
+# Delimiters in the order the split_nodes_* passes used to apply them
+INLINE_DELIMITERS = (
+    ("**", TextType.BOLD),
+    ("*", TextType.ITALIC),
+    ("_", TextType.ITALIC),
+    ("`", TextType.CODE),
+)
+def _scan_links(text, nodes):
+    start = 0
+    for match in LINK_PATTERN.finditer(text):
+        if match.start() > start:
+            nodes.append(TextNode(text[start:match.start()], TextType.PLAIN))
+        nodes.append(TextNode(match.group(1), TextType.LINK, match.group(2)))
+        start = match.end()
+    if start < len(text):
+        nodes.append(TextNode(text[start:], TextType.PLAIN))
+
+def _scan_images(text, nodes):
+    # Slice around each match instead of re-splitting the remaining text,
+    # which made the old image/link passes quadratic in the number of matches
+    start = 0
+    for match in IMAGE_PATTERN.finditer(text):
+        if match.start() > start:
+            _scan_links(text[start:match.start()], nodes)
+        nodes.append(TextNode(match.group(1), TextType.IMAGE, match.group(2)))
+        start = match.end()
+    if start < len(text):
+        _scan_links(text[start:], nodes)
+
+def _scan_delimited(text, level, nodes):
+    if level == len(INLINE_DELIMITERS):
+        _scan_images(text, nodes)
+        return
+
+    delimiter, text_type = INLINE_DELIMITERS[level]
+    # An odd number of delimiters means one is unmatched
+    if text.count(delimiter) % 2 != 0:
+        raise ValueError(f"Invalid markdown: matching {delimiter} not found")
+
+    # Plain sections go down to the next delimiter; delimited ones are finished nodes
+    size = len(delimiter)
+    start = 0
+    inside = False
+    while True:
+        end = text.find(delimiter, start)
+        if end == -1:
+            end = len(text)
+        if end > start:
+            if inside:
+                nodes.append(TextNode(text[start:end], text_type))
+            else:
+                _scan_delimited(text[start:end], level + 1, nodes)
+        if end == len(text):
+            break
+        inside = not inside
+        start = end + size
+
 def text_to_textnodes(text):
-    nodes = [TextNode(text, TextType.PLAIN)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC) # Add this line
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
-    return nodes
\ No newline at end of file
+    # One left-to-right scan per delimiter level, producing the same nodes as
+    # chaining split_nodes_delimiter, split_nodes_image and split_nodes_link
+    nodes = []
+    _scan_delimited(text, 0, nodes)
+    return nodes
@@ -0,0 +1,103 @@
+import os
+import posixpath
+
+# References of the page being parsed in this process, or None when not collecting
+_page_refs = None
+# References of the block being parsed for the block cache, or None
+_block_refs = None
+
+def start_page():
+    global _page_refs
+    _page_refs = []
+
+def end_page():
+    # Returns the page's references as (kind, url) pairs in document order
+    global _page_refs
+    refs, _page_refs = _page_refs, None
+    return refs
+
+def collecting():
+    return _page_refs is not None or _block_refs is not None
+
+def record(kind, url):
+    if _block_refs is not None:
+        _block_refs.append((kind, url))
+    elif _page_refs is not None:
+        _page_refs.append((kind, url))
+
+def start_block():
+    # Collect the references of one block, whether or not a page is being
+    # collected, so the block cache can keep them with the block's HTML
+    global _block_refs
+    _block_refs = []
+
+def end_block():
+    # Returns the block's references, passing them on to the page as well
+    global _block_refs
+    refs, _block_refs = _block_refs, None
+    replay(refs)
+    return refs
+
+def replay(refs):
+    # Record the references of a block that was not parsed this time
+    if _page_refs is not None:
+        _page_refs.extend(refs)
+
+def site_path(path, dest_dir_path):
+    # docs/blog/tom/index.html -> /blog/tom/index.html
+    return "/" + os.path.relpath(path, dest_dir_path).replace(os.sep, "/")
+
+def resolve(url, page_path):
+    # The site path a reference points at, or None for external URLs and
+    # same-page anchors. page_path is the site path of the referring page.
+    # urllib is imported only by builds that check links.
+    from urllib.parse import urlsplit, unquote
+
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc:
+        return None
+    path = unquote(parts.path)
+    if path == "":
+        return None
+    if not path.startswith("/"):
+        path = posixpath.join(posixpath.dirname(page_path), path)
+    resolved = posixpath.normpath(path)
+    if path.endswith("/") and resolved != "/":
+        resolved += "/"
+    return resolved
+
+def candidates(path):
+    # "/blog/tom" and "/blog/tom/" are both served by /blog/tom/index.html
+    if path.endswith("/"):
+        return (path + "index.html",)
+    return (path, path + "/index.html")
+
+class LinkIndex:
+    # Every internal reference of the site, gathered while pages are parsed
+    # (see record) instead of by crawling the output afterwards
+    def __init__(self):
+        self.pages = {}
+
+    def add_page(self, from_path, refs):
+        self.pages[from_path] = refs
+
+    def broken(self, dests, known, dest_dir_path):
+        # dests maps a source file to its output path; known is the set of
+        # site paths the build produced (pages and static files). Returns
+        # (from_path, kind, url) for every reference that matches nothing.
+        # A miss is double-checked on disk, which is the only time the
+        # output directory is touched.
+        missing = []
+        for from_path, refs in sorted(self.pages.items()):
+            page_path = site_path(dests[from_path], dest_dir_path)
+            for kind, url in refs:
+                target = resolve(url, page_path)
+                if target is None:
+                    continue
+                paths = candidates(target)
+                if any(path in known for path in paths):
+                    continue
+                if any(os.path.isfile(os.path.join(dest_dir_path, path.lstrip("/"))) for path in paths):
+                    continue
+                missing.append((from_path, kind, url))
+        return missing
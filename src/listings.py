@@ -0,0 +1,162 @@
+import os
+import re
+from html import escape
+from linkindex import site_path
+from template import load_template
+from writer import ComparingOutput, write_output
+
+class Listing:
+    # A section of the content tree (e.g. content/blog) whose posts get
+    # paginated index pages (blog/index.html, blog/page/2/index.html, ...)
+    # plus Atom and RSS feeds (blog/atom.xml, blog/rss.xml). Posts come from
+    # the build's metadata index, newest first; only dated ones are in the
+    # feeds. Feeds need absolute links, so they are only written when
+    # site_url (e.g. "https://example.com") is set.
+    def __init__(self, section, title, page_size=10, feed_size=20, site_url=""):
+        self.section = section
+        self.title = title
+        self.page_size = page_size
+        self.feed_size = feed_size
+        self.site_url = site_url.rstrip("/")
+
+def page_url(dest_path, dest_dir_path):
+    # docs/blog/tom/index.html -> /blog/tom/
+    path = site_path(dest_path, dest_dir_path)
+    if path.endswith("/index.html"):
+        return path[:-len("index.html")]
+    return path
+
+def index_page_path(section_dest, number):
+    if number == 1:
+        return os.path.join(section_dest, "index.html")
+    return os.path.join(section_dest, "page", str(number), "index.html")
+
+def generate_listing(listing, metadata, pages, dir_path_content, dest_dir_path, template_path, basepath, minify=False, written=None):
+    # Writes the section's index pages and feeds and returns their paths.
+    # pages is the manifest's {from_path: entry} of this build, which says
+    # which layout rendered each post. Memory stays at one index page or one
+    # post at a time, whatever the number of posts; unchanged outputs are not
+    # rewritten, and written receives the ones that changed.
+    section_dest = os.path.join(dest_dir_path, os.path.relpath(listing.section, dir_path_content))
+    rows = metadata.select(listing.section)
+    outputs = []
+
+    count = max(1, -(-len(rows) // listing.page_size))
+    index_paths = [index_page_path(section_dest, number) for number in range(1, count + 1)]
+    taken = {entry["dest"] for entry in pages.values()}.intersection(index_paths)
+    if taken:
+        # A hand-written index (e.g. content/blog/index.md) wins over the generated one
+        print(f"Not generating the index of {listing.section}: {min(taken)} is rendered from a page")
+        index_paths = []
+    template = load_template(template_path, basepath, minify) if index_paths else None
+    for number, dest_path in enumerate(index_paths, 1):
+        page_rows = rows[(number - 1) * listing.page_size:number * listing.page_size]
+        title = listing.title if number == 1 else f"{listing.title} (page {number})"
+        content = index_page_content(metadata, page_rows, number, count, section_dest, dest_dir_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        if write_output(dest_path, [template.render({"Title": title, "Content": content})]) and written is not None:
+            written.append(dest_path)
+        outputs.append(dest_path)
+
+    if listing.site_url:
+        # Both feeds are written in one pass so each post is read back once
+        entries = [row for row in rows if metadata.columns["date"][row]][:listing.feed_size]
+        atom_path = os.path.join(section_dest, "atom.xml")
+        rss_path = os.path.join(section_dest, "rss.xml")
+        os.makedirs(section_dest, exist_ok=True)
+        with ComparingOutput(atom_path) as atom, ComparingOutput(rss_path) as rss:
+            write_feeds(atom, rss, listing, metadata, entries, pages, section_dest, dest_dir_path, basepath, minify)
+        for dest_path, out in ((atom_path, atom), (rss_path, rss)):
+            if out.changed and written is not None:
+                written.append(dest_path)
+            outputs.append(dest_path)
+    print(f"Listed {len(rows)} page(s) of {listing.section} on {len(index_paths)} index page(s)")
+    return outputs
+
+def index_page_content(metadata, rows, number, count, section_dest, dest_dir_path):
+    # Links are site-root relative; the template rewrites them for the basepath
+    parts = ['<ul class="posts">']
+    for row in rows:
+        url = page_url(metadata.columns["dest"][row], dest_dir_path)
+        item = f'<li><a href="{url}">{escape(metadata.columns["title"][row] or "")}</a>'
+        date = metadata.columns["date"][row]
+        if date:
+            item += f' <time datetime="{date}">{date[:10]}</time>'
+        parts.append(item + "</li>")
+    parts.append("</ul>")
+    links = []
+    if number > 1:
+        links.append(f'<a rel="prev" href="{page_url(index_page_path(section_dest, number - 1), dest_dir_path)}">Newer posts</a>')
+    if number < count:
+        links.append(f'<a rel="next" href="{page_url(index_page_path(section_dest, number + 1), dest_dir_path)}">Older posts</a>')
+    if links:
+        parts.append('<nav class="pagination">' + " ".join(links) + "</nav>")
+    return "\n".join(parts)
+
+def post_content(entry, basepath, minify):
+    # A post's HTML as this build already rendered it: read back from its
+    # output and cut out of the layout, instead of parsing the markdown again
+    try:
+        with open(entry["dest"], "r") as f:
+            html = f.read()
+        return load_template(entry["template"], basepath, minify).extract(html, "Content")
+    except OSError:
+        return None
+
+def parse_date(date):
+    # Feed dates are UTC; datetime is only imported by builds with listings
+    from datetime import datetime, timezone
+
+    return datetime.fromisoformat(date.replace(" ", "T")).replace(tzinfo=timezone.utc)
+
+def absolute_url(listing, basepath, url):
+    return listing.site_url + basepath.rstrip("/") + url
+
+# Site-root relative links and images in rendered HTML ("//host" ones excluded)
+ROOT_RELATIVE_PATTERN = re.compile(r'\b(href|src)="/(?!/)')
+
+def absolute_links(listing, html):
+    # RSS has no xml:base, and readers resolve root-relative URLs against
+    # nothing useful, so post content gets absolute links
+    return ROOT_RELATIVE_PATTERN.sub(lambda match: f'{match.group(1)}="{listing.site_url}/', html)
+
+def write_feeds(atom, rss, listing, metadata, rows, pages, section_dest, dest_dir_path, basepath, minify):
+    # email.utils is only imported by builds with listings
+    from email.utils import format_datetime
+
+    columns = metadata.columns
+    section_url = absolute_url(listing, basepath, page_url(os.path.join(section_dest, "index.html"), dest_dir_path))
+    title = escape(listing.title, quote=False)
+    # The newest post dates the feed, so an unchanged blog gives an identical file
+    updated = parse_date(columns["date"][rows[0]]).isoformat() if rows else "1970-01-01T00:00:00+00:00"
+    # Post content links are made absolute (see absolute_links); xml:base
+    # still resolves any other relative URL in Atom
+    base = f' xml:base="{escape(listing.site_url)}/"'
+
+    atom.write(f'<?xml version="1.0" encoding="utf-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom"{base}>\n')
+    atom.write(f"<title>{title}</title>\n")
+    atom.write(f'<link rel="self" href="{escape(section_url)}atom.xml"/>\n<link href="{escape(section_url)}"/>\n')
+    atom.write(f"<id>{escape(section_url, quote=False)}</id>\n<updated>{updated}</updated>\n")
+    atom.write(f"<author><name>{title}</name></author>\n")
+    rss.write('<?xml version="1.0" encoding="utf-8"?>\n<rss version="2.0">\n<channel>\n')
+    rss.write(f"<title>{title}</title>\n<link>{escape(section_url, quote=False)}</link>\n<description>{title}</description>\n")
+
+    for row in rows:
+        url = escape(absolute_url(listing, basepath, page_url(columns["dest"][row], dest_dir_path)))
+        post_title = escape(columns["title"][row] or "", quote=False)
+        date = parse_date(columns["date"][row])
+        content = post_content(pages[columns["path"][row]], basepath, minify)
+
+        atom.write(f"<entry>\n<title>{post_title}</title>\n")
+        atom.write(f'<link href="{url}"/>\n<id>{url}</id>\n<updated>{date.isoformat()}</updated>\n')
+        rss.write(f"<item>\n<title>{post_title}</title>\n<link>{url}</link>\n<guid>{url}</guid>\n")
+        rss.write(f"<pubDate>{format_datetime(date)}</pubDate>\n")
+        if content is not None:
+            content = escape(absolute_links(listing, content), quote=False)
+            atom.write(f'<content type="html">{content}</content>\n')
+            rss.write(f"<description>{content}</description>\n")
+        atom.write("</entry>\n")
+        rss.write("</item>\n")
+
+    atom.write("</feed>\n")
+    rss.write("</channel>\n</rss>\n")
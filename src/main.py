@@ -1,30 +1,287 @@
 import os
 import sys
-import shutil
-from gencontent import generate_pages_recursive
-from copystatic import copy_files_recursive
+import time
+import argparse
+from gencontent import BuildOptions, generate_pages_incremental
+from listings import Listing
+from copystatic import copy_files_recursive, prune_static
+from manifest import load_manifest, save_manifest
+import profiler
+import blockcache
 
-def main():
+DEST_DIR = "./docs"
+SOURCE_DIR = "./static"
+CONTENT_DIR = "./content"
+TEMPLATE_PATH = "./template.html"
+# Per-section layouts: templates/blog.html is used for everything under content/blog
+TEMPLATES_DIR = "./templates"
+# Gets paginated index pages of its posts (unless content/blog/index.md
+# exists), and Atom/RSS feeds with --site-url
+BLOG_DIR = os.path.join(CONTENT_DIR, "blog")
+MANIFEST_PATH = "./.cache/manifest.json"
+BLOCK_CACHE_PATH = "./.cache/blocks.sqlite3"
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build the static site into ./docs")
     # Grab basepath from CLI argument, default to "/"
-    basepath = "/"
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
-
-    dest_dir = "./docs"
-    source_dir = "./static"
-    content_dir = "./content"
-    template_path = "./template.html"
-
-    print("Cleaning public directory...")
-    if os.path.exists(dest_dir):
-        shutil.rmtree(dest_dir)
-    
-    print("Copying static assets...")
-    copy_files_recursive(source_dir, dest_dir)
-    
-    print("Generating pages...")
-    # This now handles the entire content tree!
-    generate_pages_recursive(content_dir, template_path, dest_dir, basepath)
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="wipe the output directory and re-render every page",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        metavar="N",
+        help="render pages across N worker processes (0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--writers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="write pages from N background threads per process while the next is rendered (0 = off; "
+        "sources of 1 MiB or more are always streamed to disk)",
+    )
+    # Pages are always written to a temporary file and renamed into place;
+    # the flag that used to turn that on is still accepted
+    parser.add_argument("--atomic", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content hash instead of size and mtime",
+    )
+    parser.add_argument(
+        "--hardlink",
+        action="store_true",
+        help="hardlink static files into the output instead of copying them",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="fold whitespace in the HTML as it is written (<pre> and <code> are kept as is)",
+    )
+    parser.add_argument(
+        "--check-links",
+        nargs="?",
+        const="warn",
+        choices=("warn", "error"),
+        help="report links and images to pages or files the build did not produce (error = fail the build)",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help="write .gz (and .br with the brotli module) next to every text output",
+    )
+    parser.add_argument(
+        "--compress-jobs",
+        type=int,
+        default=0,
+        metavar="N",
+        help="compress outputs on N threads with --precompress (0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=10,
+        metavar="N",
+        help="posts per blog index page",
+    )
+    parser.add_argument(
+        "--site-url",
+        default="",
+        metavar="URL",
+        help="absolute site address, e.g. https://example.com; the blog's Atom/RSS feeds are only written when it is set",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and rebuild affected outputs whenever inputs change",
+    )
+    parser.add_argument(
+        "--block-cache-size",
+        type=int,
+        default=10000,
+        metavar="N",
+        help="rendered blocks kept in memory per process (0 = off); this pays off on rebuilds and in --watch, "
+        "but hashing every block makes a cold build (e.g. with --clean) a little slower",
+    )
+    parser.add_argument(
+        "--block-cache-memory",
+        type=float,
+        default=blockcache.MAX_BYTES / (1 << 20),
+        metavar="MB",
+        help="cap on the HTML those blocks hold per process (0 = off); larger blocks are not kept",
+    )
+    parser.add_argument(
+        "--persist-block-cache",
+        action="store_true",
+        help=f"also keep rendered blocks on disk across builds in {BLOCK_CACHE_PATH}",
+    )
+    parser.add_argument(
+        "--block-cache-disk",
+        type=float,
+        default=blockcache.MAX_DISK_BYTES / (1 << 20),
+        metavar="MB",
+        help="cap on the HTML kept on disk with --persist-block-cache; the blocks used least recently are dropped first",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time every build stage and page and print the slowest ones",
+    )
+    parser.add_argument(
+        "--profile-json",
+        metavar="PATH",
+        help="also dump the full profile as JSON (implies --profile)",
+    )
+    args = parser.parse_args(argv)
+    if args.jobs < 0:
+        parser.error("--jobs must be 0 or a positive number")
+    if args.compress_jobs < 0:
+        parser.error("--compress-jobs must be 0 or a positive number")
+    if args.writers < 0:
+        parser.error("--writers must be 0 or a positive number")
+    if args.page_size < 1:
+        parser.error("--page-size must be a positive number")
+    return args
+
+def is_under(path, dir_path):
+    return path.startswith(dir_path + os.sep)
+
+def build(args, changed=None):
+    # changed=None means "anything may have changed"; otherwise only the stages
+    # that depend on one of the changed paths run
+    rebuilt = False
+    # Outputs whose content this build changed; precompress only reads these
+    # (and ones whose size or mtime moved)
+    written = []
+    # Loaded once, updated by every stage and saved once at the end
+    manifest = load_manifest(MANIFEST_PATH)
+    try:
+        if changed is None or any(is_under(path, SOURCE_DIR) for path in changed):
+            rebuilt = True
+            print("Copying static assets...")
+            with profiler.stage("static"):
+                # Only new or changed assets are copied; ones deleted from ./static are removed
+                static_files = copy_files_recursive(SOURCE_DIR, DEST_DIR, args.checksum, args.hardlink, written)
+                prune_static(static_files, DEST_DIR, MANIFEST_PATH, manifest)
+
+        if (
+            changed is None
+            or TEMPLATE_PATH in changed
+            or any(is_under(path, CONTENT_DIR) or is_under(path, TEMPLATES_DIR) for path in changed)
+        ):
+            rebuilt = True
+            print("Generating pages...")
+            # Only pages whose markdown or layout changed get re-rendered (all of
+            # them when the basepath or minify setting changed)
+            listings = []
+            if os.path.isdir(BLOG_DIR):
+                listings.append(Listing(BLOG_DIR, "Blog", args.page_size, site_url=args.site_url))
+            options = BuildOptions(
+                basepath=args.basepath,
+                minify=args.minify,
+                templates_dir=TEMPLATES_DIR,
+                jobs=args.jobs,
+                writers=args.writers,
+                check_links=args.check_links,
+            )
+            generate_pages_incremental(
+                CONTENT_DIR,
+                TEMPLATE_PATH,
+                DEST_DIR,
+                MANIFEST_PATH,
+                options,
+                changed=changed,
+                listings=listings,
+                written=written,
+                manifest=manifest,
+            )
+
+        if rebuilt:
+            # gzip and the thread pool are only loaded when compressing
+            from precompress import precompress, discard_siblings
+
+            if args.precompress:
+                print("Precompressing outputs...")
+                with profiler.stage("precompress"):
+                    # Only outputs whose content changed since the last build are compressed again
+                    precompress(DEST_DIR, MANIFEST_PATH, args.compress_jobs, written=written, manifest=manifest)
+            else:
+                # Siblings an earlier --precompress build left next to changed or
+                # removed outputs would be served stale
+                discard_siblings(DEST_DIR, MANIFEST_PATH, written, manifest)
+    finally:
+        if rebuilt:
+            # Also after a failed build: failed pages are recorded so they are retried
+            save_manifest(MANIFEST_PATH, manifest)
+
+def try_build(args, changed=None):
+    # A failed build must not end watch mode: the next save will most likely
+    # fix it. Returns whether the build succeeded.
+    try:
+        build(args, changed)
+    except Exception as e:
+        print(f"Build failed: {e}")
+        return False
+    return True
+
+def watch(args):
+    # ctypes and the inotify setup are only needed in watch mode
+    from watch import create_watcher
+
+    # Start watching before the first build so no edit can slip in between
+    watcher = create_watcher([CONTENT_DIR, SOURCE_DIR, TEMPLATES_DIR], [TEMPLATE_PATH])
+    try:
+        ok = try_build(args)
+        print(f"Watching for changes ({type(watcher).__name__}), press Ctrl+C to stop...")
+        while True:
+            changed = watcher.wait()
+            start = time.perf_counter()
+            # After a failed build, rebuild everything it may have left undone
+            ok = try_build(args, changed if ok else None)
+            if ok:
+                print(f"Rebuilt in {(time.perf_counter() - start) * 1000:.0f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.clean:
+        print("Cleaning public directory...")
+        if os.path.exists(DEST_DIR):
+            import shutil
+
+            shutil.rmtree(DEST_DIR)
+        if os.path.exists(MANIFEST_PATH):
+            os.remove(MANIFEST_PATH)
+
+    blockcache.configure(
+        args.block_cache_size,
+        BLOCK_CACHE_PATH if args.persist_block_cache else None,
+        max_bytes=int(args.block_cache_memory * (1 << 20)),
+        max_disk_bytes=int(args.block_cache_disk * (1 << 20)),
+    )
+
+    if args.watch:
+        watch(args)
+        return
+
+    if args.profile or args.profile_json:
+        build_profiler = profiler.enable()
+        build(args)
+        build_profiler.report()
+        if args.profile_json:
+            build_profiler.dump_json(args.profile_json)
+    else:
+        build(args)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,44 @@
+import hashlib
+import json
+import os
+
+# Bump this whenever the manifest layout changes so old manifests are ignored
+MANIFEST_VERSION = 2
+
+def empty_manifest():
+    # templates maps every layout in use to its hash
+    return {"version": MANIFEST_VERSION, "templates": {}, "basepath": None, "pages": {}}
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path):
+    # Read in chunks so large content files never sit in memory twice
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(path):
+    # A missing, corrupt or outdated manifest just means "rebuild everything"
+    try:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return empty_manifest()
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return empty_manifest()
+    return manifest
+
+def save_manifest(path, manifest):
+    dir_path = os.path.dirname(path)
+    if dir_path != "":
+        os.makedirs(dir_path, exist_ok=True)
+
+    # Write to a temp file first so an interrupted build never leaves half a
+    # manifest. Compact: on a large site it is megabytes, written every build.
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
@@ -0,0 +1,76 @@
+import locale
+
+# The encoding open() uses for text files, so decoded blocks match f.read()
+ENCODING = locale.getpreferredencoding(False)
+
+# Bytes read per readinto call
+CHUNK_SIZE = 1 << 16
+
+def read_chunks(f, chunk_size=CHUNK_SIZE):
+    # Read a binary file in fixed-size chunks into one reusable buffer. Files
+    # are read rather than memory-mapped: a mapped file that is truncated
+    # while it is read (an editor saving it under --watch) kills the process
+    # with SIGBUS, while a read just comes up short. \r\n and \r become \n as
+    # in text mode. A yielded chunk may be a view of the buffer, so it is only
+    # valid until the next one is read.
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    carry = b""
+    while True:
+        n = f.readinto(buf)
+        if not n:
+            break
+        if not carry and buf.find(b"\r", 0, n) == -1:
+            yield view[:n]
+            continue
+        data = carry + view[:n]
+        carry = b""
+        if data.endswith(b"\r"):
+            # Possibly the first half of a \r\n split across two reads
+            data, carry = data[:-1], b"\r"
+        yield data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    if carry:
+        yield b"\n"
+
+def find_title(f, chunk_size=CHUNK_SIZE):
+    # Same rule as extract_title (first line starting with "# "), but it
+    # stops reading at the first match and decodes only that line
+    buf = b"\n"
+    start = -1
+    for chunk in read_chunks(f, chunk_size):
+        buf += chunk
+        if start == -1:
+            start = buf.find(b"\n# ")
+            if start == -1:
+                # Only the line that has not ended yet can still be the h1
+                buf = buf[buf.rfind(b"\n"):]
+                continue
+        end = buf.find(b"\n", start + 3)
+        if end != -1:
+            return buf[start + 3:end].decode(ENCODING).strip()
+    if start == -1:
+        raise Exception("No h1 header found in markdown")
+    return buf[start + 3:].decode(ENCODING).strip()
+
+def iter_file_blocks(f, chunk_size=CHUNK_SIZE):
+    # Same blocks as markdown_to_blocks, found by scanning the raw bytes for
+    # blank lines and decoding one block at a time; only the block being read
+    # is held in memory
+    pending = bytearray()
+    for chunk in read_chunks(f, chunk_size):
+        # What is pending has no blank line in it, but one may straddle the reads
+        search = max(len(pending) - 1, 0)
+        pending += chunk
+        start = 0
+        while True:
+            end = pending.find(b"\n\n", search)
+            if end == -1:
+                break
+            block = pending[start:end].decode(ENCODING).strip()
+            if block != "":
+                yield block
+            start = search = end + 2
+        del pending[:start]
+    block = pending.decode(ENCODING).strip()
+    if block != "":
+        yield block
@@ -0,0 +1,116 @@
+class MetadataIndex:
+    # Title, date, tags, layout and draft flag of every page in the build,
+    # collected while the pages are parsed. Stored by column (one list per
+    # field, a row per page) with tags interned as numbers, which keeps it
+    # small in the manifest, where pages that are not re-rendered find their
+    # row again. Listing pages (a blog index, a tag page) sweep it instead of
+    # reading the sources.
+    COLUMNS = ("path", "dest", "title", "date", "tags", "template", "draft")
+
+    def __init__(self):
+        self.columns = {name: [] for name in self.COLUMNS}
+        self.tag_names = []
+        self.tag_ids = {}
+        self.rows = {}
+
+    def __len__(self):
+        return len(self.columns["path"])
+
+    def __contains__(self, from_path):
+        return from_path in self.rows
+
+    def add(self, from_path, dest_path, meta):
+        # meta as parsed from the front matter, plus the page's title
+        tag_ids = []
+        for tag in meta.get("tags", ()):
+            tag_id = self.tag_ids.get(tag)
+            if tag_id is None:
+                tag_id = self.tag_ids[tag] = len(self.tag_names)
+                self.tag_names.append(tag)
+            tag_ids.append(tag_id)
+        values = (
+            from_path,
+            dest_path,
+            meta.get("title"),
+            meta.get("date"),
+            tag_ids,
+            meta.get("template"),
+            bool(meta.get("draft", False)),
+        )
+        row = self.rows.get(from_path)
+        if row is None:
+            row = self.rows[from_path] = len(self)
+            for name, value in zip(self.COLUMNS, values):
+                self.columns[name].append(value)
+        else:
+            for name, value in zip(self.COLUMNS, values):
+                self.columns[name][row] = value
+
+    def get(self, from_path):
+        # The page's metadata in the form add() takes, or None
+        row = self.rows.get(from_path)
+        if row is None:
+            return None
+        meta = {
+            "title": self.columns["title"][row],
+            "tags": tuple(self.tag_names[i] for i in self.columns["tags"][row]),
+            "draft": self.columns["draft"][row],
+        }
+        for name in ("date", "template"):
+            if self.columns[name][row] is not None:
+                meta[name] = self.columns[name][row]
+        return meta
+
+    def select(self, section=None, tag=None, drafts=False):
+        # Rows of published pages, newest first (undated pages last, then by
+        # path). section is a directory of sources, e.g. "content/blog".
+        dates = self.columns["date"]
+        paths = self.columns["path"]
+        tag_id = self.tag_ids.get(tag) if tag is not None else None
+        if tag is not None and tag_id is None:
+            return []
+        prefix = None if section is None else section.rstrip("/\\") + "/"
+        rows = []
+        for row, path in enumerate(paths):
+            if self.columns["draft"][row] and not drafts:
+                continue
+            if prefix is not None and not path.replace("\\", "/").startswith(prefix):
+                continue
+            if tag_id is not None and tag_id not in self.columns["tags"][row]:
+                continue
+            rows.append(row)
+        rows.sort(key=lambda row: paths[row])
+        rows.sort(key=lambda row: dates[row] or "", reverse=True)
+        return rows
+
+    def tags(self, drafts=False):
+        # {tag: number of published pages}
+        counts = {}
+        for row in range(len(self)):
+            if self.columns["draft"][row] and not drafts:
+                continue
+            for tag_id in self.columns["tags"][row]:
+                name = self.tag_names[tag_id]
+                counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    def to_json(self):
+        return {"columns": self.columns, "tags": self.tag_names}
+
+    @classmethod
+    def from_json(cls, data):
+        # A missing or malformed index is just an empty one
+        index = cls()
+        try:
+            columns = data["columns"]
+            tag_names = list(data["tags"])
+            rows = len(columns["path"])
+            if any(len(columns[name]) != rows for name in cls.COLUMNS):
+                return index
+        except (KeyError, TypeError):
+            return index
+        index.columns = {name: list(columns[name]) for name in cls.COLUMNS}
+        index.tag_names = tag_names
+        index.tag_ids = {tag: i for i, tag in enumerate(tag_names)}
+        index.rows = {path: row for row, path in enumerate(index.columns["path"])}
+        return index
@@ -0,0 +1,164 @@
+import os
+import hashlib
+from copystatic import remove_file
+from manifest import load_manifest, save_manifest
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it only .gz siblings are written
+    brotli = None
+
+# Outputs worth compressing ahead of time; images and fonts already are
+TEXT_EXTENSIONS = (".html", ".css", ".js", ".mjs", ".json", ".svg", ".xml", ".txt", ".map")
+
+def available_formats():
+    if brotli is None:
+        return ("gz",)
+    return ("gz", "br")
+
+def compress(data, fmt):
+    if fmt == "gz":
+        # Imported here: builds without --precompress still load this module
+        # to discard stale siblings, and never compress anything
+        import gzip
+
+        # mtime=0 keeps the output identical for identical input
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if fmt == "br":
+        return brotli.compress(data, mode=brotli.MODE_TEXT, quality=11)
+    raise ValueError(f"Unknown compression format: {fmt}")
+
+def write_bytes(path, data):
+    # Rename into place so the server never picks up a half-written sibling
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def text_outputs(dest_dir_path):
+    outputs = []
+    for dir_path, dir_names, filenames in os.walk(dest_dir_path):
+        dir_names.sort()
+        for filename in sorted(filenames):
+            if filename.endswith(TEXT_EXTENSIONS):
+                outputs.append(os.path.join(dir_path, filename))
+    return outputs
+
+def compress_output(path, old_entry, formats, written):
+    # Runs on a pool thread; zlib, brotli and sha256 release the GIL while
+    # they work, so threads compress in parallel without pickling the data.
+    # old_entry is [hash, size, mtime_ns] from the last build. An output
+    # this build did not write whose size and mtime still match is not even
+    # read; otherwise the work is still skipped when the content hash
+    # matches. Returns (entry, compressed?).
+    if old_entry is None or isinstance(old_entry, str):
+        # Missing, or recorded by an older build as a bare hash
+        old_entry = [old_entry, None, None]
+    siblings = all(os.path.exists(f"{path}.{fmt}") for fmt in formats)
+    stat = os.stat(path)
+    entry = [old_entry[0], stat.st_size, stat.st_mtime_ns]
+    if siblings and path not in written and entry == old_entry:
+        return entry, False
+    with open(path, "rb") as f:
+        data = f.read()
+    entry[0] = hashlib.sha256(data).hexdigest()
+    if siblings and entry[0] == old_entry[0]:
+        return entry, False
+    for fmt in formats:
+        write_bytes(f"{path}.{fmt}", compress(data, fmt))
+    return entry, True
+
+def remove_siblings(path, formats, dest_dir_path):
+    for fmt in formats:
+        sibling = f"{path}.{fmt}"
+        if os.path.exists(sibling):
+            remove_file(sibling, dest_dir_path)
+
+def precompress(dest_dir_path, manifest_path, jobs=0, formats=None, written=(), manifest=None):
+    # Write .gz (and .br) siblings next to every text output so the server
+    # can send them as-is. written lists the outputs this build wrote (pages,
+    # listings, copied static files); the others are only stat()ed. Given an
+    # already loaded manifest, it is updated in place and the caller saves
+    # it. Returns (compressed, removed).
+    written = set(written)
+    if formats is None:
+        formats = available_formats()
+    formats = list(formats)
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+
+    own = manifest is None
+    if own:
+        manifest = load_manifest(manifest_path)
+    old_entry = manifest.get("compressed", {})
+    old_formats = old_entry.get("formats", [])
+    old_files = old_entry.get("files", {})
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    outputs = text_outputs(dest_dir_path)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(
+            lambda path: compress_output(path, old_files.get(path), formats, written), outputs
+        ))
+
+    files = {}
+    compressed = 0
+    for path, (entry, changed) in zip(outputs, results):
+        files[path] = entry
+        if changed:
+            compressed += 1
+
+    # Siblings of outputs that are gone, or of formats no longer produced
+    removed = 0
+    for path in old_files:
+        if path not in files:
+            remove_siblings(path, old_formats, dest_dir_path)
+            removed += 1
+        else:
+            remove_siblings(path, [fmt for fmt in old_formats if fmt not in formats], dest_dir_path)
+
+    manifest["compressed"] = {"formats": formats, "files": files}
+    if own:
+        save_manifest(manifest_path, manifest)
+    print(f"{compressed} file(s) compressed ({', '.join(formats)}), {len(outputs) - compressed} up to date, {removed} removed")
+    return compressed, removed
+
+def discard_siblings(dest_dir_path, manifest_path, written=(), manifest=None):
+    # A build without --precompress does not refresh the siblings an earlier
+    # one wrote, and a server would keep sending them. Those of outputs this
+    # build wrote, removed or otherwise changed (size or mtime) are deleted
+    # and dropped from the manifest, so the next --precompress build writes
+    # them again. A manifest passed in is updated in place, as in precompress.
+    # Returns the number of outputs whose siblings went.
+    own = manifest is None
+    if own:
+        manifest = load_manifest(manifest_path)
+    section = manifest.get("compressed")
+    if not section:
+        return 0
+    written = set(written)
+    formats = section.get("formats", [])
+    files = {}
+    discarded = 0
+    for path, entry in section.get("files", {}).items():
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            stat = None
+        if (
+            stat is not None
+            and path not in written
+            and (isinstance(entry, str) or entry[1:] == [stat.st_size, stat.st_mtime_ns])
+        ):
+            files[path] = entry
+            continue
+        remove_siblings(path, formats, dest_dir_path)
+        discarded += 1
+    if discarded:
+        manifest["compressed"] = dict(section, files=files)
+        if own:
+            save_manifest(manifest_path, manifest)
+        print(f"Removed the stale compressed siblings of {discarded} output(s); build with --precompress to write them again")
+    return discarded
@@ -0,0 +1,148 @@
+import sys
+import json
+import time
+
+# Stages in pipeline order, used to sort the report
+STAGES = (
+    "static",
+    "read",
+    "parse",
+    "block typing",
+    "inline parsing",
+    "to_html",
+    "write",
+    "precompress",
+)
+
+class BuildProfiler:
+    # Wall time and net allocated memory blocks per stage and per page.
+    # Nested stages are exclusive: time spent in "inline parsing" is not
+    # also counted towards the "parse" stage that called it.
+    def __init__(self):
+        self.pages = {}
+        self.totals = {}
+        self.page = None
+        self.stack = []
+
+    def start_page(self, name):
+        self.page = name
+        self.pages[name] = {}
+
+    def end_page(self):
+        self.page = None
+
+    def add(self, page, name, seconds, blocks):
+        # Stages outside any page (e.g. static assets) only count towards the totals
+        targets = [self.totals]
+        if page is not None:
+            targets.append(self.pages[page])
+        for stages in targets:
+            totals = stages.setdefault(name, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += blocks
+
+    def add_page(self, page, stages):
+        # Merge a page recorded by another process (see gencontent's worker tasks)
+        self.pages[page] = {}
+        for name, (seconds, blocks) in stages.items():
+            self.add(page, name, seconds, blocks)
+
+    def _pause(self, now, blocks):
+        if self.stack:
+            frame = self.stack[-1]
+            self.add(self.page, frame[0], now - frame[1], blocks - frame[2])
+
+    def enter(self, name):
+        now = time.perf_counter()
+        blocks = sys.getallocatedblocks()
+        self._pause(now, blocks)
+        self.stack.append([name, now, blocks])
+
+    def exit(self):
+        now = time.perf_counter()
+        blocks = sys.getallocatedblocks()
+        self._pause(now, blocks)
+        self.stack.pop()
+        if self.stack:
+            # Resume the enclosing stage from here
+            self.stack[-1][1] = now
+            self.stack[-1][2] = blocks
+
+    def page_seconds(self, page):
+        return sum(seconds for seconds, _ in self.pages[page].values())
+
+    def report(self, top=10):
+        total = sum(seconds for seconds, _ in self.totals.values()) or 1.0
+        print("Stage totals:")
+        print(f"  {'stage':<20}{'ms':>10}{'share':>8}{'net blocks':>12}")
+        for name in sorted(self.totals, key=lambda name: STAGES.index(name) if name in STAGES else len(STAGES)):
+            seconds, blocks = self.totals[name]
+            print(f"  {name:<20}{seconds * 1000:>10.1f}{seconds / total:>8.1%}{blocks:>+12}")
+        # Not an allocation count: sys.getallocatedblocks() after the stage minus before
+        print("  (net blocks: memory blocks allocated minus freed; negative when a stage frees more)")
+
+        slowest = sorted(self.pages, key=self.page_seconds, reverse=True)[:top]
+        if slowest:
+            print(f"Slowest {len(slowest)} page(s):")
+            for page in slowest:
+                stages = self.pages[page]
+                worst = max(stages, key=lambda name: stages[name][0])
+                print(f"  {self.page_seconds(page) * 1000:>10.1f} ms  {page}  (mostly {worst})")
+
+    def to_json(self):
+        return {
+            "totals": {name: {"seconds": s, "net_blocks": b} for name, (s, b) in self.totals.items()},
+            "pages": {
+                page: {name: {"seconds": s, "net_blocks": b} for name, (s, b) in stages.items()}
+                for page, stages in self.pages.items()
+            },
+        }
+
+    def dump_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_json(), f, indent=1, sort_keys=True)
+
+class _Stage:
+    __slots__ = ("profiler", "name")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.enter(self.name)
+
+    def __exit__(self, *exc):
+        self.profiler.exit()
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+_NULL_STAGE = _NullStage()
+
+# The profiler for this process, or None when profiling is off
+_active = None
+
+def enable():
+    global _active
+    _active = BuildProfiler()
+    return _active
+
+def disable():
+    global _active
+    _active = None
+
+def active():
+    return _active
+
+def stage(name):
+    # Cheap no-op context manager unless profiling is enabled
+    if _active is None:
+        return _NULL_STAGE
+    return _Stage(_active, name)
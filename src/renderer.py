@@ -0,0 +1,106 @@
+import os
+import threading
+from collections import OrderedDict
+from block_markdown import markdown_to_blocks, markdown_blocks_to_html_node
+from gencontent import extract_title, discover_pages, assign_templates
+from frontmatter import split_front_matter
+from template import Template, load_template, rewrite_basepath, named_template, find_templates
+
+# Rendering goes through process-wide state (the block cache, the link
+# collection in linkindex, the highlight cache), so every Renderer in the
+# process takes the same lock
+_lock = threading.Lock()
+
+class Renderer:
+    # Renders markdown to HTML in memory, for embedding the generator in a
+    # long-running process such as a preview server. The compiled template
+    # stays warm between calls, as does the process's block cache when the
+    # embedding application sets one up (blockcache.configure), and whole
+    # pages rendered from files are kept (up to max_pages) until the file or
+    # the template changes. Calls are serialized with a lock shared by all
+    # Renderers, so they can be used from a threaded server. Drafts are
+    # rendered like any other page.
+    def __init__(self, template, basepath="/", minify=False, max_pages=1000, templates_dir=None):
+        # template is a path (reloaded when the file changes) or a Template;
+        # render_tree picks per-section layouts from templates_dir like a build
+        self.template_path = None if isinstance(template, Template) else template
+        self._template = template if isinstance(template, Template) else None
+        self.templates_dir = templates_dir
+        self.basepath = basepath
+        self.minify = minify
+        self.max_pages = max_pages
+        self.pages = OrderedDict()
+
+    def template(self, template_path=None):
+        if template_path is None:
+            if self._template is not None:
+                return self._template
+            template_path = self.template_path
+        return load_template(template_path, self.basepath, self.minify)
+
+    def render_content(self, markdown):
+        # Just the HTML of the markdown, without the template or front matter
+        with _lock:
+            parts = []
+            _, blocks = split_front_matter(markdown_to_blocks(markdown))
+            markdown_blocks_to_html_node(blocks, self.minify).write_html(parts, self.minify)
+            return rewrite_basepath("".join(parts), self.basepath)
+
+    def render(self, markdown):
+        # A full page, exactly as generate_page would write it
+        with _lock:
+            return self._render_page(markdown)[0]
+
+    def _render_page(self, markdown, template_path=None):
+        # Returns (html, the template used)
+        meta, blocks = split_front_matter(markdown_to_blocks(markdown))
+        title = meta.get("title")
+        if title is None:
+            title = extract_title(markdown)
+        if "template" in meta and self.templates_dir is not None:
+            template_path = named_template(self.templates_dir, meta["template"], find_templates(self.templates_dir))
+        template = self.template(template_path)
+        node = markdown_blocks_to_html_node(blocks, template.minify)
+        return template.render({"Title": title, "Content": node}), template
+
+    def render_file(self, path, template_path=None):
+        # Like render, for a markdown file; unchanged files are served from
+        # memory. template_path overrides the default layout.
+        with _lock:
+            stat = os.stat(path)
+            key = (path, stat.st_mtime_ns, stat.st_size, template_path)
+            cached = self.pages.get(key)
+            # Still valid if the template it was rendered with is (its file did not change)
+            if cached is not None and self._current(cached[1]):
+                self.pages.move_to_end(key)
+                return cached[0]
+
+            with open(path, "r") as f:
+                html, template = self._render_page(f.read(), template_path)
+            self.pages[key] = (html, template)
+            if len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+            return html
+
+    def _current(self, template):
+        if template is self._template:
+            return True
+        try:
+            return load_template(template.path, self.basepath, self.minify) is template
+        except OSError:
+            return False
+
+    def render_tree(self, content_dir):
+        # Every page under content_dir. Returns ({output path: html}, {source
+        # path: error}) with output paths relative to the site root, e.g.
+        # "blog/post/index.html".
+        pages = {}
+        errors = {}
+        sources = discover_pages(content_dir, "")
+        templates = assign_templates(sources, content_dir, self.template_path, self.templates_dir)
+        for from_path, dest_path in sources:
+            try:
+                pages[dest_path] = self.render_file(from_path, templates[from_path])
+            except Exception as e:
+                errors[from_path] = f"{type(e).__name__}: {e}"
+        return pages, errors
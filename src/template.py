@@ -0,0 +1,240 @@
+import os
+import re
+from htmlnode import WHITESPACE_PATTERN, RAW_TEXT_TAGS, ParentNode
+
+# Placeholders look like {{ Title }} or {{ Content }}
+SLOT_PATTERN = re.compile(r"\{\{ (\w+) \}\}")
+
+# Elements that lay out as blocks (or are never rendered): whitespace next to
+# their tags is dropped when minifying, while a single space is kept between
+# inline elements such as <a> and <span>, where it is visible
+BLOCK_TAGS = frozenset((
+    "!doctype", "html", "head", "body", "title", "meta", "link", "base",
+    "div", "p", "ul", "ol", "li", "dl", "dt", "dd", "blockquote", "hr", "br",
+    "h1", "h2", "h3", "h4", "h5", "h6", "header", "footer", "main", "nav",
+    "article", "section", "aside", "figure", "figcaption", "form", "fieldset",
+    "table", "thead", "tbody", "tfoot", "tr", "th", "td", "caption",
+    "pre", "textarea", "script", "style", "noscript", "template",
+))
+
+# Raw text elements (kept verbatim), comments, and any other tag
+MARKUP_PATTERN = re.compile(
+    r"<(pre|textarea|script|style)\b.*?</\1\s*>|<!--.*?-->|<(/?[!\w-]*)[^>]*>",
+    re.DOTALL | re.IGNORECASE,
+)
+
+def _is_block_edge(tag_name):
+    return tag_name is None or tag_name.lstrip("/").lower() in BLOCK_TAGS
+
+def minify_markup(html):
+    # Fold the whitespace of the template's own markup: runs collapse to one
+    # space and whitespace-only runs beside block level tags disappear.
+    # <pre>, <textarea>, <script> and <style> are kept exactly; comments other
+    # than conditional ones (<!--[if ...]>) are dropped.
+    parts = []
+    previous = None  # tag name of the last markup token, None at the start
+    text = ""
+    start = 0
+    for match in MARKUP_PATTERN.finditer(html):
+        markup = match.group(0)
+        text += html[start:match.start()]
+        start = match.end()
+        if markup.startswith("<!--") and not markup.startswith("<!--["):
+            # Text on both sides of a dropped comment joins up
+            continue
+        tag_name = match.group(1) or match.group(2)
+        parts.append(_fold_text(text, previous, tag_name))
+        parts.append(markup)
+        previous = tag_name
+        text = ""
+    parts.append(_fold_text(text + html[start:], previous, None))
+    return "".join(parts)
+
+def _fold_text(text, before, after):
+    text = WHITESPACE_PATTERN.sub(" ", text)
+    if text == " " and (_is_block_edge(before) or _is_block_edge(after)):
+        return ""
+    return text
+
+def rewrite_basepath(html, basepath):
+    # Replace relative roots with the basepath ("/" would be a no-op, so skip the copies)
+    if basepath == "/" or '="/' not in html:
+        return html
+    html = html.replace('href="/', f'href="{basepath}')
+    return html.replace('src="/', f'src="{basepath}')
+
+class Template:
+    def __init__(self, text, basepath="/", minify=False):
+        self.basepath = basepath
+        self.minify = minify
+        # The file it was loaded from, see load_template
+        self.path = None
+        # The template's own links are rewritten once here instead of on every page
+        text = rewrite_basepath(text, basepath)
+        if minify:
+            # Likewise its markup is minified once; node values are folded as they stream
+            text = minify_markup(text)
+
+        # Split into static segments with a slot name between each pair:
+        # segments[0] slots[0] segments[1] slots[1] ... segments[-1]
+        self.segments = []
+        self.slots = []
+        start = 0
+        for match in SLOT_PATTERN.finditer(text):
+            self.segments.append(text[start:match.start()])
+            self.slots.append(match.group(1))
+            start = match.end()
+        self.segments.append(text[start:])
+
+    def write(self, out, values):
+        # Stream the page into a list of fragments or an open file. Values may be
+        # strings or HTML nodes; nodes are serialized straight into the output
+        # (minified along with the template), strings are written as given.
+        write = out.append if isinstance(out, list) else out.write
+        write(self.segments[0])
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            value = values.get(slot)
+            if value is None:
+                # Unknown placeholders are left in place, like a plain str.replace would
+                write("{{ " + slot + " }}")
+            elif isinstance(value, str):
+                write(rewrite_basepath(value, self.basepath))
+            elif self.basepath == "/":
+                value.write_html(write, self.minify)
+            else:
+                self._write_rebased(write, value)
+            write(segment)
+
+    def _write_rebased(self, write, node):
+        # Serialize one top-level block at a time into a buffer and rewrite its
+        # links as one string: two replaces per block rather than per fragment,
+        # while a page still streams block by block
+        if not isinstance(node, ParentNode) or node.children is None or node.tag in (None, *RAW_TEXT_TAGS):
+            parts = []
+            node.write_html(parts, self.minify)
+            write(rewrite_basepath("".join(parts), self.basepath))
+            return
+        write(rewrite_basepath(f"<{node.tag}{node.props_to_html()}>", self.basepath))
+        for child in node.children:
+            parts = []
+            child.write_html(parts, self.minify)
+            write(rewrite_basepath("".join(parts), self.basepath))
+        write(f"</{node.tag}>")
+
+    def render(self, values):
+        parts = []
+        self.write(parts, values)
+        return "".join(parts)
+
+    def extract(self, html, slot):
+        # The value of slot in a page this template rendered, or None when
+        # the page does not fit it. The static segments before the slot are
+        # matched from the start of the page and the ones after it from the
+        # end, so the value itself may contain anything.
+        if self.slots.count(slot) != 1:
+            return None
+        i = self.slots.index(slot)
+        if not html.startswith(self.segments[0]):
+            return None
+        start = len(self.segments[0])
+        for segment in self.segments[1:i + 1]:
+            found = html.find(segment, start)
+            if found == -1:
+                return None
+            start = found + len(segment)
+        tail = self.segments[i + 1:]
+        end = len(html) - len(tail[-1])
+        if end < start or html[end:] != tail[-1]:
+            return None
+        for segment in reversed(tail[:-1]):
+            found = html.rfind(segment, start, end)
+            if found == -1:
+                return None
+            end = found
+        return html[start:end]
+
+# (path, basepath, minify) -> (mtime_ns, size, Template), one per process
+_template_cache = {}
+
+def load_template(template_path, basepath="/", minify=False):
+    # Re-read only when the file changed on disk, so every page in a build
+    # (and every page a worker process renders) shares one compiled template
+    stat = os.stat(template_path)
+    key = (template_path, basepath, minify)
+    cached = _template_cache.get(key)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    with open(template_path, "r") as f:
+        template = Template(f.read(), basepath, minify)
+    template.path = template_path
+    _template_cache[key] = (stat.st_mtime_ns, stat.st_size, template)
+    return template
+
+def compiled_templates(template_paths, basepath="/", minify=False):
+    # Compile every template once, e.g. in the parent before worker processes
+    # start, and return the cache entries to hand to share_templates
+    entries = []
+    for template_path in template_paths:
+        try:
+            load_template(template_path, basepath, minify)
+        except OSError:
+            # Left to the pages that use it to report
+            continue
+        key = (template_path, basepath, minify)
+        entries.append((key, _template_cache[key]))
+    return entries
+
+def share_templates(entries):
+    # Seed this process's cache with templates compiled elsewhere; they are
+    # still re-read if the file changes afterwards
+    for key, cached in entries:
+        _template_cache[key] = cached
+
+def find_templates(templates_dir):
+    # Every layout under templates_dir, relative and without ".html":
+    # templates/blog/post.html -> "blog/post"
+    names = set()
+    if templates_dir is None or not os.path.isdir(templates_dir):
+        return names
+    for root, _, filenames in os.walk(templates_dir):
+        for filename in filenames:
+            if filename.endswith(".html"):
+                path = os.path.relpath(os.path.join(root, filename[:-5]), templates_dir)
+                names.add(path.replace(os.sep, "/"))
+    return names
+
+def named_template(templates_dir, name, names=None):
+    # "blog/post" -> templates/blog/post.html. The name comes from front
+    # matter, so one that could point outside templates_dir is rejected, as
+    # is one not among names (find_templates) when they are given; without
+    # them a missing layout is reported when the page renders.
+    if (
+        not isinstance(name, str)
+        or os.path.isabs(name)
+        or "\\" in name
+        or any(part in ("", ".", "..") for part in name.split("/"))
+    ):
+        raise ValueError(f"Invalid template name: {name!r}")
+    if names is not None and name not in names:
+        raise ValueError(f"No template {name!r} in {templates_dir}")
+    return os.path.join(templates_dir, *name.split("/")) + ".html"
+
+def select_template(from_path, content_dir, default_path, templates_dir=None, names=None, name=None):
+    # The layout of one page: the template its front matter names, else the
+    # one of its nearest section (content/blog/tom/index.md tries
+    # templates/blog/tom.html, then templates/blog.html), else default_path.
+    # names is find_templates(templates_dir), so nothing is stat'ed per page.
+    if templates_dir is None:
+        return default_path
+    if name is not None:
+        return named_template(templates_dir, name, names)
+    if names is None:
+        names = find_templates(templates_dir)
+    section = os.path.relpath(os.path.dirname(from_path), content_dir)
+    parts = [] if section == os.curdir else section.split(os.sep)
+    while parts:
+        if "/".join(parts) in names:
+            return os.path.join(templates_dir, *parts) + ".html"
+        parts.pop()
+    return default_path
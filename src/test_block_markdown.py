@@ -3,7 +3,8 @@ from block_markdown import (
     markdown_to_blocks,
     block_to_block_type,
     BlockType,
-    markdown_to_html_node
+    markdown_to_html_node,
+    classify_block,
 )
 
 class TestBlockMarkdown(unittest.TestCase):
@@ -60,6 +61,36 @@ This is another paragraph with `code` here
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff</code></pre></div>",
         )
 
+    def test_codeblock_language(self):
+        md = '```python\nx = "<b>" # c\n```'
+        self.assertEqual(
+            markdown_to_html_node(md).to_html(),
+            '<div><pre><code class="language-python">x = <span class="tok-string">"&lt;b&gt;"</span> '
+            '<span class="tok-comment"># c</span></code></pre></div>',
+        )
+
+    def test_codeblock_unknown_language(self):
+        md = "```cobol\nDISPLAY 'HI'.\n```"
+        self.assertEqual(
+            markdown_to_html_node(md).to_html(),
+            "<div><pre><code class=\"language-cobol\">DISPLAY 'HI'.</code></pre></div>",
+        )
+
+    def test_codeblock_first_line_is_code(self):
+        # Only a single language-like token is an info string
+        for md in ("```def foo():\n    return 1\n```", "```x = 1\ny = 2\n```", "```js title=a.js\ncode\n```"):
+            self.assertEqual(
+                markdown_to_html_node(md).to_html(),
+                f"<div><pre><code>{md[3:-3].strip()}</code></pre></div>",
+            )
+
+    def test_codeblock_language_tokens(self):
+        md = "```c++\nint x;\n```"
+        self.assertEqual(
+            markdown_to_html_node(md).to_html(),
+            '<div><pre><code class="language-c++">int x;</code></pre></div>',
+        )
+
     def test_headings(self):
         md = "# h1\n\n## h2\n\n### h3"
         node = markdown_to_html_node(md)
@@ -101,6 +132,26 @@ This is another paragraph with `code` here
             html,
             '<div><p>Text with a <a href="https://boot.dev">link</a> and an <img src="https://i.imgur.com" alt="image"></img></p></div>'
         )
+    def test_classify_block_mixed_lines(self):
+        # A single line without the marker turns the whole block into a paragraph
+        self.assertEqual(classify_block("> a\n> b\nc")[0], BlockType.PARAGRAPH)
+        self.assertEqual(classify_block(">a\n>b")[0], BlockType.QUOTE)
+        self.assertEqual(classify_block("- a\n-b")[0], BlockType.PARAGRAPH)
+        self.assertEqual(classify_block("- a\n- b\n- c")[0], BlockType.ULIST)
+        self.assertEqual(classify_block("1. a\n3. b")[0], BlockType.PARAGRAPH)
+        self.assertEqual(classify_block("1. a\n2.b")[0], BlockType.PARAGRAPH)
+
+    def test_classify_block_hands_lines_to_builders(self):
+        self.assertEqual(classify_block("> a\n> b"), (BlockType.QUOTE, ["> a", "> b"]))
+        self.assertEqual(classify_block("- a\n- b"), (BlockType.ULIST, ["- a", "- b"]))
+        self.assertEqual(classify_block("# a"), (BlockType.HEADING, None))
+
+    def test_classify_block_long_ordered_list(self):
+        md = "\n".join(f"{i}. item" for i in range(1, 120))
+        block_type, lines = classify_block(md)
+        self.assertEqual(block_type, BlockType.OLIST)
+        self.assertEqual(lines, md.split("\n"))
+        self.assertEqual(markdown_to_html_node(md).to_html().count("<li>"), 119)
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,155 @@
+import unittest
+import os
+import shutil
+import tempfile
+import blockcache
+from blockcache import BlockCache
+from block_markdown import markdown_to_html_node
+
+class TestBlockCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_base = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_base, "blocks.sqlite3")
+
+    def tearDown(self):
+        blockcache.configure(0)
+        shutil.rmtree(self.tmp_base)
+
+    def test_lru_is_bounded(self):
+        cache = BlockCache(max_entries=2)
+        for block in ("a", "b", "c"):
+            key, _, _ = cache.get(block)
+            cache.put(key, f"<p>{block}</p>")
+        self.assertEqual(len(cache.entries), 2)
+        self.assertIsNone(cache.get("a")[1])
+        self.assertEqual(cache.get("c")[1], "<p>c</p>")
+
+    def test_lru_is_bounded_by_size(self):
+        cache = BlockCache(max_bytes=10)
+        for block in ("a", "b", "c"):
+            key, _, _ = cache.get(block)
+            cache.put(key, block * 4)
+        self.assertEqual([html for html, _ in cache.entries.values()], ["bbbb", "cccc"])
+        self.assertEqual(cache.size, 8)
+        # Too big to keep at all; the others stay
+        key, _, _ = cache.get("d")
+        cache.put(key, "d" * 11)
+        self.assertIsNone(cache.get("d")[1])
+        self.assertEqual(cache.size, 8)
+
+    def test_pending_writes_are_bounded_by_size(self):
+        cache = BlockCache(path=self.path, max_bytes=10)
+        for block in ("a", "b", "c"):
+            key, _, _ = cache.get(block)
+            cache.put(key, block * 4)
+        self.assertEqual(len(cache.pending), 0)
+        cache.close()
+        fresh = BlockCache(path=self.path)
+        self.assertEqual(fresh.get("a")[1], "aaaa")
+        fresh.close()
+
+    def test_disk_store_survives_new_instance(self):
+        cache = BlockCache(path=self.path)
+        key, _, _ = cache.get("Some **bold** text")
+        cache.put(key, "<p>Some <b>bold</b> text</p>")
+        cache.close()
+
+        fresh = BlockCache(path=self.path)
+        self.assertEqual(fresh.get("Some **bold** text")[1], "<p>Some <b>bold</b> text</p>")
+        self.assertEqual(fresh.hits, 1)
+        fresh.close()
+
+    def test_disk_store_keeps_refs(self):
+        cache = BlockCache(path=self.path)
+        key, _, _ = cache.get("[a](/x) ![i](/i.png)")
+        cache.put(key, '<p><a href="/x">a</a> <img src="/i.png" alt="i"></img></p>', [("link", "/x"), ("image", "/i.png")])
+        cache.close()
+
+        fresh = BlockCache(path=self.path)
+        self.assertEqual(fresh.get("[a](/x) ![i](/i.png)")[2], (("link", "/x"), ("image", "/i.png")))
+        fresh.close()
+
+    def test_disk_store_without_refs_is_replaced(self):
+        import sqlite3
+
+        db = sqlite3.connect(self.path)
+        db.execute("CREATE TABLE blocks (key BLOB PRIMARY KEY, html TEXT NOT NULL)")
+        db.close()
+        cache = BlockCache(path=self.path)
+        key, _, _ = cache.get("text")
+        cache.put(key, "<p>text</p>")
+        cache.close()
+        fresh = BlockCache(path=self.path)
+        self.assertEqual(fresh.get("text")[1:], ("<p>text</p>", ()))
+        fresh.close()
+
+    def test_other_render_versions_are_dropped_on_open(self):
+        import sqlite3
+
+        cache = BlockCache(path=self.path)
+        key, _, _ = cache.get("text")
+        cache.put(key, "<p>text</p>")
+        cache.close()
+        db = sqlite3.connect(self.path)
+        with db:
+            db.execute("UPDATE blocks SET version = 'old'")
+        db.close()
+        fresh = BlockCache(path=self.path)
+        fresh.get("text")
+        self.assertEqual(fresh._db.execute("SELECT COUNT(*) FROM blocks").fetchone()[0], 0)
+        fresh.close()
+
+    def test_least_recently_used_are_dropped_past_disk_cap(self):
+        import sqlite3
+
+        cache = BlockCache(path=self.path)
+        for block in ("a", "b", "c"):
+            key, _, _ = cache.get(block)
+            cache.put(key, block * 4)
+        cache.close()
+        db = sqlite3.connect(self.path)
+        with db:
+            db.execute("UPDATE blocks SET used = 1")
+        db.close()
+        # Reading "a" back records it as used now
+        cache = BlockCache(path=self.path)
+        self.assertEqual(cache.get("a")[1], "aaaa")
+        cache.close()
+
+        fresh = BlockCache(path=self.path, max_disk_bytes=5)
+        self.assertEqual(fresh.get("a")[1], "aaaa")
+        self.assertIsNone(fresh.get("b")[1])
+        self.assertIsNone(fresh.get("c")[1])
+        fresh.close()
+
+    def test_namespace_changes_key(self):
+        self.assertNotEqual(BlockCache(namespace="a").key("x"), BlockCache(namespace="b").key("x"))
+
+    def test_cached_render_matches_uncached(self):
+        md = "# Title\n\nA **bold** [link](/x)\n\n- one\n- two\n\n```\ncode *here*\n```\n\nA **bold** [link](/x)"
+        expected = markdown_to_html_node(md).to_html()
+        cache = blockcache.configure(100)
+        self.assertEqual(markdown_to_html_node(md).to_html(), expected)
+        # The repeated paragraph was served from the cache the first time round
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+        self.assertEqual(markdown_to_html_node(md).to_html(), expected)
+        self.assertEqual(cache.hits, 6)
+
+    def test_minified_blocks_are_cached_separately(self):
+        md = "A  **bold**\n\n```\nkeep  this\n```"
+        cache = blockcache.configure(100)
+        plain = markdown_to_html_node(md).to_html()
+        minified = markdown_to_html_node(md, minify=True).to_html()
+        self.assertEqual(cache.misses, 4)
+        self.assertEqual(plain, "<div><p>A  <b>bold</b></p><pre><code>keep  this</code></pre></div>")
+        self.assertEqual(minified, "<div><p>A <b>bold</b></p><pre><code>keep  this</code></pre></div>")
+        self.assertEqual(markdown_to_html_node(md, minify=True).to_html(), minified)
+
+    def test_configure_off(self):
+        blockcache.configure(100)
+        self.assertIsNotNone(blockcache.active())
+        blockcache.configure(0)
+        self.assertIsNone(blockcache.active())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,7 +2,11 @@ import unittest
 import os
 import shutil
 import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
 from main import copy_files_recursive
+from copystatic import prune_static
+from manifest import load_manifest
 
 class TestCopyStatic(unittest.TestCase):
     def setUp(self):
@@ -58,5 +62,87 @@ class TestCopyStatic(unittest.TestCase):
         for f_name in files:
             self.assertTrue(os.path.exists(os.path.join(self.dst, f_name)))
 
+    def write(self, name, text):
+        path = os.path.join(self.src, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def sync(self, **kwargs):
+        with redirect_stdout(StringIO()) as out:
+            copy_files_recursive(self.src, self.dst, **kwargs)
+        return out.getvalue()
+
+    def test_unchanged_files_are_skipped(self):
+        self.write("a.txt", "a")
+        self.assertIn("a.txt", self.sync())
+        self.assertEqual(self.sync(), "")
+
+    def test_changed_file_is_copied(self):
+        self.write("a.txt", "a")
+        self.sync()
+        self.write("a.txt", "bb")
+        self.assertIn("a.txt", self.sync())
+        with open(os.path.join(self.dst, "a.txt")) as f:
+            self.assertEqual(f.read(), "bb")
+
+    def test_checksum_detects_same_size_edit(self):
+        path = self.write("a.txt", "aa")
+        self.sync()
+        stat = os.stat(os.path.join(self.dst, "a.txt"))
+        self.write("a.txt", "bb")
+        # Same size and mtime: only a content hash can tell them apart
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(self.sync(), "")
+        self.assertIn("a.txt", self.sync(checksum=True))
+
+    def test_hardlink(self):
+        path = self.write("a.txt", "a")
+        self.sync(link=True)
+        self.assertTrue(os.path.samefile(path, os.path.join(self.dst, "a.txt")))
+        # A build without --hardlink turns the link back into a copy
+        self.sync()
+        self.assertFalse(os.path.samefile(path, os.path.join(self.dst, "a.txt")))
+        # Switching back to copies must not write through the link into static/
+        self.write("a.txt", "changed")
+        self.sync()
+        self.write("a.txt", "again!!")
+        self.sync()
+        with open(path) as f:
+            self.assertEqual(f.read(), "again!!")
+
+    def test_prune_removes_only_stale_static_files(self):
+        manifest_path = os.path.join(self.tmp_base, "manifest.json")
+        self.write("a.txt", "a")
+        os.mkdir(os.path.join(self.src, "img"))
+        self.write(os.path.join("img", "b.png"), "b")
+        with redirect_stdout(StringIO()):
+            prune_static(copy_files_recursive(self.src, self.dst), self.dst, manifest_path)
+            # A generated page living next to the assets
+            with open(os.path.join(self.dst, "index.html"), "w") as f:
+                f.write("<html></html>")
+            shutil.rmtree(os.path.join(self.src, "img"))
+            removed = prune_static(copy_files_recursive(self.src, self.dst), self.dst, manifest_path)
+        self.assertEqual(removed, 1)
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "img")))
+        self.assertTrue(os.path.exists(os.path.join(self.dst, "a.txt")))
+        self.assertTrue(os.path.exists(os.path.join(self.dst, "index.html")))
+
+    def test_prune_saves_the_manifest_only_when_the_list_changed(self):
+        manifest_path = os.path.join(self.tmp_base, "manifest.json")
+        self.write("a.txt", "a")
+        with redirect_stdout(StringIO()):
+            prune_static(copy_files_recursive(self.src, self.dst), self.dst, manifest_path)
+            os.utime(manifest_path, ns=(1, 1))
+            prune_static(copy_files_recursive(self.src, self.dst), self.dst, manifest_path)
+        self.assertEqual(os.stat(manifest_path).st_mtime_ns, 1)
+        # A loaded manifest is updated in place and left to the caller to save
+        manifest = load_manifest(manifest_path)
+        self.write("b.txt", "b")
+        with redirect_stdout(StringIO()):
+            prune_static(copy_files_recursive(self.src, self.dst), self.dst, manifest_path, manifest)
+        self.assertEqual(manifest["static"], [os.path.join(self.dst, "a.txt"), os.path.join(self.dst, "b.txt")])
+        self.assertEqual(os.stat(manifest_path).st_mtime_ns, 1)
+
 if __name__ == "__main__":
     unittest.main()
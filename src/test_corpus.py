@@ -0,0 +1,39 @@
+import unittest
+import os
+import shutil
+import tempfile
+from block_markdown import markdown_to_html_node
+from gencontent import extract_title
+from corpus import SHAPES, generate_corpus, generate_markdown
+
+class TestCorpus(unittest.TestCase):
+    def test_every_shape_parses(self):
+        for shape in SHAPES:
+            markdown = generate_markdown(shape, 6, seed=1)
+            self.assertTrue(extract_title(markdown))
+            html = markdown_to_html_node(markdown).to_html()
+            self.assertTrue(html.startswith("<div><h1>"), shape)
+
+    def test_shapes_have_their_blocks(self):
+        self.assertIn("<ol>", markdown_to_html_node(generate_markdown("lists", 4)).to_html())
+        self.assertIn("<blockquote>", markdown_to_html_node(generate_markdown("quotes", 4)).to_html())
+        self.assertIn("<pre><code>", markdown_to_html_node(generate_markdown("code", 4)).to_html())
+        self.assertIn("<img", markdown_to_html_node(generate_markdown("links", 4)).to_html())
+
+    def test_deterministic(self):
+        self.assertEqual(generate_markdown("small", 5, 3), generate_markdown("small", 5, 3))
+        self.assertNotEqual(generate_markdown("small", 5, 3), generate_markdown("small", 5, 4))
+
+    def test_generate_corpus_layout(self):
+        root = tempfile.mkdtemp()
+        try:
+            nbytes = generate_corpus(root, "small", 5, 3, per_dir=2)
+            self.assertGreater(nbytes, 0)
+            self.assertTrue(os.path.exists(os.path.join(root, "template.html")))
+            self.assertTrue(os.path.exists(os.path.join(root, "static", "index.css")))
+            self.assertTrue(os.path.exists(os.path.join(root, "content", "section2", "page4", "index.md")))
+        finally:
+            shutil.rmtree(root)
+
+if __name__ == "__main__":
+    unittest.main()
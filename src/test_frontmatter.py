@@ -0,0 +1,49 @@
+import unittest
+from frontmatter import parse_front_matter, split_front_matter
+from block_markdown import markdown_to_blocks
+
+class TestFrontMatter(unittest.TestCase):
+    def test_parse(self):
+        block = (
+            "---\n"
+            "title: \"Tom: a character\"\n"
+            "date: 2024-05-01\n"
+            "tags: [tolkien, 'characters', ]\n"
+            "Template: blog/post\n"
+            "draft: yes\n"
+            "---"
+        )
+        self.assertEqual(
+            parse_front_matter(block),
+            {
+                "title": "Tom: a character",
+                "date": "2024-05-01",
+                "tags": ("tolkien", "characters"),
+                "template": "blog/post",
+                "draft": True,
+            },
+        )
+
+    def test_not_front_matter(self):
+        self.assertIsNone(parse_front_matter("# Title"))
+        self.assertIsNone(parse_front_matter("---\ntitle: x"))
+        self.assertEqual(parse_front_matter("---\n---"), {})
+
+    def test_invalid(self):
+        for line in ("author: me", "no colon", "date: May 1st", "draft: maybe"):
+            with self.assertRaises(ValueError, msg=line):
+                parse_front_matter(f"---\n{line}\n---")
+        self.assertEqual(parse_front_matter("---\ndate: 2024-05-01T10:30\n---"), {"date": "2024-05-01T10:30"})
+
+    def test_split_front_matter(self):
+        meta, blocks = split_front_matter(markdown_to_blocks("---\ntitle: T\n---\n\n# Heading\n\ntext"))
+        self.assertEqual(meta, {"title": "T"})
+        self.assertEqual(list(blocks), ["# Heading", "text"])
+        meta, blocks = split_front_matter(iter(["# Heading", "text"]))
+        self.assertEqual(meta, {})
+        self.assertEqual(list(blocks), ["# Heading", "text"])
+        meta, blocks = split_front_matter([])
+        self.assertEqual((meta, list(blocks)), ({}, []))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,22 @@
 import unittest
-from gencontent import extract_title
+from unittest.mock import patch
+import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+from gencontent import (
+    BuildOptions,
+    extract_title,
+    generate_page,
+    discover_pages,
+    generate_pages,
+    generate_pages_recursive,
+    generate_pages_incremental,
+)
+from manifest import load_manifest
+import gencontent
+from metaindex import MetadataIndex
 
 class TestGenContent(unittest.TestCase):
     def test_extract_title(self):
@@ -35,3 +52,466 @@ class TestGenContent(unittest.TestCase):
         # Completely empty document
         with self.assertRaises(Exception):
             extract_title("")
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp_base = tempfile.mkdtemp()
+        self.content = os.path.join(self.tmp_base, "content")
+        self.dest = os.path.join(self.tmp_base, "docs")
+        self.template = os.path.join(self.tmp_base, "template.html")
+        self.manifest = os.path.join(self.tmp_base, ".cache", "manifest.json")
+        os.makedirs(os.path.join(self.content, "blog", "post"))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "post", "index.md"), "# Post")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_base)
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def build(self, basepath="/"):
+        with redirect_stdout(StringIO()):
+            return generate_pages_incremental(
+                self.content, self.template, self.dest, self.manifest, BuildOptions(basepath)
+            )
+
+    def test_discover_pages(self):
+        pages = discover_pages(self.content, self.dest)
+        self.assertEqual(
+            pages,
+            [
+                (
+                    os.path.join(self.content, "blog", "post", "index.md"),
+                    os.path.join(self.dest, "blog", "post", "index.html"),
+                ),
+                (os.path.join(self.content, "index.md"), os.path.join(self.dest, "index.html")),
+            ],
+        )
+
+    def test_first_build_renders_everything(self):
+        self.assertEqual(self.build(), (2, 0))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+        self.assertTrue(os.path.exists(self.manifest))
+
+    def test_loaded_manifest_is_updated_in_place(self):
+        self.build()
+        manifest = load_manifest(self.manifest)
+        os.utime(self.manifest, ns=(1, 1))
+        self.write(os.path.join(self.content, "index.md"), "# Home edited")
+        with redirect_stdout(StringIO()):
+            generate_pages_incremental(self.content, self.template, self.dest, self.manifest, manifest=manifest)
+        # Saving is left to the caller
+        self.assertEqual(os.stat(self.manifest).st_mtime_ns, 1)
+        index = MetadataIndex.from_json(manifest["index"])
+        self.assertEqual(index.get(os.path.join(self.content, "index.md"))["title"], "Home edited")
+
+    def test_unchanged_rebuild_renders_nothing(self):
+        self.build()
+        self.assertEqual(self.build(), (0, 0))
+
+    def test_changed_page_renders_only_that_page(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# Home again")
+        self.assertEqual(self.build(), (1, 0))
+        with open(os.path.join(self.dest, "index.html")) as f:
+            self.assertIn("Home again", f.read())
+
+    def test_template_change_renders_everything(self):
+        self.build()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(self.build(), (2, 0))
+
+    def test_basepath_change_renders_everything(self):
+        self.build()
+        self.assertEqual(self.build("/site/"), (2, 0))
+
+    def test_renderer_change_renders_everything(self):
+        self.build()
+        self.assertEqual(self.build(), (0, 0))
+        with patch.object(gencontent.blockcache, "RENDER_VERSION", "old"):
+            self.assertEqual(self.build(), (2, 0))
+        self.assertEqual(self.build(), (2, 0))
+        self.assertEqual(self.build(), (0, 0))
+
+    def test_identical_pages_are_not_rewritten(self):
+        self.build()
+        index = os.path.join(self.dest, "index.html")
+        os.utime(index, ns=(1, 1))
+        # Nothing in these pages depends on the basepath: both re-render to the same bytes
+        with redirect_stdout(StringIO()) as out:
+            generate_pages_incremental(self.content, self.template, self.dest, self.manifest, BuildOptions("/site/"))
+        self.assertIn("2 page(s) rendered, 0 changed on disk", out.getvalue())
+        self.assertEqual(os.stat(index).st_mtime_ns, 1)
+
+        self.write(os.path.join(self.content, "index.md"), "# Home again")
+        for jobs, writers in ((1, 0), (2, 1)):
+            with redirect_stdout(StringIO()) as out:
+                generate_pages_incremental(
+                    self.content, self.template, self.dest, self.manifest, BuildOptions(f"/{jobs}/", jobs=jobs, writers=writers)
+                )
+            self.assertIn("2 page(s) rendered, 1 changed on disk", out.getvalue())
+            self.write(os.path.join(self.content, "index.md"), "# Home edited")
+
+    def test_section_layouts(self):
+        templates = os.path.join(self.tmp_base, "templates")
+        os.makedirs(templates)
+        blog_template = os.path.join(templates, "blog.html")
+        self.write(blog_template, "<article>{{ Content }}</article>")
+
+        def build():
+            with redirect_stdout(StringIO()):
+                return generate_pages_incremental(
+                    self.content, self.template, self.dest, self.manifest, BuildOptions(templates_dir=templates)
+                )
+
+        def read(*parts):
+            with open(os.path.join(self.dest, *parts)) as f:
+                return f.read()
+
+        self.assertEqual(build(), (2, 0))
+        self.assertEqual(read("blog", "post", "index.html"), "<article><div><h1>Post</h1></div></article>")
+        self.assertEqual(read("index.html"), "<title>Home</title><div><h1>Home</h1></div>")
+        # A layout change only re-renders the pages that use it
+        self.write(blog_template, "<section>{{ Content }}</section>")
+        self.assertEqual(build(), (1, 0))
+        self.write(self.template, "<h1>{{ Title }}</h1>")
+        self.assertEqual(build(), (1, 0))
+        self.assertEqual(read("index.html"), "<h1>Home</h1>")
+        # So does moving a page to another layout
+        os.remove(blog_template)
+        self.assertEqual(build(), (1, 0))
+        self.assertEqual(read("blog", "post", "index.html"), "<h1>Post</h1>")
+        self.assertEqual(build(), (0, 0))
+
+    def test_front_matter_template_outside_templates_dir(self):
+        templates = os.path.join(self.tmp_base, "templates")
+        os.makedirs(templates)
+        self.write(os.path.join(self.tmp_base, "secret.html"), "{{ Content }}")
+        post = os.path.join(self.content, "blog", "post", "index.md")
+        self.write(post, "---\ntemplate: ../secret\n---\n\n# Post")
+        out = StringIO()
+        with redirect_stdout(out), self.assertRaises(Exception):
+            generate_pages_incremental(
+                self.content, self.template, self.dest, self.manifest, BuildOptions(templates_dir=templates)
+            )
+        self.assertIn(f"Error generating page from {post}: ValueError: Invalid template name: '../secret'", out.getvalue())
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "post", "index.html")))
+
+    def test_basepath_string_in_place_of_options(self):
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(self.content, self.template, self.dest, "/base/")
+            generate_page(
+                os.path.join(self.content, "index.md"), self.template, os.path.join(self.dest, "home.html"), "/base/"
+            )
+        with open(os.path.join(self.dest, "home.html")) as f:
+            self.assertEqual(f.read(), "<title>Home</title><div><h1>Home</h1></div>")
+
+    def test_log_names_the_front_matter_layout(self):
+        templates = os.path.join(self.tmp_base, "templates")
+        os.makedirs(templates)
+        self.write(os.path.join(templates, "post.html"), "<article>{{ Content }}</article>")
+        post = os.path.join(self.content, "blog", "post", "index.md")
+        self.write(post, "---\ntemplate: post\n---\n\n# Post")
+        with redirect_stdout(StringIO()) as out:
+            generate_page(post, self.template, os.path.join(self.dest, "post.html"), BuildOptions(templates_dir=templates))
+        self.assertIn(f"using {os.path.join(templates, 'post.html')}", out.getvalue())
+
+    def test_section_layouts_in_worker_processes(self):
+        templates = os.path.join(self.tmp_base, "templates")
+        os.makedirs(templates)
+        self.write(os.path.join(templates, "blog.html"), "<article>{{ Content }}</article>")
+        for i in range(4):
+            self.write(os.path.join(self.content, "blog", f"p{i}.md"), f"# P{i}")
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(self.content, self.template, self.dest, BuildOptions(jobs=2, templates_dir=templates))
+        with open(os.path.join(self.dest, "blog", "p3.html")) as f:
+            self.assertEqual(f.read(), "<article><div><h1>P3</h1></div></article>")
+
+    def test_front_matter(self):
+        templates = os.path.join(self.tmp_base, "templates")
+        os.makedirs(templates)
+        self.write(os.path.join(templates, "post.html"), "<article>{{ Title }}</article>")
+        post = os.path.join(self.content, "blog", "post", "index.md")
+        self.write(post, "---\ntitle: Front\ndate: 2024-05-01\ntags: a, b\ntemplate: post\n---\n\n# Post")
+
+        def build():
+            with redirect_stdout(StringIO()):
+                return generate_pages_incremental(
+                    self.content, self.template, self.dest, self.manifest, BuildOptions(templates_dir=templates)
+                )
+
+        # Every render path reads the front matter the same way
+        for writers, jobs in ((0, 1), (1, 1), (0, 2)):
+            shutil.rmtree(self.dest, ignore_errors=True)
+            with redirect_stdout(StringIO()):
+                generate_pages_incremental(
+                    self.content,
+                    self.template,
+                    self.dest,
+                    self.manifest,
+                    BuildOptions(templates_dir=templates, jobs=jobs, writers=writers),
+                )
+            with open(os.path.join(self.dest, "blog", "post", "index.html")) as f:
+                self.assertEqual(f.read(), "<article>Front</article>")
+
+        index = MetadataIndex.from_json(load_manifest(self.manifest)["index"])
+        self.assertEqual(
+            index.get(post),
+            {"title": "Front", "date": "2024-05-01", "tags": ("a", "b"), "template": "post", "draft": False},
+        )
+        self.assertEqual(index.get(os.path.join(self.content, "index.md"))["title"], "Home")
+
+        # The named layout is a dependency of the page, and the index survives skipped pages
+        self.assertEqual(build(), (0, 0))
+        self.write(os.path.join(templates, "post.html"), "<main>{{ Title }}</main>")
+        self.assertEqual(build(), (1, 0))
+        index = MetadataIndex.from_json(load_manifest(self.manifest)["index"])
+        self.assertEqual(index.get(post)["tags"], ("a", "b"))
+
+    def test_drafts_are_not_published(self):
+        post = os.path.join(self.content, "blog", "post", "index.md")
+        post_output = os.path.join(self.dest, "blog", "post", "index.html")
+        self.build()
+        self.assertTrue(os.path.exists(post_output))
+        self.write(post, "---\ndraft: true\n---\n\n# Post")
+        with redirect_stdout(StringIO()) as out:
+            generate_pages_incremental(self.content, self.template, self.dest, self.manifest)
+        self.assertIn("1 draft(s)", out.getvalue())
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+        # Not re-rendered while it stays a draft
+        self.assertEqual(self.build(), (0, 0))
+        self.write(post, "# Post")
+        self.assertEqual(self.build(), (1, 0))
+        self.assertTrue(os.path.exists(post_output))
+
+    def test_new_draft_leaves_no_directory(self):
+        secret = os.path.join(self.content, "blog", "secret")
+        os.makedirs(secret)
+        self.write(os.path.join(secret, "index.md"), "---\ndraft: true\n---\n\n# Secret")
+        with redirect_stdout(StringIO()) as out:
+            self.assertEqual(
+                generate_pages_incremental(self.content, self.template, self.dest, self.manifest), (2, 0)
+            )
+        self.assertIn("2 page(s) rendered", out.getvalue())
+        self.assertIn("1 draft(s)", out.getvalue())
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "secret")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "blog", "post", "index.html")))
+
+        shutil.rmtree(self.dest)
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(self.content, self.template, self.dest)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "secret")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "blog", "post", "index.html")))
+
+    def test_deleted_output_is_rendered_again(self):
+        self.build()
+        os.remove(os.path.join(self.dest, "index.html"))
+        self.assertEqual(self.build(), (1, 0))
+
+    def test_removed_source_deletes_output(self):
+        self.build()
+        shutil.rmtree(os.path.join(self.content, "blog"))
+        self.assertEqual(self.build(), (0, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+
+    def test_changed_hint_limits_rehashing(self):
+        self.build()
+        index = os.path.join(self.content, "index.md")
+        post = os.path.join(self.content, "blog", "post", "index.md")
+        self.write(index, "# Home edited")
+        self.write(post, "# Post edited")
+        # Only paths reported as changed are re-read; the rest trust the manifest
+        with redirect_stdout(StringIO()):
+            result = generate_pages_incremental(
+                self.content, self.template, self.dest, self.manifest, changed={post}
+            )
+        self.assertEqual(result, (1, 0))
+        self.assertEqual(self.build(), (1, 0))
+
+    def test_crlf_page_matches_lf_page(self):
+        crlf_path = os.path.join(self.content, "crlf.md")
+        with open(crlf_path, "wb") as f:
+            f.write(b"# Title\r\n\r\nSome **bold**\r\nmore\r\n")
+        lf_path = os.path.join(self.content, "lf.md")
+        self.write(lf_path, "# Title\n\nSome **bold**\nmore\n")
+        with redirect_stdout(StringIO()):
+            generate_page(crlf_path, self.template, os.path.join(self.dest, "crlf.html"))
+            generate_page(lf_path, self.template, os.path.join(self.dest, "lf.html"))
+        with open(os.path.join(self.dest, "crlf.html")) as a, open(os.path.join(self.dest, "lf.html")) as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_parse_error_leaves_no_partial_page(self):
+        bad_path = os.path.join(self.content, "bad.md")
+        dest_path = os.path.join(self.dest, "bad.html")
+        self.write(bad_path, "# Title\n\nfine\n\nbroken **bold")
+        with redirect_stdout(StringIO()), self.assertRaises(ValueError):
+            generate_page(bad_path, self.template, dest_path)
+        self.assertFalse(os.path.exists(dest_path))
+
+    def test_large_pages_bypass_the_writer(self):
+        class Writer:
+            def submit(self, dest_path, chunks):
+                raise AssertionError("large page held in memory")
+
+        path = os.path.join(self.content, "big.md")
+        dest_path = os.path.join(self.dest, "big.html")
+        self.write(path, "# Big\n\n" + "text\n\n" * 100)
+        threshold = gencontent.STREAM_THRESHOLD
+        gencontent.STREAM_THRESHOLD = 100
+        try:
+            with redirect_stdout(StringIO()):
+                changed, _ = generate_page(path, self.template, dest_path, writer=Writer())
+        finally:
+            gencontent.STREAM_THRESHOLD = threshold
+        self.assertTrue(changed)
+        self.assertTrue(os.path.exists(dest_path))
+
+    def test_output_dirs_are_created_once_per_build(self):
+        for i in range(3):
+            self.write(os.path.join(self.content, "blog", "post", f"page{i}.md"), f"# Page {i}")
+        pages = discover_pages(self.content, self.dest)
+        # With the directories in place, os.makedirs does not recurse into itself
+        with redirect_stdout(StringIO()):
+            generate_pages(pages, self.template)
+        for writers in (0, 1):
+            with self.subTest(writers=writers):
+                with patch("os.makedirs", wraps=os.makedirs) as makedirs, redirect_stdout(StringIO()):
+                    generate_pages(pages, self.template, BuildOptions(writers=writers))
+                # docs and docs/blog/post, not one call per page
+                self.assertEqual(makedirs.call_count, 2)
+
+    def test_parse_error_keeps_the_last_good_page(self):
+        path = os.path.join(self.content, "page.md")
+        dest_path = os.path.join(self.dest, "page.html")
+        self.write(path, "# Title\n\nfine")
+        with redirect_stdout(StringIO()):
+            generate_page(path, self.template, dest_path)
+        with open(dest_path) as f:
+            good = f.read()
+        self.write(path, "# Title\n\nchanged\n\nbroken **bold")
+        with redirect_stdout(StringIO()), self.assertRaises(ValueError):
+            generate_page(path, self.template, dest_path)
+        with open(dest_path) as f:
+            self.assertEqual(f.read(), good)
+        self.assertEqual(os.listdir(self.dest), ["page.html"])
+
+    def test_failed_page_is_reported_and_retried(self):
+        bad_path = os.path.join(self.content, "bad.md")
+        self.write(bad_path, "no title here")
+        with self.assertRaises(Exception):
+            self.build()
+        # The good pages were still written and the bad one is retried next time
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+        self.write(bad_path, "# Fixed")
+        self.assertEqual(self.build(), (1, 0))
+
+    def test_parallel_output_matches_serial(self):
+        for i in range(8):
+            self.write(os.path.join(self.content, f"page{i}.md"), f"# Page {i}\n\n**bold** [link](/x)")
+        pages = discover_pages(self.content, self.dest)
+        serial_pages = [(src, dest.replace(self.dest, self.dest + "-serial")) for src, dest in pages]
+        with redirect_stdout(StringIO()):
+            self.assertEqual(generate_pages(serial_pages, self.template, BuildOptions("/base/")), {})
+            self.assertEqual(generate_pages(pages, self.template, BuildOptions("/base/", jobs=4)), {})
+        for (_, parallel_dest), (_, serial_dest) in zip(pages, serial_pages):
+            with open(parallel_dest, "rb") as a, open(serial_dest, "rb") as b:
+                self.assertEqual(a.read(), b.read())
+
+    def test_write_behind_output_matches_streaming(self):
+        for i in range(6):
+            self.write(os.path.join(self.content, f"page{i}.md"), f"# Page {i}\r\n\r\n**bold** [link](/x)" if i % 2 else f"# Page {i}\n\n_it_")
+        pages = discover_pages(self.content, self.dest)
+        for writers, jobs in ((2, 1), (0, 1), (2, 2)):
+            other = self.dest + f"-{writers}-{jobs}"
+            other_pages = [(src, dest.replace(self.dest, other)) for src, dest in pages]
+            with redirect_stdout(StringIO()):
+                self.assertEqual(generate_pages(other_pages, self.template, BuildOptions("/base/", jobs=jobs, writers=writers)), {})
+                self.assertEqual(generate_pages(pages, self.template, BuildOptions("/base/")), {})
+            for (_, dest), (_, other_dest) in zip(pages, other_pages):
+                with open(dest, "rb") as a, open(other_dest, "rb") as b:
+                    self.assertEqual(a.read(), b.read())
+
+    def test_write_behind_reports_failed_pages(self):
+        bad_path = os.path.join(self.content, "bad.md")
+        self.write(bad_path, "no title here")
+        pages = discover_pages(self.content, self.dest)
+        with redirect_stdout(StringIO()):
+            errors = generate_pages(pages, self.template, BuildOptions(writers=2))
+        self.assertEqual(list(errors), [bad_path])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "bad.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "blog", "post", "index.html")))
+
+    def test_minify_change_renders_everything(self):
+        self.build()
+        with redirect_stdout(StringIO()):
+            result = generate_pages_incremental(
+                self.content, self.template, self.dest, self.manifest, BuildOptions(minify=True)
+            )
+        self.assertEqual(result, (2, 0))
+        with redirect_stdout(StringIO()):
+            result = generate_pages_incremental(
+                self.content, self.template, self.dest, self.manifest, BuildOptions(minify=True)
+            )
+        self.assertEqual(result, (0, 0))
+
+    def test_minified_page_keeps_code_blocks(self):
+        self.write(self.template, "<html>\n  <title>{{ Title }}</title>\n  <body>{{ Content }}</body>\n</html>\n")
+        path = os.path.join(self.content, "code.md")
+        self.write(path, "# Code\n\nsome   text\n\n```\ndef f():\n    return  1\n```")
+        dest_path = os.path.join(self.dest, "code.html")
+        with redirect_stdout(StringIO()):
+            generate_page(path, self.template, dest_path, BuildOptions(minify=True))
+        with open(dest_path) as f:
+            self.assertEqual(
+                f.read(),
+                "<html><title>Code</title><body><div><h1>Code</h1><p>some text</p>"
+                "<pre><code>def f():\n    return  1</code></pre></div></body></html>",
+            )
+
+    def build_checked(self, check_links="warn", jobs=1):
+        with redirect_stdout(StringIO()) as out:
+            generate_pages_incremental(
+                self.content, self.template, self.dest, self.manifest, BuildOptions(jobs=jobs, check_links=check_links)
+            )
+        return out.getvalue()
+
+    def test_broken_links_are_reported(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/post) [gone](/blog/gone) ![x](x.png)")
+        out = self.build_checked()
+        home = os.path.join(self.content, "index.md")
+        self.assertIn(f"Broken link in {home}: /blog/gone", out)
+        self.assertIn(f"Broken image in {home}: x.png", out)
+        self.assertNotIn("/blog/post\n", out)
+        with self.assertRaises(Exception):
+            self.build_checked("error")
+
+    def test_links_of_skipped_pages_come_from_the_manifest(self):
+        self.write(os.path.join(self.content, "blog", "post", "index.md"), "# Post\n\n[home](/) [gone](../gone)")
+        self.build_checked()
+        # Nothing is rendered, yet the post's broken link is still reported
+        out = self.build_checked(jobs=2)
+        self.assertIn("0 page(s) rendered", out)
+        post = os.path.join(self.content, "blog", "post", "index.md")
+        self.assertEqual(out.count("Broken "), 1)
+        self.assertIn(f"Broken link in {post}: ../gone", out)
+
+    def test_enabling_link_checks_renders_unindexed_pages(self):
+        self.build()
+        out = self.build_checked()
+        self.assertIn("2 page(s) rendered", out)
+        self.assertIn("0 page(s) rendered", self.build_checked())
+
+    def test_parallel_errors_are_reported_per_file(self):
+        bad_path = os.path.join(self.content, "bad.md")
+        self.write(bad_path, "no title here")
+        pages = discover_pages(self.content, self.dest)
+        with redirect_stdout(StringIO()) as out:
+            errors = generate_pages(pages, self.template, BuildOptions(jobs=2))
+        self.assertEqual(list(errors), [bad_path])
+        self.assertIn("No h1 header found in markdown", errors[bad_path])
+        self.assertIn(f"Error generating page from {bad_path}", out.getvalue())
@@ -0,0 +1,73 @@
+import unittest
+import highlight
+from highlight import language_name, tokenize
+
+class TestHighlight(unittest.TestCase):
+    def setUp(self):
+        highlight.clear_cache()
+
+    def test_language_name(self):
+        self.assertEqual(language_name("python"), "python")
+        self.assertEqual(language_name("py"), "python")
+        self.assertEqual(language_name("JS"), "javascript")
+        self.assertEqual(language_name("sh"), "bash")
+        self.assertIsNone(language_name("brainfuck"))
+        self.assertIsNone(language_name("   "))
+
+    def test_tokens_cover_the_code(self):
+        for language in highlight.LEXERS:
+            code = 'x = "a # b" # note\nif 0x1F: print(1.5e3)\n'
+            self.assertEqual("".join(text for _, text in tokenize(code, language)), code)
+
+    def test_python(self):
+        tokens = [token for token in tokenize('def f():\n    return "# no" # yes', "python") if token[0]]
+        self.assertEqual(
+            tokens,
+            [("keyword", "def"), ("keyword", "return"), ("string", '"# no"'), ("comment", "# yes")],
+        )
+
+    def test_keywords_are_whole_words(self):
+        self.assertEqual(tokenize("define", "python"), [(None, "define")])
+
+    def test_json_keys(self):
+        tokens = [token for token in tokenize('{"a": "b", "n": -1, "t": true}', "json") if token[0]]
+        self.assertEqual(
+            tokens,
+            [("key", '"a"'), ("string", '"b"'), ("key", '"n"'), ("number", "-1"), ("key", '"t"'), ("builtin", "true")],
+        )
+
+    def test_bash_variables_and_comments(self):
+        tokens = [token for token in tokenize("echo $HOME ${#x} # done", "bash") if token[0]]
+        self.assertEqual(
+            tokens,
+            [("builtin", "echo"), ("variable", "$HOME"), ("variable", "${#x}"), ("comment", "# done")],
+        )
+
+    def test_escapes_html(self):
+        html = highlight.highlight('if a < b: s = "<b>&"', "python")
+        self.assertEqual(
+            html,
+            '<span class="tok-keyword">if</span> a &lt; b: s = <span class="tok-string">"&lt;b&gt;&amp;"</span>',
+        )
+
+    def test_cache_by_code_and_language(self):
+        first = highlight.highlight("return 1", "python")
+        self.assertIs(highlight.highlight("return 1", "python"), first)
+        highlight.highlight("return 1", "javascript")
+        stats = highlight.cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 2, 2))
+
+    def test_cache_is_bounded(self):
+        size = highlight.HIGHLIGHT_CACHE_SIZE
+        highlight.HIGHLIGHT_CACHE_SIZE = 2
+        try:
+            for code in ("a", "b", "c"):
+                highlight.highlight(code, "python")
+            self.assertEqual(highlight.cache_stats()["entries"], 2)
+            highlight.highlight("a", "python")
+            self.assertEqual(highlight.cache_stats()["misses"], 4)
+        finally:
+            highlight.HIGHLIGHT_CACHE_SIZE = size
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
+from io import StringIO
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, RawHTML, fold_whitespace
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -110,6 +111,78 @@ class TestHTMLNode(unittest.TestCase):
         )
         self.assertEqual(node.to_html(), "<h2><b>Bold</b> and <i>italic</i></h2>")
 
+    def test_nodes_are_slotted(self):
+        for node in (HTMLNode(), LeafNode("p", "x"), ParentNode("div", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_write_html_to_list(self):
+        node = ParentNode("p", [LeafNode("b", "Bold"), LeafNode(None, " text")])
+        parts = []
+        node.write_html(parts)
+        self.assertEqual(parts, ["<p>", "<b>Bold</b>", " text", "</p>"])
+
+    def test_write_html_to_file(self):
+        node = ParentNode(
+            "div",
+            [ParentNode("span", [LeafNode("a", "link", {"href": "/x"})])],
+            {"class": "box"},
+        )
+        out = StringIO()
+        node.write_html(out)
+        self.assertEqual(out.getvalue(), node.to_html())
+        self.assertEqual(out.getvalue(), '<div class="box"><span><a href="/x">link</a></span></div>')
+
+    def test_write_html_to_callable(self):
+        parts = []
+        LeafNode("i", "x").write_html(parts.append)
+        self.assertEqual(parts, ["<i>x</i>"])
+
+    def test_write_html_invalid_child(self):
+        node = ParentNode("div", [ParentNode(None, [])])
+        with self.assertRaises(ValueError):
+            node.write_html([])
+
+    def test_deep_tree(self):
+        node = LeafNode(None, "x")
+        for _ in range(200):
+            node = ParentNode("span", [node])
+        self.assertEqual(node.to_html(), "<span>" * 200 + "x" + "</span>" * 200)
+
+    def test_fold_whitespace(self):
+        self.assertEqual(fold_whitespace("a  b\n\tc "), "a b c ")
+        self.assertEqual(fold_whitespace("a\u00a0\u00a0b"), "a\u00a0\u00a0b")
+        text = "nothing to fold"
+        self.assertIs(fold_whitespace(text), text)
+
+    def test_write_html_folds_every_whitespace_kind(self):
+        # The guard inlined in LeafNode must not miss what fold_whitespace folds
+        for text in ("a  b", "a\nb", "a\tb", "a\rb", "a\fb"):
+            parts = []
+            LeafNode("b", text).write_html(parts, minify=True)
+            self.assertEqual("".join(parts), f"<b>{fold_whitespace(text)}</b>")
+            self.assertEqual("".join(parts), "<b>a b</b>")
+
+    def test_write_html_minified(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "two\n  lines "), LeafNode("b", "bold   text")]),
+            ParentNode("pre", [ParentNode("code", [LeafNode(None, "keep\n    indent")])]),
+            LeafNode("code", "inline  code"),
+        ])
+        parts = []
+        node.write_html(parts, minify=True)
+        self.assertEqual(
+            "".join(parts),
+            "<div><p>two lines <b>bold text</b></p><pre><code>keep\n    indent</code></pre><code>inline  code</code></div>",
+        )
+        # Minifying is opt-in
+        self.assertIn("two\n  lines", node.to_html())
+
+    def test_raw_html_is_never_folded(self):
+        node = ParentNode("div", [RawHTML("<pre><code>a\n  b</code></pre>")])
+        parts = []
+        node.write_html(parts, minify=True)
+        self.assertEqual("".join(parts), "<div><pre><code>a\n  b</code></pre></div>")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -169,6 +169,34 @@ class TestInlineMarkdown(unittest.TestCase):
             nodes,
         )
 
+    def test_text_to_textnodes_matches_split_passes(self):
+        # The single-pass scanner must agree with chaining the split_nodes_* passes
+        texts = [
+            "",
+            "plain",
+            "**a** *b* _c_ `d` ![e](f) [g](h)",
+            "**bold with *star* inside** and `code` after",
+            "[link](https://boot.dev) then ![img](/i.png)[next](/n)",
+            "snake_case_name and [a](b) [c](d) [e](f)",
+            "![a](b)![c](d)",
+            "[x](y ![z](w) tail",
+        ]
+        for text in texts:
+            nodes = [TextNode(text, TextType.PLAIN)]
+            nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+            nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
+            nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+            nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+            nodes = split_nodes_image(nodes)
+            nodes = split_nodes_link(nodes)
+            self.assertListEqual(nodes, text_to_textnodes(text), text)
+
+    def test_text_to_textnodes_unmatched_delimiter(self):
+        with self.assertRaises(ValueError):
+            text_to_textnodes("This is **not closed")
+        with self.assertRaises(ValueError):
+            text_to_textnodes("**bold** then `open")
+
     def test_text_to_textnodes_simple(self):
         # Test a string with no special markdown
         nodes = text_to_textnodes("Just plain text")
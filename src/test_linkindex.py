@@ -0,0 +1,102 @@
+import unittest
+import os
+import shutil
+import tempfile
+import blockcache
+import linkindex
+from linkindex import LinkIndex, resolve, candidates, site_path
+from block_markdown import markdown_to_html_node
+
+class TestLinkIndex(unittest.TestCase):
+    def tearDown(self):
+        linkindex.end_page()
+        blockcache.configure(0)
+
+    def collect(self, markdown):
+        linkindex.start_page()
+        markdown_to_html_node(markdown).to_html()
+        return linkindex.end_page()
+
+    def test_resolve(self):
+        self.assertEqual(resolve("/blog/tom", "/index.html"), "/blog/tom")
+        self.assertEqual(resolve("/blog/tom/", "/index.html"), "/blog/tom/")
+        self.assertEqual(resolve("images/a.png", "/blog/tom/index.html"), "/blog/tom/images/a.png")
+        self.assertEqual(resolve("../contact", "/blog/tom/index.html"), "/blog/contact")
+        self.assertEqual(resolve("/a%20b.png?v=1#x", "/index.html"), "/a b.png")
+        self.assertEqual(resolve("/", "/blog/index.html"), "/")
+
+    def test_external_and_anchors_are_skipped(self):
+        for url in ("https://boot.dev", "//cdn.example.com/x.js", "mailto:me@x.y", "#top", "?page=2"):
+            self.assertIsNone(resolve(url, "/index.html"), url)
+
+    def test_candidates(self):
+        self.assertEqual(candidates("/"), ("/index.html",))
+        self.assertEqual(candidates("/blog"), ("/blog", "/blog/index.html"))
+
+    def test_site_path(self):
+        self.assertEqual(site_path(os.path.join("docs", "blog", "index.html"), "docs"), "/blog/index.html")
+
+    def test_collected_while_parsing(self):
+        refs = self.collect("# T\n\n[a](/x) and ![i](/i.png)\n\n- [b](/y)\n\n```\n[not](/a/link)\n```")
+        self.assertEqual(refs, [("link", "/x"), ("image", "/i.png"), ("link", "/y")])
+
+    def test_cached_blocks_report_their_links(self):
+        markdown = "# T\n\n[a](/x) and ![i](/i.png)\n\n```\n[not](/a/link)\n```"
+        uncached = self.collect(markdown)
+        blockcache.configure(100)
+        self.assertEqual(self.collect(markdown), uncached)
+        # Second time round every block is a cache hit
+        self.assertEqual(self.collect(markdown), uncached)
+        self.assertEqual(blockcache.active().hits, 3)
+
+    def test_markup_in_cached_blocks_is_not_a_link(self):
+        # Literal markup in code is text, whether or not the block was cached
+        markdown = '`<img src="/logo.png">` and <a href="/nope">'
+        blockcache.configure(100)
+        self.assertEqual(self.collect(markdown), [])
+        self.assertEqual(self.collect(markdown), [])
+
+    def test_blocks_cached_while_not_collecting_report_their_links(self):
+        blockcache.configure(100)
+        markdown_to_html_node("[a](/x)").to_html()
+        self.assertEqual(self.collect("[a](/x)"), [("link", "/x")])
+        self.assertEqual(blockcache.active().hits, 1)
+
+    def test_not_collecting_by_default(self):
+        self.assertFalse(linkindex.collecting())
+        linkindex.record("link", "/x")
+        self.assertIsNone(linkindex.end_page())
+
+class TestBrokenLinks(unittest.TestCase):
+    def setUp(self):
+        self.dest = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dest)
+
+    def test_broken(self):
+        index = LinkIndex()
+        index.add_page("content/index.md", [
+            ("link", "/blog/"),
+            ("link", "/blog"),
+            ("image", "/images/a.png"),
+            ("link", "/missing"),
+            ("link", "https://example.com/missing"),
+        ])
+        index.add_page("content/blog/index.md", [("link", "../index.html"), ("image", "b.png")])
+        dests = {
+            "content/index.md": os.path.join(self.dest, "index.html"),
+            "content/blog/index.md": os.path.join(self.dest, "blog", "index.html"),
+        }
+        known = {"/index.html", "/blog/index.html", "/images/a.png"}
+        self.assertEqual(
+            index.broken(dests, known, self.dest),
+            [("content/blog/index.md", "image", "b.png"), ("content/index.md", "link", "/missing")],
+        )
+        # Files the build did not track, but which are on disk, still count
+        os.makedirs(os.path.join(self.dest, "blog"))
+        open(os.path.join(self.dest, "blog", "b.png"), "w").close()
+        self.assertEqual(index.broken(dests, known, self.dest), [("content/index.md", "link", "/missing")])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import unittest
+import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+from gencontent import BuildOptions, generate_pages_incremental
+from listings import Listing, page_url, index_page_path, absolute_links
+
+class TestListings(unittest.TestCase):
+    def setUp(self):
+        self.tmp_base = tempfile.mkdtemp()
+        self.content = os.path.join(self.tmp_base, "content")
+        self.blog = os.path.join(self.content, "blog")
+        self.dest = os.path.join(self.tmp_base, "docs")
+        self.template = os.path.join(self.tmp_base, "template.html")
+        self.manifest = os.path.join(self.tmp_base, ".cache", "manifest.json")
+        os.makedirs(self.blog)
+        self.write(self.template, "<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        for i in range(5):
+            self.write_post(i, f"2024-01-0{i + 1}")
+        self.write(os.path.join(self.blog, "undated.md"), "# Undated")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_base)
+
+    def write(self, path, text):
+        dir_path = os.path.dirname(path)
+        os.makedirs(dir_path, exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, *parts):
+        with open(os.path.join(self.dest, *parts)) as f:
+            return f.read()
+
+    def write_post(self, i, date, draft="false"):
+        self.write(
+            os.path.join(self.blog, f"post{i}", "index.md"),
+            f"---\ndate: {date}\ndraft: {draft}\n---\n\n# Post <{i}>\n\nBody [{i}](/blog/post{i}/)",
+        )
+
+    def build(self, basepath="/", page_size=2, feed_size=3, site_url="https://example.com/", **kwargs):
+        listing = Listing(self.blog, "Blog", page_size, feed_size, site_url)
+        with redirect_stdout(StringIO()) as out:
+            generate_pages_incremental(
+                self.content,
+                self.template,
+                self.dest,
+                self.manifest,
+                BuildOptions(basepath, **kwargs),
+                listings=[listing],
+            )
+        return out.getvalue()
+
+    def test_urls(self):
+        self.assertEqual(page_url(os.path.join(self.dest, "blog", "index.html"), self.dest), "/blog/")
+        self.assertEqual(page_url(os.path.join(self.dest, "a.html"), self.dest), "/a.html")
+        self.assertEqual(index_page_path("docs", 3), os.path.join("docs", "page", "3", "index.html"))
+
+    def test_absolute_links(self):
+        listing = Listing(self.blog, "Blog", site_url="https://example.com/")
+        html = '<a href="/a">a</a><img src="/i.png"></img><a href="//cdn.example.com/x">x</a><a href="b">b</a>'
+        self.assertEqual(
+            absolute_links(listing, html),
+            '<a href="https://example.com/a">a</a><img src="https://example.com/i.png"></img>'
+            '<a href="//cdn.example.com/x">x</a><a href="b">b</a>',
+        )
+
+    def test_paginated_index(self):
+        self.build()
+        first = self.read("blog", "index.html")
+        self.assertTrue(first.startswith("<title>Blog</title>"))
+        # Newest first, titles escaped, two per page
+        self.assertIn('<li><a href="/blog/post4/">Post &lt;4&gt;</a> <time datetime="2024-01-05">2024-01-05</time></li>', first)
+        self.assertIn('<a rel="next" href="/blog/page/2/">Older posts</a>', first)
+        self.assertNotIn("post2", first)
+        last = self.read("blog", "page", "3", "index.html")
+        self.assertIn("<title>Blog (page 3)</title>", last)
+        self.assertIn('<a href="/blog/undated.html">Undated</a></li>', last)
+        self.assertIn('<a rel="prev" href="/blog/page/2/">Newer posts</a>', last)
+        self.assertNotIn('rel="next"', last)
+
+    def test_feeds_reuse_rendered_posts(self):
+        self.build("/site/")
+        atom = self.read("blog", "atom.xml")
+        rss = self.read("blog", "rss.xml")
+        self.assertIn('<feed xmlns="http://www.w3.org/2005/Atom" xml:base="https://example.com/">', atom)
+        self.assertIn("<updated>2024-01-05T00:00:00+00:00</updated>", atom)
+        # Only the newest feed_size dated posts, with the HTML of their rendered page
+        self.assertEqual(atom.count("<entry>"), 3)
+        self.assertEqual(rss.count("<item>"), 3)
+        self.assertIn("<id>https://example.com/site/blog/post4/</id>", atom)
+        self.assertIn(
+            '<content type="html">&lt;div&gt;&lt;h1&gt;Post &lt;4&gt;&lt;/h1&gt;'
+            '&lt;p&gt;Body &lt;a href="https://example.com/site/blog/post4/"&gt;4&lt;/a&gt;&lt;/p&gt;&lt;/div&gt;</content>',
+            atom,
+        )
+        # RSS has no xml:base, so its links have to be absolute
+        self.assertIn('&lt;a href="https://example.com/site/blog/post4/"&gt;', rss)
+        self.assertNotIn('href="/', rss)
+        self.assertIn("<pubDate>Fri, 05 Jan 2024 00:00:00 +0000</pubDate>", rss)
+        self.assertNotIn("Undated", atom)
+
+    def test_unchanged_listings_are_not_rewritten(self):
+        self.build()
+        feed = os.path.join(self.dest, "blog", "atom.xml")
+        os.utime(feed, ns=(1, 1))
+        self.assertIn("0 changed on disk", self.build())
+        self.assertEqual(os.stat(feed).st_mtime_ns, 1)
+
+    def test_drafts_and_shrinking_listings(self):
+        self.build()
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "blog", "page", "3", "index.html")))
+        self.write_post(4, "2024-01-05", draft="true")
+        self.build()
+        self.assertNotIn("post4", self.read("blog", "index.html"))
+        self.assertNotIn("post4", self.read("blog", "atom.xml"))
+        # Four published posts fit on two index pages, so the third goes away
+        shutil.rmtree(os.path.join(self.blog, "post3"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "page", "3")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "blog", "page", "2", "index.html")))
+
+    def test_listings_are_known_to_the_link_checker(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[Blog](/blog/) [Feed](/blog/atom.xml)")
+        out = self.build(check_links="error")
+        self.assertNotIn("Broken", out)
+
+    def test_no_feeds_without_site_url(self):
+        self.build(site_url="")
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "blog", "index.html")))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "atom.xml")))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "rss.xml")))
+
+    def test_hand_written_section_index_wins(self):
+        self.write(os.path.join(self.blog, "index.md"), "# My blog")
+        out = self.build()
+        self.assertIn("Not generating the index of", out)
+        self.assertEqual(self.read("blog", "index.html"), "<title>My blog</title><main><div><h1>My blog</h1></div></main>")
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "page")))
+        # The build went through and saved its manifest: nothing to redo
+        self.assertIn("0 page(s) rendered", self.build())
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "blog", "atom.xml")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import os
+import sys
+import subprocess
+from io import StringIO
+from contextlib import redirect_stdout
+from unittest.mock import patch
+import main
+from bench import DEFERRED_IMPORTS
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class TestStartup(unittest.TestCase):
+    def test_heavy_modules_are_not_imported_at_startup(self):
+        # Single-page builds run from hooks many times a day; keep their startup lean
+        code = (
+            "import sys, main\n"
+            f"print(' '.join(name for name in {DEFERRED_IMPORTS!r} if name in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=SRC_DIR, capture_output=True, text=True, check=True
+        )
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_cli_runs(self):
+        result = subprocess.run(
+            [sys.executable, "main.py", "--help"], cwd=SRC_DIR, capture_output=True, text=True, check=True
+        )
+        self.assertIn("--jobs", result.stdout)
+
+class FakeWatcher:
+    # Reports each batch of changes in turn, then stops watch mode like Ctrl+C
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.closed = False
+
+    def wait(self):
+        if not self.batches:
+            raise KeyboardInterrupt
+        return self.batches.pop(0)
+
+    def close(self):
+        self.closed = True
+
+class TestWatch(unittest.TestCase):
+    def watch(self, batches, failures):
+        watcher = FakeWatcher(batches)
+        calls = []
+
+        def build(args, changed=None):
+            calls.append(changed)
+            if len(calls) <= failures:
+                raise Exception("No h1 header found in markdown")
+
+        out = StringIO()
+        with patch("watch.create_watcher", return_value=watcher), patch.object(main, "build", build):
+            with redirect_stdout(out):
+                main.watch(None)
+        self.assertTrue(watcher.closed)
+        return calls, out.getvalue()
+
+    def test_failed_first_build_keeps_watching(self):
+        calls, out = self.watch([{"content/bad.md"}, {"content/bad.md"}], failures=1)
+        self.assertEqual(out.count("Rebuilt in"), 2)
+        self.assertIn("Build failed: No h1 header found in markdown", out)
+        # The build after a failure is a full one, then rebuilds are targeted again
+        self.assertEqual(calls, [None, None, {"content/bad.md"}])
+
+    def test_rebuilds_are_targeted(self):
+        calls, out = self.watch([{"content/a.md"}], failures=0)
+        self.assertEqual(calls, [None, {"content/a.md"}])
+        self.assertNotIn("Build failed", out)
+
+    def test_failed_rebuild_is_not_timed(self):
+        calls, out = self.watch([{"content/bad.md"}], failures=2)
+        self.assertIn("Build failed", out)
+        self.assertNotIn("Rebuilt in", out)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+import shutil
+import tempfile
+from manifest import (
+    MANIFEST_VERSION,
+    hash_bytes,
+    hash_file,
+    load_manifest,
+    save_manifest,
+)
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_base = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_base, "cache", "manifest.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_base)
+
+    def test_hash_file_matches_bytes(self):
+        file_path = os.path.join(self.tmp_base, "page.md")
+        with open(file_path, "wb") as f:
+            f.write(b"# Hello")
+        self.assertEqual(hash_file(file_path), hash_bytes(b"# Hello"))
+
+    def test_missing_manifest_is_empty(self):
+        manifest = load_manifest(self.path)
+        self.assertEqual(manifest["pages"], {})
+        self.assertEqual(manifest["templates"], {})
+
+    def test_round_trip(self):
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "templates": {"template.html": "abc"},
+            "basepath": "/",
+            "pages": {"content/index.md": {"dest": "docs/index.html", "hash": "123", "template": "template.html"}},
+        }
+        save_manifest(self.path, manifest)
+        self.assertEqual(load_manifest(self.path), manifest)
+
+    def test_corrupt_manifest_is_empty(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as f:
+            f.write("{not json")
+        self.assertEqual(load_manifest(self.path)["pages"], {})
+
+    def test_old_version_is_ignored(self):
+        save_manifest(self.path, {"version": -1, "pages": {"a": {}}})
+        self.assertEqual(load_manifest(self.path)["pages"], {})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from block_markdown import markdown_to_blocks
+from mdsource import find_title, iter_file_blocks, read_chunks
+
+class TestMdSource(unittest.TestCase):
+    def setUp(self):
+        self.tmp_base = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_base)
+
+    def write(self, data):
+        path = os.path.join(self.tmp_base, "page.md")
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_blocks_match_markdown_to_blocks(self):
+        md = "\n# Café\n\n\n\npara one\nline two\n \n\n- a\n- b\n\n  \n\n```\ncode\n```\n"
+        path = self.write(md.encode())
+        with open(path, "rb") as f:
+            self.assertEqual(list(iter_file_blocks(f)), markdown_to_blocks(md))
+
+    def test_blocks_across_chunk_boundaries(self):
+        md = "# Café\n\npara one\nline two\n\n\n- a\n- b\n\nlast"
+        for chunk_size in range(1, 8):
+            f = BytesIO(md.encode())
+            self.assertEqual(list(iter_file_blocks(f, chunk_size)), markdown_to_blocks(md))
+
+    def test_find_title(self):
+        self.assertEqual(find_title(BytesIO(b"# Hello")), "Hello")
+        self.assertEqual(find_title(BytesIO(b"intro\n\n#  Caf\xc3\xa9  \nmore")), "Café")
+        self.assertEqual(find_title(BytesIO(b"#NoSpace\n## h2\n# Real\n# Second")), "Real")
+        with self.assertRaises(Exception):
+            find_title(BytesIO(b"## only an h2"))
+
+    def test_find_title_across_chunk_boundaries(self):
+        for chunk_size in range(1, 8):
+            f = BytesIO(b"intro\n#NoSpace\n# Real title\nmore")
+            self.assertEqual(find_title(f, chunk_size), "Real title")
+
+    def test_empty_file(self):
+        path = self.write(b"")
+        with open(path, "rb") as f:
+            self.assertEqual(list(iter_file_blocks(f)), [])
+            with self.assertRaises(Exception):
+                find_title(f)
+
+    def test_carriage_returns_are_translated(self):
+        data = b"# Title\r\n\r\ntext\rmore\r"
+        for chunk_size in (1, 2, 3, 64):
+            chunks = b"".join(bytes(chunk) for chunk in read_chunks(BytesIO(data), chunk_size))
+            self.assertEqual(chunks, b"# Title\n\ntext\nmore\n")
+
+    def test_file_truncated_while_read(self):
+        # A file rewritten shorter under the reader just ends early
+        path = self.write(("# Title\n\n" + "para\n\n" * 1000).encode())
+        with open(path, "rb") as f:
+            blocks = iter_file_blocks(f, 256)
+            self.assertEqual(next(blocks), "# Title")
+            with open(path, "wb") as out:
+                out.write(b"# Title\n")
+            self.assertLess(len(list(blocks)), 1000)
+
+if __name__ == "__main__":
+    unittest.main()
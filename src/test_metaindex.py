@@ -0,0 +1,57 @@
+import unittest
+import json
+from metaindex import MetadataIndex
+
+class TestMetadataIndex(unittest.TestCase):
+    def build(self):
+        index = MetadataIndex()
+        index.add("content/index.md", "docs/index.html", {"title": "Home"})
+        index.add("content/blog/tom/index.md", "docs/blog/tom/index.html",
+                  {"title": "Tom", "date": "2024-05-01", "tags": ("tolkien", "characters")})
+        index.add("content/blog/majesty/index.md", "docs/blog/majesty/index.html",
+                  {"title": "Majesty", "date": "2024-06-01", "tags": ("tolkien",)})
+        index.add("content/blog/draft/index.md", "docs/blog/draft/index.html",
+                  {"title": "Draft", "date": "2025-01-01", "tags": ("wip",), "draft": True})
+        index.add("content/blog/undated.md", "docs/blog/undated.html", {"title": "Undated", "template": "post"})
+        return index
+
+    def paths(self, index, rows):
+        return [index.columns["path"][row] for row in rows]
+
+    def test_select(self):
+        index = self.build()
+        self.assertEqual(
+            self.paths(index, index.select("content/blog")),
+            ["content/blog/majesty/index.md", "content/blog/tom/index.md", "content/blog/undated.md"],
+        )
+        self.assertEqual(len(index.select("content/blog", drafts=True)), 4)
+        self.assertEqual(self.paths(index, index.select(tag="characters")), ["content/blog/tom/index.md"])
+        self.assertEqual(index.select(tag="missing"), [])
+        self.assertEqual(index.tags(), {"tolkien": 2, "characters": 1})
+
+    def test_columns_and_interned_tags(self):
+        index = self.build()
+        self.assertEqual(len(index), 5)
+        self.assertEqual(index.tag_names, ["tolkien", "characters", "wip"])
+        self.assertEqual(index.columns["tags"][1:3], [[0, 1], [0]])
+
+    def test_replace_row(self):
+        index = self.build()
+        index.add("content/index.md", "docs/index.html", {"title": "Home again", "draft": True})
+        self.assertEqual(len(index), 5)
+        self.assertEqual(index.get("content/index.md"), {"title": "Home again", "tags": (), "draft": True})
+
+    def test_json_round_trip(self):
+        index = self.build()
+        restored = MetadataIndex.from_json(json.loads(json.dumps(index.to_json())))
+        for path in index.columns["path"]:
+            self.assertEqual(restored.get(path), index.get(path))
+        self.assertEqual(restored.get("content/blog/undated.md")["template"], "post")
+        self.assertEqual(restored.select(tag="tolkien"), index.select(tag="tolkien"))
+
+    def test_malformed_json_is_empty(self):
+        for data in ({}, {"columns": {"path": ["a"]}, "tags": []}, None):
+            self.assertEqual(len(MetadataIndex.from_json(data)), 0)
+
+if __name__ == "__main__":
+    unittest.main()
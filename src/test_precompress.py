@@ -0,0 +1,140 @@
+import unittest
+import os
+import gzip
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+import precompress as precompress_module
+from precompress import precompress, text_outputs, available_formats, discard_siblings
+
+class TestPrecompress(unittest.TestCase):
+    def setUp(self):
+        self.tmp_base = tempfile.mkdtemp()
+        self.dest = os.path.join(self.tmp_base, "docs")
+        self.manifest = os.path.join(self.tmp_base, ".cache", "manifest.json")
+        os.makedirs(os.path.join(self.dest, "blog"))
+        self.write(os.path.join(self.dest, "index.html"), "<p>home</p>" * 50)
+        self.write(os.path.join(self.dest, "index.css"), "body { color: red; }")
+        self.write(os.path.join(self.dest, "blog", "index.html"), "<p>blog</p>")
+        self.write(os.path.join(self.dest, "logo.png"), "not text")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_base)
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def run_precompress(self, **kwargs):
+        with redirect_stdout(StringIO()):
+            return precompress(self.dest, self.manifest, **kwargs)
+
+    def test_text_outputs_only(self):
+        self.assertEqual(
+            text_outputs(self.dest),
+            [
+                os.path.join(self.dest, "index.css"),
+                os.path.join(self.dest, "index.html"),
+                os.path.join(self.dest, "blog", "index.html"),
+            ],
+        )
+
+    def test_gzip_siblings_round_trip(self):
+        self.assertEqual(self.run_precompress(jobs=2, formats=["gz"]), (3, 0))
+        with gzip.open(os.path.join(self.dest, "index.html.gz"), "rt") as f:
+            self.assertEqual(f.read(), "<p>home</p>" * 50)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "logo.png.gz")))
+
+    def test_unchanged_outputs_are_skipped(self):
+        self.run_precompress(formats=["gz"])
+        self.assertEqual(self.run_precompress(formats=["gz"]), (0, 0))
+        self.write(os.path.join(self.dest, "index.css"), "body { color: blue; }")
+        self.assertEqual(self.run_precompress(formats=["gz"]), (1, 0))
+        with gzip.open(os.path.join(self.dest, "index.css.gz"), "rt") as f:
+            self.assertEqual(f.read(), "body { color: blue; }")
+
+    def test_unwritten_outputs_are_not_read(self):
+        self.run_precompress(formats=["gz"])
+        path = os.path.join(self.dest, "index.css")
+        opened = []
+        # The module's open() is looked up at call time, so it can be watched
+        precompress_module.open = lambda name, *args: opened.append(name) or open(name, *args)
+        try:
+            self.assertEqual(self.run_precompress(formats=["gz"]), (0, 0))
+            self.assertEqual(opened, [])
+            # Listed as written by the build: read again (and skipped by its hash)
+            self.assertEqual(self.run_precompress(formats=["gz"], written=[path]), (0, 0))
+            self.assertEqual(opened, [path])
+        finally:
+            del precompress_module.open
+
+    def test_missing_sibling_is_rewritten(self):
+        self.run_precompress(formats=["gz"])
+        os.remove(os.path.join(self.dest, "index.html.gz"))
+        self.assertEqual(self.run_precompress(formats=["gz"]), (1, 0))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html.gz")))
+
+    def test_removed_output_loses_its_siblings(self):
+        self.run_precompress(formats=["gz"])
+        os.remove(os.path.join(self.dest, "blog", "index.html"))
+        self.assertEqual(self.run_precompress(formats=["gz"]), (0, 1))
+        # The now empty directory goes too
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+
+    def test_build_without_precompress_discards_stale_siblings(self):
+        self.run_precompress(formats=["gz"])
+        index = os.path.join(self.dest, "index.html")
+        css = os.path.join(self.dest, "index.css")
+        os.remove(os.path.join(self.dest, "blog", "index.html"))
+        with redirect_stdout(StringIO()):
+            # The build rewrote index.html and removed the blog page
+            self.assertEqual(discard_siblings(self.dest, self.manifest, [index]), 2)
+        self.assertFalse(os.path.exists(index + ".gz"))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+        self.assertTrue(os.path.exists(css + ".gz"))
+        # Edited without the build knowing
+        self.write(css, "body { color: blue; }")
+        with redirect_stdout(StringIO()):
+            self.assertEqual(discard_siblings(self.dest, self.manifest), 1)
+        self.assertFalse(os.path.exists(css + ".gz"))
+        # The next --precompress build writes them again
+        self.assertEqual(self.run_precompress(formats=["gz"]), (2, 0))
+
+    def test_discard_without_compressed_outputs(self):
+        self.assertEqual(discard_siblings(self.dest, self.manifest), 0)
+        self.assertFalse(os.path.exists(self.manifest))
+
+    def test_output_is_deterministic(self):
+        self.run_precompress(formats=["gz"])
+        with open(os.path.join(self.dest, "index.html.gz"), "rb") as f:
+            first = f.read()
+        os.remove(self.manifest)
+        self.run_precompress(formats=["gz"])
+        with open(os.path.join(self.dest, "index.html.gz"), "rb") as f:
+            self.assertEqual(f.read(), first)
+
+    def test_brotli_is_optional(self):
+        if precompress_module.brotli is None:
+            self.assertEqual(available_formats(), ("gz",))
+        else:
+            self.assertEqual(available_formats(), ("gz", "br"))
+            self.run_precompress(formats=["gz", "br"])
+            with open(os.path.join(self.dest, "index.html.br"), "rb") as f:
+                self.assertEqual(precompress_module.brotli.decompress(f.read()), b"<p>home</p>" * 50)
+
+    def test_dropped_format_is_removed(self):
+        # Stand in for brotli so this runs whether or not it is installed
+        real_compress = precompress_module.compress
+        precompress_module.compress = lambda data, fmt: data if fmt == "br" else real_compress(data, fmt)
+        try:
+            self.run_precompress(formats=["gz", "br"])
+        finally:
+            precompress_module.compress = real_compress
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.css.br")))
+        self.assertEqual(self.run_precompress(formats=["gz"]), (0, 0))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "index.css.br")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.css.gz")))
+
+if __name__ == "__main__":
+    unittest.main()
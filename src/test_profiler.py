@@ -0,0 +1,76 @@
+import unittest
+import os
+import time
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+import profiler
+from block_markdown import markdown_to_html_node
+from gencontent import BuildOptions, generate_pages
+
+class TestProfiler(unittest.TestCase):
+    def tearDown(self):
+        profiler.disable()
+
+    def test_stage_is_noop_when_disabled(self):
+        self.assertIsNone(profiler.active())
+        with profiler.stage("read"):
+            pass
+        self.assertIsNone(profiler.active())
+
+    def test_nested_stages_are_exclusive(self):
+        build_profiler = profiler.enable()
+        build_profiler.start_page("page.md")
+        with profiler.stage("parse"):
+            with profiler.stage("inline parsing"):
+                time.sleep(0.02)
+        build_profiler.end_page()
+        stages = build_profiler.pages["page.md"]
+        self.assertGreaterEqual(stages["inline parsing"][0], 0.02)
+        self.assertLess(stages["parse"][0], 0.02)
+        self.assertEqual(build_profiler.totals, stages)
+
+    def test_parser_stages_are_recorded(self):
+        build_profiler = profiler.enable()
+        build_profiler.start_page("page.md")
+        markdown_to_html_node("# Title\n\nSome **bold** text\n\n- a\n- b")
+        build_profiler.end_page()
+        stages = build_profiler.pages["page.md"]
+        for name in ("read", "block typing", "inline parsing"):
+            self.assertIn(name, stages)
+
+    def test_report_and_json(self):
+        build_profiler = profiler.enable()
+        build_profiler.add_page("slow.md", {"parse": [0.5, 10]})
+        build_profiler.add_page("fast.md", {"parse": [0.1, 2], "write": [0.1, 0]})
+        with redirect_stdout(StringIO()) as out:
+            build_profiler.report(top=1)
+        self.assertIn("slow.md", out.getvalue())
+        self.assertNotIn("fast.md", out.getvalue())
+        data = build_profiler.to_json()
+        self.assertAlmostEqual(data["totals"]["parse"]["seconds"], 0.6)
+        self.assertEqual(data["pages"]["fast.md"]["parse"]["net_blocks"], 2)
+
+    def test_build_pages_are_profiled_on_the_real_path(self):
+        tmp_base = tempfile.mkdtemp()
+        try:
+            source = os.path.join(tmp_base, "page.md")
+            template = os.path.join(tmp_base, "template.html")
+            with open(source, "w") as f:
+                f.write("# Title\n\nSome **bold** text\n\n- a\n- b")
+            with open(template, "w") as f:
+                f.write("<title>{{ Title }}</title>{{ Content }}")
+            for writers in (0, 1):
+                build_profiler = profiler.enable()
+                with redirect_stdout(StringIO()):
+                    generate_pages([(source, os.path.join(tmp_base, f"out{writers}.html"))], template, BuildOptions(writers=writers))
+                stages = build_profiler.pages[source]
+                for name in ("read", "parse", "block typing", "inline parsing", "to_html", "write"):
+                    self.assertIn(name, stages)
+                self.assertEqual(set(build_profiler.totals), set(stages))
+        finally:
+            shutil.rmtree(tmp_base)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+import blockcache
+from renderer import Renderer
+from template import Template
+from gencontent import BuildOptions, generate_pages_recursive
+
+class TestRenderer(unittest.TestCase):
+    def setUp(self):
+        self.tmp_base = tempfile.mkdtemp()
+        self.content = os.path.join(self.tmp_base, "content")
+        self.template = os.path.join(self.tmp_base, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, '<title>{{ Title }}</title>\n<a href="/">home</a>\n{{ Content }}\n')
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nSee [the blog](/blog)")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\n```\ncode  here\n```")
+
+    def tearDown(self):
+        blockcache.configure(0)
+        shutil.rmtree(self.tmp_base)
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def test_render_string(self):
+        renderer = Renderer(Template("<h1>{{ Title }}</h1>{{ Content }}"))
+        self.assertEqual(renderer.render("# Hi\n\n**there**"), "<h1>Hi</h1><div><h1>Hi</h1><p><b>there</b></p></div>")
+
+    def test_render_content(self):
+        renderer = Renderer(self.template, "/base/")
+        self.assertEqual(renderer.render_content("[x](/y)"), '<div><p><a href="/base/y">x</a></p></div>')
+
+    def test_render_tree_matches_build(self):
+        dest = os.path.join(self.tmp_base, "docs")
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(self.content, self.template, dest, BuildOptions("/base/"))
+        for minify in (False, True):
+            renderer = Renderer(self.template, "/base/", minify)
+            pages, errors = renderer.render_tree(self.content)
+            self.assertEqual(errors, {})
+            self.assertEqual(sorted(pages), [os.path.join("blog", "index.html"), "index.html"])
+            if not minify:
+                for path, html in pages.items():
+                    with open(os.path.join(dest, path)) as f:
+                        self.assertEqual(html, f.read())
+        self.assertIn("<pre><code>code  here</code></pre>", pages[os.path.join("blog", "index.html")])
+        self.assertNotIn("\n", pages["index.html"])
+
+    def test_unchanged_files_are_served_from_memory(self):
+        renderer = Renderer(self.template)
+        path = os.path.join(self.content, "index.md")
+        first = renderer.render_file(path)
+        self.assertIs(renderer.render_file(path), first)
+
+        self.write(path, "# Home again")
+        os.utime(path, ns=(1, 1))
+        self.assertIn("Home again", renderer.render_file(path))
+
+        # A template edit invalidates every page
+        self.write(self.template, "<h2>{{ Title }}</h2>")
+        os.utime(self.template, ns=(2, 2))
+        self.assertEqual(renderer.render_file(path), "<h2>Home again</h2>")
+
+    def test_errors_are_reported_per_page(self):
+        bad = os.path.join(self.content, "bad.md")
+        self.write(bad, "no title")
+        pages, errors = Renderer(self.template).render_tree(self.content)
+        self.assertEqual(list(errors), [bad])
+        self.assertEqual(len(pages), 2)
+
+    def test_section_layouts(self):
+        templates = os.path.join(self.tmp_base, "templates")
+        os.makedirs(templates)
+        self.write(os.path.join(templates, "blog.html"), "<article>{{ Content }}</article>")
+        pages, _ = Renderer(self.template, templates_dir=templates).render_tree(self.content)
+        self.assertTrue(pages[os.path.join("blog", "index.html")].startswith("<article>"))
+        self.assertTrue(pages["index.html"].startswith("<title>Home</title>"))
+
+    def test_front_matter(self):
+        templates = os.path.join(self.tmp_base, "templates")
+        os.makedirs(templates)
+        post_template = os.path.join(templates, "post.html")
+        self.write(post_template, "<article>{{ Title }}</article>")
+        renderer = Renderer(self.template, templates_dir=templates)
+        markdown = "---\ntitle: Front\ntemplate: post\ndraft: true\n---\n\n# Heading"
+        self.assertEqual(renderer.render(markdown), "<article>Front</article>")
+        self.assertEqual(renderer.render_content(markdown), "<div><h1>Heading</h1></div>")
+
+        # Cached pages notice an edit to the layout their front matter names
+        path = os.path.join(self.content, "index.md")
+        self.write(path, markdown)
+        self.assertEqual(renderer.render_file(path), "<article>Front</article>")
+        self.write(post_template, "<main>{{ Title }}</main>")
+        os.utime(post_template, ns=(3, 3))
+        self.assertEqual(renderer.render_file(path), "<main>Front</main>")
+
+    def test_block_cache_is_warm_across_calls(self):
+        cache = blockcache.configure(100)
+        renderer = Renderer(self.template)
+        renderer.render("# A\n\nshared paragraph")
+        renderer.render("# B\n\nshared paragraph")
+        self.assertEqual(cache.hits, 1)
+
+    def test_renderers_leave_the_block_cache_alone(self):
+        Renderer(self.template)
+        self.assertIsNone(blockcache.active())
+
+    def test_renderers_on_threads(self):
+        import threading
+
+        blockcache.configure(100)
+        renderers = [Renderer(self.template), Renderer(self.template, "/base/")]
+        markdown = "# T\n\n" + "\n\n".join(f"[link {i}](/x{i})" for i in range(50))
+        expected = [renderer.render(markdown) for renderer in renderers]
+        results = []
+
+        def render(renderer):
+            for _ in range(20):
+                results.append((renderer, renderer.render(markdown)))
+
+        threads = [threading.Thread(target=render, args=(renderer,)) for renderer in renderers * 2]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 80)
+        for renderer, html in results:
+            self.assertEqual(html, expected[renderers.index(renderer)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import unittest
+import os
+import shutil
+import tempfile
+from io import StringIO
+from htmlnode import LeafNode, ParentNode
+import template as template_module
+from template import (
+    Template,
+    load_template,
+    rewrite_basepath,
+    minify_markup,
+    compiled_templates,
+    share_templates,
+    find_templates,
+    select_template,
+    named_template,
+)
+
+class TestTemplate(unittest.TestCase):
+    def test_segments_and_slots(self):
+        template = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.assertEqual(template.segments, ["<title>", "</title><main>", "</main>"])
+        self.assertEqual(template.slots, ["Title", "Content"])
+
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}")
+        html = template.render({"Title": "Hi", "Content": "<p>body</p>"})
+        self.assertEqual(html, "<title>Hi</title><p>body</p>")
+
+    def test_repeated_slot(self):
+        template = Template("{{ Title }}|{{ Title }}")
+        self.assertEqual(template.render({"Title": "x"}), "x|x")
+
+    def test_unknown_slot_is_left_alone(self):
+        template = Template("{{ Title }} {{ Date }}")
+        self.assertEqual(template.render({"Title": "x"}), "x {{ Date }}")
+
+    def test_basepath_applied_to_template_and_values(self):
+        template = Template('<link href="/index.css" />{{ Content }}', "/site/")
+        self.assertEqual(template.segments[0], '<link href="/site/index.css" />')
+        html = template.render({"Content": '<img src="/a.png" alt="a"></img>'})
+        self.assertEqual(
+            html, '<link href="/site/index.css" /><img src="/site/a.png" alt="a"></img>'
+        )
+
+    def test_matches_sequential_replace(self):
+        text = '<title>{{ Title }}</title><a href="/">home</a><article>{{ Content }}</article>'
+        content = '<p><a href="/blog">blog</a><img src="/x.png" alt=""></img></p>'
+        expected = text.replace("{{ Title }}", "T").replace("{{ Content }}", content)
+        expected = expected.replace('href="/', 'href="/base/').replace('src="/', 'src="/base/')
+        html = Template(text, "/base/").render({"Title": "T", "Content": content})
+        self.assertEqual(html, expected)
+
+    def test_write_streams_node_values(self):
+        template = Template('<a href="/">home</a>{{ Content }}', "/base/")
+        node = ParentNode("p", [LeafNode("a", "post", {"href": "/blog"})])
+        out = StringIO()
+        template.write(out, {"Content": node})
+        self.assertEqual(out.getvalue(), '<a href="/base/">home</a><p><a href="/base/blog">post</a></p>')
+        self.assertEqual(template.render({"Content": node.to_html()}), out.getvalue())
+
+    def test_basepath_is_rewritten_once_per_block(self):
+        template = Template("{{ Content }}", "/base/")
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode("a", "a", {"href": "/x"})]),
+            ParentNode("p", [LeafNode("img", "", {"src": "/i.png"}), LeafNode(None, "text")]),
+        ], {"class": "/no"})
+        parts = []
+        template.write(parts, {"Content": node})
+        # The template's empty segments come first and last
+        self.assertEqual(parts[1:-1], [
+            '<div class="/no">',
+            '<p><a href="/base/x">a</a></p>',
+            '<p><img src="/base/i.png"></img>text</p>',
+            "</div>",
+        ])
+
+    def test_minify_markup(self):
+        html = "<!doctype html>\n<html>\n  <head>\n    <title>{{ Title }}</title>\n  </head>\n  <body>\n    <!-- nav -->\n    <p>a  <b>b</b>\n <i>c</i></p>\n  </body>\n</html>\n"
+        self.assertEqual(
+            minify_markup(html),
+            "<!doctype html><html><head><title>{{ Title }}</title></head><body><p>a <b>b</b> <i>c</i></p></body></html>",
+        )
+
+    def test_minify_markup_keeps_raw_text_elements(self):
+        html = "<div>\n<pre>  a\n\n  b</pre>\n<script>\n// one\nx = 1\n</script>\n<!--[if IE]><p>old</p><![endif]-->\n</div>"
+        self.assertEqual(
+            minify_markup(html),
+            "<div><pre>  a\n\n  b</pre><script>\n// one\nx = 1\n</script><!--[if IE]><p>old</p><![endif]--></div>",
+        )
+
+    def test_minified_template_folds_node_values(self):
+        template = Template("<body>\n  <main>{{ Content }}</main>\n</body>\n", minify=True)
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "a  b")]),
+            ParentNode("pre", [ParentNode("code", [LeafNode(None, "x\n  y")])]),
+        ])
+        self.assertEqual(
+            template.render({"Content": node}),
+            "<body><main><div><p>a b</p><pre><code>x\n  y</code></pre></div></main></body>",
+        )
+
+    def test_extract(self):
+        template = Template("<title>{{ Title }}</title><main>{{ Content }}</main><p>{{ Title }}</p>")
+        html = template.render({"Title": "</main>", "Content": "<main>body</main>"})
+        self.assertEqual(template.extract(html, "Content"), "<main>body</main>")
+        self.assertIsNone(template.extract(html, "Title"))
+        self.assertIsNone(template.extract("<title>x</title>", "Content"))
+        self.assertIsNone(Template("{{ Content }}!").extract("other", "Content"))
+        self.assertEqual(Template("{{ Content }}").extract("anything", "Content"), "anything")
+
+    def test_rewrite_basepath_default_is_noop(self):
+        html = '<a href="/x">x</a>'
+        self.assertIs(rewrite_basepath(html, "/"), html)
+
+
+class TestLoadTemplate(unittest.TestCase):
+    def setUp(self):
+        self.tmp_base = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_base, "template.html")
+        with open(self.path, "w") as f:
+            f.write("<h1>{{ Title }}</h1>")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_base)
+
+    def test_cached_per_path_and_basepath(self):
+        first = load_template(self.path, "/")
+        self.assertIs(load_template(self.path, "/"), first)
+        self.assertIsNot(load_template(self.path, "/other/"), first)
+        self.assertIsNot(load_template(self.path, "/", minify=True), first)
+
+    def test_reloaded_when_file_changes(self):
+        first = load_template(self.path)
+        with open(self.path, "w") as f:
+            f.write("<h2>{{ Title }}</h2>!")
+        second = load_template(self.path)
+        self.assertIsNot(second, first)
+        self.assertEqual(second.render({"Title": "x"}), "<h2>x</h2>!")
+
+    def test_compiled_templates_can_be_shared(self):
+        entries = compiled_templates([self.path, os.path.join(self.tmp_base, "missing.html")], "/x/")
+        self.assertEqual([key for key, _ in entries], [(self.path, "/x/", False)])
+        compiled = entries[0][1][2]
+        # Another process starts with an empty cache and adopts the compiled one
+        template_module._template_cache.clear()
+        share_templates(entries)
+        self.assertIs(load_template(self.path, "/x/"), compiled)
+
+class TestSelectTemplate(unittest.TestCase):
+    def setUp(self):
+        self.tmp_base = tempfile.mkdtemp()
+        self.templates = os.path.join(self.tmp_base, "templates")
+        os.makedirs(os.path.join(self.templates, "blog"))
+        for name in ("blog.html", os.path.join("blog", "tom.html"), "landing.html", "notes.txt"):
+            open(os.path.join(self.templates, name), "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_base)
+
+    def select(self, *parts, name=None):
+        from_path = os.path.join("content", *parts)
+        return select_template(from_path, "content", "template.html", self.templates, name=name)
+
+    def test_find_templates(self):
+        self.assertEqual(find_templates(self.templates), {"blog", "blog/tom", "landing"})
+        self.assertEqual(find_templates(os.path.join(self.tmp_base, "missing")), set())
+
+    def test_nearest_section_wins(self):
+        self.assertEqual(self.select("blog", "tom", "index.md"), os.path.join(self.templates, "blog", "tom.html"))
+        self.assertEqual(self.select("blog", "majesty", "index.md"), os.path.join(self.templates, "blog.html"))
+        self.assertEqual(self.select("blog", "index.md"), os.path.join(self.templates, "blog.html"))
+        self.assertEqual(self.select("index.md"), "template.html")
+        self.assertEqual(self.select("contact", "index.md"), "template.html")
+
+    def test_named_template_and_no_templates_dir(self):
+        self.assertEqual(self.select("blog", "index.md", name="landing"), os.path.join(self.templates, "landing.html"))
+        self.assertEqual(select_template(os.path.join("content", "blog", "a.md"), "content", "t.html"), "t.html")
+
+    def test_named_template_outside_templates_dir_is_rejected(self):
+        names = find_templates(self.templates)
+        self.assertEqual(named_template(self.templates, "blog/tom", names), os.path.join(self.templates, "blog", "tom.html"))
+        for name in ("../../somewhere/file", "blog/../landing", "/etc/passwd", "blog//tom", "blog\\tom", 3):
+            with self.assertRaises(ValueError):
+                named_template(self.templates, name)
+        with self.assertRaises(ValueError):
+            named_template(self.templates, "missing", names)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -58,6 +58,13 @@ class TestTextNode(unittest.TestCase):
         node = TextNode("Check default", TextType.ITALIC)
         self.assertIsNone(node.url)
 
+    def test_no_instance_dict(self):
+        # TextNode is slotted to keep millions of nodes small
+        node = TextNode("text", TextType.PLAIN)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = True
+
     def test_text(self):
         node = TextNode("This is a text node", TextType.PLAIN)
         html_node = text_node_to_html_node(node)
@@ -0,0 +1,80 @@
+import unittest
+import os
+import shutil
+import tempfile
+from watch import PollingWatcher, InotifyWatcher, create_watcher
+
+class WatcherTests:
+    # Shared checks, run against each watcher implementation below
+    def setUp(self):
+        self.tmp_base = tempfile.mkdtemp()
+        self.content = os.path.join(self.tmp_base, "content")
+        self.template = os.path.join(self.tmp_base, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.page = self.write(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        self.write(self.template, "{{ Content }}")
+        self.watcher = self.create_watcher([self.content], [self.template])
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.tmp_base)
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_modified_file(self):
+        self.write(self.page, "# Blog, edited")
+        self.assertIn(self.page, self.watcher.wait())
+
+    def test_watched_single_file(self):
+        self.write(self.template, "<main>{{ Content }}</main>")
+        self.assertIn(self.template, self.watcher.wait())
+
+    def test_new_file_in_new_directory(self):
+        os.mkdir(os.path.join(self.content, "new"))
+        new_page = self.write(os.path.join(self.content, "new", "index.md"), "# New")
+        changed = self.watcher.wait()
+        if new_page not in changed:
+            # inotify may report the directory before the file inside it exists
+            changed = self.watcher.wait()
+        self.assertIn(new_page, changed)
+
+    def test_directory_created_after_start(self):
+        templates = os.path.join(self.tmp_base, "templates")
+        self.watcher.close()
+        self.watcher = self.create_watcher([self.content, templates], [self.template])
+        os.mkdir(templates)
+        layout = self.write(os.path.join(templates, "blog.html"), "{{ Content }}")
+        changed = self.watcher.wait()
+        if layout not in changed:
+            # inotify may report the directory before the file inside it exists
+            changed = self.watcher.wait()
+        self.assertIn(layout, changed)
+
+    def test_deleted_file(self):
+        os.remove(self.page)
+        self.assertIn(self.page, self.watcher.wait())
+
+class TestPollingWatcher(WatcherTests, unittest.TestCase):
+    def create_watcher(self, dirs, files):
+        return PollingWatcher(dirs, files, interval=0.01)
+
+    def write(self, path, text):
+        path = super().write(path, text)
+        # Make sure the change is visible even on filesystems with coarse mtimes
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        return path
+
+class TestInotifyWatcher(WatcherTests, unittest.TestCase):
+    def create_watcher(self, dirs, files):
+        watcher = create_watcher(dirs, files)
+        if not isinstance(watcher, InotifyWatcher):
+            watcher.close()
+            self.skipTest("inotify is not available on this platform")
+        return watcher
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+from writer import OutputWriter, ComparingOutput, create_output_dirs, write_output
+
+class TestWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp_base = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_base)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_create_output_dirs_once_per_directory(self):
+        paths = [os.path.join(self.tmp_base, "a", "b", f"{i}.html") for i in range(5)]
+        paths.append(os.path.join(self.tmp_base, "c", "index.html"))
+        created = create_output_dirs(paths)
+        self.assertEqual(created, {os.path.join(self.tmp_base, "a", "b"), os.path.join(self.tmp_base, "c")})
+        self.assertTrue(os.path.isdir(os.path.join(self.tmp_base, "a", "b")))
+
+    def test_writer_writes_every_page(self):
+        with OutputWriter(threads=3, max_pending=2) as writer:
+            for i in range(20):
+                writer.submit(os.path.join(self.tmp_base, f"{i}.html"), ["<p>", str(i), "</p>"])
+        self.assertEqual(writer.errors, {})
+        for i in range(20):
+            self.assertEqual(self.read(os.path.join(self.tmp_base, f"{i}.html")), f"<p>{i}</p>")
+
+    def test_synchronous_writer(self):
+        writer = OutputWriter(threads=0)
+        path = os.path.join(self.tmp_base, "page.html")
+        writer.submit(path, ["done"])
+        # Already on disk before close()
+        self.assertEqual(self.read(path), "done")
+        self.assertEqual(writer.close(), {})
+
+    def test_write_errors_are_collected(self):
+        path = os.path.join(self.tmp_base, "missing", "page.html")
+        writer = OutputWriter(threads=1)
+        writer.submit(path, ["x"])
+        errors = writer.close()
+        self.assertEqual(list(errors), [path])
+        self.assertIn("FileNotFoundError", errors[path])
+
+    def test_write_replaces_and_cleans_up(self):
+        path = os.path.join(self.tmp_base, "page.html")
+        write_output(path, ["old"])
+        old = os.stat(path).st_ino
+        write_output(path, ["new"])
+        self.assertEqual(self.read(path), "new")
+        # Renamed into place rather than truncated and rewritten
+        self.assertNotEqual(os.stat(path).st_ino, old)
+        self.assertEqual(os.listdir(self.tmp_base), ["page.html"])
+
+    def test_failed_write_cleans_up(self):
+        # A directory is in the way, so the rename fails after the temp file was written
+        path = os.path.join(self.tmp_base, "page.html")
+        os.makedirs(os.path.join(path, "child"))
+        with self.assertRaises(OSError):
+            write_output(path, ["new"])
+        self.assertEqual(os.listdir(self.tmp_base), ["page.html"])
+        self.assertTrue(os.path.isdir(path))
+
+    def test_failed_write_keeps_the_last_good_page(self):
+        path = os.path.join(self.tmp_base, "page.html")
+        write_output(path, ["good"])
+        with patch("os.write", side_effect=OSError("disk full")), self.assertRaises(OSError):
+            write_output(path, ["new"])
+        self.assertEqual(self.read(path), "good")
+        self.assertEqual(os.listdir(self.tmp_base), ["page.html"])
+
+    def test_non_ascii_page(self):
+        path = os.path.join(self.tmp_base, "page.html")
+        write_output(path, ["caf\u00e9 ", "\u2014 done"])
+        self.assertEqual(self.read(path), "caf\u00e9 \u2014 done")
+
+    def test_identical_output_is_not_rewritten(self):
+        path = os.path.join(self.tmp_base, "page.html")
+        self.assertTrue(write_output(path, ["<p>", "same", "</p>"]))
+        os.utime(path, ns=(1, 1))
+        self.assertFalse(write_output(path, ["<p>same</p>"]))
+        self.assertEqual(os.stat(path).st_mtime_ns, 1)
+        self.assertTrue(write_output(path, ["<p>diff</p>"]))
+        self.assertEqual(self.read(path), "<p>diff</p>")
+
+    def test_writer_reports_changed_outputs(self):
+        same = os.path.join(self.tmp_base, "same.html")
+        write_output(same, ["x"])
+        with OutputWriter(threads=2) as writer:
+            writer.submit(same, ["x"])
+            writer.submit(os.path.join(self.tmp_base, "new.html"), ["y"])
+        self.assertEqual(writer.changed, {os.path.join(self.tmp_base, "new.html")})
+
+    def test_comparing_output(self):
+        path = os.path.join(self.tmp_base, "page.html")
+        cases = [
+            ("caf\u00e9 page", False),  # identical
+            ("caf\u00e9 pages", True),  # longer
+            ("caf\u00e9 page", True),  # shorter
+            ("caf\u00e9 PAGE", True),  # differs midway
+        ]
+        with ComparingOutput(path) as out:
+            out.write("caf\u00e9 page")
+        self.assertTrue(out.changed)
+        for text, changed in cases:
+            os.utime(path, ns=(1, 1))
+            with ComparingOutput(path) as out:
+                for i in range(0, len(text), 3):
+                    out.write(text[i:i + 3])
+            self.assertEqual(out.changed, changed, text)
+            self.assertEqual(self.read(path), text)
+            self.assertEqual(os.stat(path).st_mtime_ns != 1, changed, text)
+
+    def test_comparing_output_keeps_the_old_file_on_error(self):
+        path = os.path.join(self.tmp_base, "page.html")
+        with ComparingOutput(path) as out:
+            out.write("old page")
+        with self.assertRaises(ValueError):
+            with ComparingOutput(path) as out:
+                out.write("old")
+                out.write(" and new")
+                raise ValueError("parse error")
+        self.assertFalse(out.changed)
+        self.assertEqual(self.read(path), "old page")
+        self.assertEqual(os.listdir(self.tmp_base), ["page.html"])
+
+if __name__ == "__main__":
+    unittest.main()
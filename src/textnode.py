@@ -10,6 +10,9 @@ class TextType(Enum):
     IMAGE = "image"
 
 class TextNode:
+    # No per-instance __dict__; the inline parser creates one of these per span
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
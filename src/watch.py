@@ -0,0 +1,172 @@
+import os
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+
+# Flags from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+# How long to keep collecting events after the first one, so a "save all"
+# or a git checkout turns into one rebuild instead of dozens
+DEBOUNCE_SECONDS = 0.05
+
+def walk_files(dir_path):
+    files = []
+    for root, dirs, filenames in os.walk(dir_path):
+        dirs.sort()
+        for filename in sorted(filenames):
+            files.append(os.path.join(root, filename))
+    return files
+
+class PollingWatcher:
+    # Portable fallback: re-stat every watched file each interval
+    def __init__(self, dirs, files, interval=0.5):
+        self.dirs = dirs
+        self.files = files
+        self.interval = interval
+        self.snapshot = self.take_snapshot()
+
+    def take_snapshot(self):
+        snapshot = {}
+        paths = list(self.files)
+        for dir_path in self.dirs:
+            paths.extend(walk_files(dir_path))
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self):
+        # Block until something changes and return the set of changed paths
+        while True:
+            time.sleep(self.interval)
+            snapshot = self.take_snapshot()
+            changed = {
+                path
+                for path in snapshot.keys() | self.snapshot.keys()
+                if snapshot.get(path) != self.snapshot.get(path)
+            }
+            self.snapshot = snapshot
+            if changed:
+                return changed
+
+    def close(self):
+        pass
+
+class InotifyWatcher:
+    def __init__(self, dirs, files):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.add_watch = libc.inotify_add_watch
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        # wd -> directory path, the watches of whole trees, and the names to
+        # report for directories that are only watched for a single entry
+        # (e.g. the template, or a watched directory that may be created later)
+        self.dirs_by_wd = {}
+        self.tree_wds = set()
+        self.only_names = {}
+        for dir_path in dirs:
+            self.watch_tree(dir_path)
+        # A watched directory that is missing now (or deleted later) is picked
+        # up by watching its parent for that name: creating it watches the tree
+        for path in [*dirs, *files]:
+            self.watch_name(path)
+
+    def watch_dir(self, dir_path):
+        wd = self.add_watch(self.fd, os.fsencode(dir_path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {dir_path}")
+        self.dirs_by_wd[wd] = dir_path
+        return wd
+
+    def watch_tree(self, dir_path):
+        # inotify is not recursive, so every subdirectory needs its own watch
+        for root, dirs, _ in os.walk(dir_path):
+            dirs.sort()
+            self.tree_wds.add(self.watch_dir(root))
+
+    def watch_name(self, path):
+        # Watch path's parent directory, reporting only events about path
+        wd = self.watch_dir(os.path.dirname(path) or ".")
+        if wd not in self.tree_wds:
+            self.only_names.setdefault(wd, set()).add(os.path.basename(path))
+
+    def read_events(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return None
+        data = os.read(self.fd, 64 * 1024)
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_len].rstrip(b"\0"))
+            offset += name_len
+            events.append((wd, mask, name))
+        return events
+
+    def wait(self):
+        # Block until something changes and return the set of changed paths,
+        # or None when the kernel queue overflowed and anything may have changed
+        changed = set()
+        timeout = None
+        while True:
+            events = self.read_events(timeout)
+            if events is None:
+                if changed:
+                    return changed
+                continue
+            for wd, mask, name in events:
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if mask & IN_IGNORED:
+                    self.dirs_by_wd.pop(wd, None)
+                    self.tree_wds.discard(wd)
+                    continue
+                dir_path = self.dirs_by_wd.get(wd)
+                if dir_path is None or not name:
+                    continue
+                if wd in self.only_names and name not in self.only_names[wd]:
+                    continue
+                path = os.path.join(dir_path, name)
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    # A new directory: watch it and treat everything in it as new
+                    self.watch_tree(path)
+                    changed.update(walk_files(path))
+                changed.add(path)
+            timeout = DEBOUNCE_SECONDS
+
+    def close(self):
+        os.close(self.fd)
+
+def create_watcher(dirs, files, interval=0.5):
+    # Prefer inotify (Linux); fall back to polling anywhere it is unavailable
+    try:
+        return InotifyWatcher(dirs, files)
+    except (OSError, AttributeError, TypeError):
+        return PollingWatcher(dirs, files, interval)
@@ -0,0 +1,200 @@
+import os
+import queue
+import threading
+from mdsource import ENCODING
+
+def create_output_dirs(paths):
+    # One makedirs per distinct output directory instead of one per page
+    created = set()
+    for path in paths:
+        dir_path = os.path.dirname(path)
+        if dir_path != "" and dir_path not in created:
+            os.makedirs(dir_path, exist_ok=True)
+            created.add(dir_path)
+    return created
+
+def temp_path(dest_path):
+    # Unique per process and thread, and in the same directory as the output
+    # so the final rename never crosses a filesystem
+    dir_path, filename = os.path.split(dest_path)
+    return os.path.join(dir_path, f".{filename}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+def is_same_output(dest_path, data):
+    # Cheap size check first; only a file of the same length is read back
+    try:
+        if os.stat(dest_path).st_size != len(data):
+            return False
+        with open(dest_path, "rb") as f:
+            return f.read() == data
+    except FileNotFoundError:
+        return False
+
+def write_output(dest_path, chunks):
+    # The page is encoded once and written with a single raw write, skipping
+    # the buffered text layer open() would build for every page. It goes to
+    # a temporary file next to its destination that is renamed over it once
+    # complete, like ComparingOutput does: a reader (a dev server) never sees
+    # half a page, and a failed write leaves the last good page in place. A
+    # page identical to the file already on disk is not written at all, so
+    # its mtime (and rsync) leave it alone. Returns whether the file changed.
+    data = "".join(chunks).encode(ENCODING)
+    if is_same_output(dest_path, data):
+        return False
+    path = temp_path(dest_path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        os.replace(path, dest_path)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return True
+
+class ComparingOutput:
+    # A write-only file for streamed pages that leaves an identical file on
+    # disk untouched. Fragments are compared with the existing file as they
+    # arrive; at the first difference the part that matched is copied into a
+    # temporary file next to it and the rest of the page goes there. close()
+    # renames it over the old file and returns whether the file changed. A
+    # page that fails halfway (an exception inside the with block, or
+    # abort()) leaves the old file as it was.
+    def __init__(self, dest_path):
+        self.dest_path = dest_path
+        self.offset = 0
+        self.out = None
+        self.closed = False
+        self.changed = False
+        try:
+            self.file = open(dest_path, "rb")
+        except FileNotFoundError:
+            self.file = None
+            self._diverge()
+
+    def _diverge(self):
+        self.changed = True
+        self.temp_path = temp_path(self.dest_path)
+        self.out = open(self.temp_path, "wb")
+        if self.file is not None:
+            self.file.seek(0)
+            remaining = self.offset
+            while remaining:
+                chunk = self.file.read(min(remaining, 1 << 20))
+                if not chunk:
+                    break
+                self.out.write(chunk)
+                remaining -= len(chunk)
+            self.file.close()
+            self.file = None
+
+    def write(self, text):
+        data = text.encode(ENCODING)
+        if self.out is None:
+            if self.file.read(len(data)) == data:
+                self.offset += len(data)
+                return
+            self._diverge()
+        self.out.write(data)
+
+    def close(self):
+        if self.closed:
+            return self.changed
+        self.closed = True
+        try:
+            # Identical so far: the old file may still be longer than the page
+            if self.out is None and self.file.read(1):
+                self._diverge()
+            if self.out is not None:
+                self.out.close()
+                os.replace(self.temp_path, self.dest_path)
+        except BaseException:
+            self._discard()
+            raise
+        finally:
+            if self.file is not None:
+                self.file.close()
+        return self.changed
+
+    def abort(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.file is not None:
+            self.file.close()
+        self._discard()
+        self.changed = False
+
+    def _discard(self):
+        if self.out is not None:
+            self.out.close()
+            if os.path.exists(self.temp_path):
+                os.remove(self.temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+class OutputWriter:
+    # Write-behind for rendered pages: submit() hands a page to a bounded
+    # queue and returns, and writer threads put it on disk while the caller
+    # renders the next one. The bound keeps at most max_pending pages in
+    # memory. Output directories must already exist (see create_output_dirs).
+    # With threads=0 pages are written synchronously inside submit().
+    # changed collects the outputs that differed from what was on disk.
+    def __init__(self, threads=1, max_pending=None):
+        self.errors = {}
+        self.changed = set()
+        if max_pending is None:
+            max_pending = threads * 8
+        self.queue = queue.Queue(max(max_pending, 1))
+        self.threads = []
+        for _ in range(threads):
+            thread = threading.Thread(target=self._run, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _write(self, dest_path, chunks):
+        try:
+            if write_output(dest_path, chunks):
+                self.changed.add(dest_path)
+        except Exception as e:
+            self.errors[dest_path] = f"{type(e).__name__}: {e}"
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            self._write(*item)
+
+    def submit(self, dest_path, chunks):
+        # chunks is a list of strings making up the page
+        if not self.threads:
+            self._write(dest_path, chunks)
+        else:
+            self.queue.put((dest_path, chunks))
+
+    def close(self):
+        # Waits for every submitted page and returns {dest_path: error}
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        return self.errors
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()